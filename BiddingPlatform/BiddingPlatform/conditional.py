@@ -0,0 +1,71 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+
+def make_etag(*parts):
+    """Build a strong ETag from the values that identify a representation's version."""
+    key = ":".join(str(part) for part in parts)
+    return '"%s"' % hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def payload_etag(digest, coding=None):
+    """
+    Strong ETag of a stored payload, taken straight from its SHA-256 digest.
+
+    A content-coded representation (e.g. the gzip bytes as stored) gets its own tag.
+    """
+    if not digest:
+        return None
+    return f'"{digest}.{coding}"' if coding else f'"{digest}"'
+
+
+def conditional_response(request, etag=None, last_modified=None):
+    """
+    Evaluate If-None-Match / If-Modified-Since against the current validators.
+
+    Args:
+        request: The incoming request
+        etag (str, optional): Current strong ETag, quoted
+        last_modified (datetime, optional): Last modification time of the resource
+
+    Returns:
+        HttpResponse | None: A 304 (or 412) response to return as-is, or None if the
+        full response should be produced.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag=None, last_modified=None, vary_on_auth=False):
+    """Attach ETag / Last-Modified headers to a response."""
+    if etag:
+        response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    if vary_on_auth:
+        # Detail payloads depend on who is asking
+        patch_vary_headers(response, ["Authorization"])
+    return response
+
+
+def if_range_matches(request, etag=None, last_modified=None):
+    """
+    Check an If-Range precondition. Ranges are only honoured when it is absent or
+    exactly matches the current ETag (strong comparison) or Last-Modified date.
+    """
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return etag is not None and if_range == etag
+    since = parse_http_date_safe(if_range)
+    return (
+        since is not None
+        and last_modified is not None
+        and int(last_modified.timestamp()) == since
+    )
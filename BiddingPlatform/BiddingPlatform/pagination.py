@@ -0,0 +1,230 @@
+"""
+Pagination shared by every list endpoint.
+
+Lists are paged by page number (``?page=3``) by default. Passing ``cursor`` switches to
+keyset pagination: start with an empty ``?cursor=`` and follow the ``next`` and
+``previous`` links. A cursor holds the sort values of the last row served, so each page
+is fetched with a ``WHERE`` on the sort columns instead of an ``OFFSET``, and page 500
+costs about the same as page 1.
+
+Lists that report a total compute it once per request; ``?count=estimate`` trades
+exactness for speed on very large result sets (see ``estimated_count``). Keyset pages
+report no total (``None``) unless asked with ``?count=exact`` or ``?count=estimate``,
+since counting would cost more than the page itself.
+"""
+import base64
+import hashlib
+import json
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CountedPaginator(Paginator):
+    """Django paginator that can be handed its total instead of counting."""
+
+    def __init__(self, *args, count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if count is not None:
+            self.count = count
+
+
+class StandardPagination(PageNumberPagination):
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+    count_query_param = 'count'
+    django_paginator_class = CountedPaginator
+
+    keyset = False
+    estimate = False
+    count_requested = False
+    total = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        count = request.query_params.get(self.count_query_param)
+        self.estimate = count == 'estimate'
+        self.count_requested = count in ('exact', 'estimate')
+        if self.cursor_query_param not in request.query_params:
+            if self.estimate:
+                self.total = estimated_count(queryset)
+                self.django_paginator_class = partial(CountedPaginator, count=self.total)
+            page = super().paginate_queryset(queryset, request, view)
+            if page is not None:
+                self.total = self.page.paginator.count
+            return page
+
+        self.keyset = True
+        self.request = request
+        self.model = queryset.model
+        self.ordering = keyset_ordering(queryset)
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = [flip(field) for field in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(keyset_filter(ordering, position))
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        page = rows[:page_size]
+        if reverse:
+            page.reverse()
+
+        self.next_position = self.previous_position = None
+        if page:
+            # Coming from a cursor there is always something on the side we came from
+            if has_more or (reverse and position is not None):
+                self.next_position = self.row_position(page[-1])
+            if (has_more and reverse) or (not reverse and position is not None):
+                self.previous_position = self.row_position(page[0])
+        return page
+
+    def get_total_count(self, queryset):
+        """
+        Total number of rows in the (unpaginated) ``queryset``, reusing the count the
+        page-number paginator already made instead of running a second one. None for
+        keyset pages unless the client asked for a count.
+        """
+        if self.keyset and not self.count_requested:
+            return None
+        if self.total is None:
+            self.total = estimated_count(queryset) if self.estimate else queryset.count()
+        return self.total
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            response = super().get_paginated_response(data)
+        else:
+            response = Response({
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+                'results': data,
+            })
+        if self.estimate:
+            response.data['count_is_estimate'] = True
+        return response
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        return self.cursor_link(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        return self.cursor_link(self.previous_position, reverse=True)
+
+    def row_position(self, row):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            try:
+                position.append(self.model._meta.get_field(name).value_to_string(row))
+            except FieldDoesNotExist:
+                # An annotation, such as a search rank
+                position.append(getattr(row, name))
+        return position
+
+    def cursor_link(self, position, reverse):
+        if position is None:
+            return None
+        token = base64.urlsafe_b64encode(
+            json.dumps({'p': position, 'r': int(reverse)}).encode()
+        ).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        """Return the ``(position, reverse)`` encoded in the request's cursor."""
+        token = request.query_params.get(self.cursor_query_param, '')
+        if not token:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(token.encode()))
+            position = cursor['p']
+            reverse = bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+
+def flip(field):
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def keyset_ordering(queryset):
+    """
+    The queryset's sort columns with the primary key appended as a tiebreak, sorted
+    the same way as the last column. Unordered querysets are sorted by primary key.
+    """
+    pk_name = queryset.model._meta.pk.name
+    ordering = [
+        field.replace('pk', pk_name) if field.lstrip('-') == 'pk' else field
+        for field in queryset.query.order_by
+    ]
+    if any(not isinstance(field, str) or '__' in field for field in ordering):
+        raise ValueError('Keyset pagination needs an ordering on the model\'s own fields')
+    if not any(field.lstrip('-') == pk_name for field in ordering):
+        descending = bool(ordering) and ordering[-1].startswith('-')
+        ordering.append(f'-{pk_name}' if descending else pk_name)
+    return ordering
+
+
+def keyset_filter(ordering, position):
+    """
+    Match the rows that sort strictly after ``position``:
+    ``(a < x) OR (a = x AND b < y) OR ...`` for descending columns ``a, b``.
+    """
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, position):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def estimated_count(queryset):
+    """
+    Approximate number of rows in ``queryset``, for ``?count=estimate``.
+
+    On PostgreSQL the planner's row estimate is used when it is above
+    ``settings.LIST_COUNT_ESTIMATE_THRESHOLD``, where an exact count would scan a large
+    part of the table; below it estimates are too rough and the rows are few, so they are
+    counted. Exact counts are cached for ``settings.LIST_COUNT_CACHE_TIMEOUT`` seconds,
+    keyed on the SQL, so repeated page loads of the same filtered list count once.
+    """
+    queryset = queryset.order_by()
+    sql, params = queryset.query.sql_with_params()
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+        if estimate > settings.LIST_COUNT_ESTIMATE_THRESHOLD:
+            return estimate
+
+    key = 'list-count:' + hashlib.sha256(repr((queryset.db, sql, params)).encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.LIST_COUNT_CACHE_TIMEOUT)
+    return count
@@ -0,0 +1,200 @@
+"""
+Full-text search of tenders, bids and companies.
+
+Each searchable model has an index table (an FTS5 virtual table on SQLite, a table of
+``tsvector`` documents with a GIN index on PostgreSQL) mapped by an unmanaged model that
+is one-to-one with it through ``search_entry``. Database triggers keep the index in sync
+on insert, update and delete, including bulk updates that bypass ``save()``, so the
+application only ever reads it.
+
+Every word of a search must appear, as a prefix, in one of the requested columns; the
+matches are annotated with ``search_rank`` (higher is better). The index columns are
+weighted in the order the index model's ``SEARCH_COLUMNS`` lists them. On other
+databases, searches fall back to ``icontains`` over the same fields.
+
+Arabic text is folded (see ``fold_text``) both when the triggers fill the index and when
+a search is parsed, so spelling variants of a word find each other. The triggers use the
+copy of the fold tables frozen in ``User/migrations/_search_folding.py``; a change to them
+needs migrations recreating the triggers and rebuilding the indexes.
+"""
+import re
+
+from django.db import NotSupportedError, connections, migrations, models
+from django.db.models import F, FloatField, Func, Lookup, Q, Value
+from django.db.models.functions import Replace
+
+SEARCH_VENDORS = ("sqlite", "postgresql")
+
+# Relative weight of the first, second, third and fourth index column, as PostgreSQL's
+# ts_rank gives labels A to D by default
+COLUMN_WEIGHTS = (1.0, 0.4, 0.2, 0.1)
+WEIGHT_LABELS = "ABCD"
+
+WORD_RE = re.compile(r"\w+")
+
+# Arabic spellings readers treat as the same word, and what they are folded to: hamza on
+# or under alef, madda and wasla become bare alef; hamza on waw becomes waw; hamza on
+# yaa, alef maqsura and Farsi yeh become yaa; keheh becomes kaf; taa marbuta becomes
+# haa; Arabic-Indic and Eastern Arabic-Indic digits become ASCII digits.
+FOLD_FROM = (
+    "\u0623\u0625\u0622\u0671"
+    "\u0624"
+    "\u0626\u0649\u06cc"
+    "\u06a9"
+    "\u0629"
+    "\u0660\u0661\u0662\u0663\u0664\u0665\u0666\u0667\u0668\u0669"
+    "\u06f0\u06f1\u06f2\u06f3\u06f4\u06f5\u06f6\u06f7\u06f8\u06f9"
+)
+FOLD_TO = (
+    "\u0627\u0627\u0627\u0627"
+    "\u0648"
+    "\u064a\u064a\u064a"
+    "\u0643"
+    "\u0647"
+    "0123456789"
+    "0123456789"
+)
+# Dropped altogether: the harakat (tanween, fatha, damma, kasra, shadda, sukun),
+# combining madda and hamza, dagger alef and tatweel
+FOLD_DROP = (
+    "\u064b\u064c\u064d\u064e\u064f\u0650\u0651\u0652"
+    "\u0653\u0654\u0655\u0670\u0640"
+)
+FOLD_TABLE = str.maketrans(FOLD_FROM, FOLD_TO, FOLD_DROP)
+FOLD_PAIRS = list(zip(FOLD_FROM, FOLD_TO)) + [(char, "") for char in FOLD_DROP]
+
+
+class SearchDocumentField(models.TextField):
+    """The column of an index table that full-text queries match against."""
+
+
+@SearchDocumentField.register_lookup
+class Match(Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        raise NotSupportedError(f"Full-text search is not available on {connection.vendor}")
+
+    def as_sqlite(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} @@ to_tsquery('simple', {rhs})", lhs_params + rhs_params
+
+
+class SearchRank(Func):
+    """Relevance of an index row to a match expression; higher is better."""
+
+    output_field = FloatField()
+
+    def __init__(self, document, match, column_count):
+        super().__init__(document, Value(match))
+        self.column_count = column_count
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(f"Full-text search is not available on {connection.vendor}")
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        document, document_params = compiler.compile(self.source_expressions[0])
+        weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS[:self.column_count])
+        # bm25() is lower for better matches
+        return f"-bm25({document}, {weights})", document_params
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        document, document_params = compiler.compile(self.source_expressions[0])
+        match, match_params = compiler.compile(self.source_expressions[1])
+        return (
+            f"ts_rank({document}, to_tsquery('simple', {match}))",
+            document_params + match_params,
+        )
+
+
+def fold_text(text):
+    """
+    Fold the Arabic spelling variants of ``text`` to one form: strip diacritics and
+    tatweel, unify alef, hamza, yaa and taa marbuta forms, and use ASCII digits.
+    """
+    return (text or "").translate(FOLD_TABLE)
+
+
+def folded(expression):
+    """Query expression applying ``fold_text`` to ``expression``, on any database."""
+    for source, target in FOLD_PAIRS:
+        expression = Replace(expression, Value(source), Value(target))
+    return expression
+
+
+def search_words(text):
+    return WORD_RE.findall(fold_text(text))
+
+
+def match_expression(vendor, words, columns, all_columns):
+    """Build the FTS5 / tsquery expression matching every word as a prefix in ``columns``."""
+    if vendor == "postgresql":
+        labels = "".join(WEIGHT_LABELS[all_columns.index(column)] for column in columns)
+        return " & ".join(f"{word}:*{labels}" for word in words)
+    terms = " AND ".join(f'"{word}"*' for word in words)
+    return f"{{{' '.join(columns)}}} : ({terms})"
+
+
+def full_text_search(queryset, text, columns):
+    """
+    Restrict ``queryset`` to the rows whose ``columns`` match every word of ``text``.
+
+    Args:
+        queryset: Queryset of a model with a ``search_entry`` index relation
+        text (str): What the user typed
+        columns (list[str]): Index columns to search, from the index model's
+            ``SEARCH_COLUMNS``
+
+    Returns:
+        QuerySet: The matching rows, annotated with ``search_rank``
+    """
+    index_model = queryset.model._meta.get_field("search_entry").related_model
+    all_columns = list(index_model.SEARCH_COLUMNS)
+    words = search_words(text)
+    if not words:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor not in SEARCH_VENDORS:
+        queryset = queryset.alias(**{
+            f"folded_{column}": folded(F(index_model.SEARCH_COLUMNS[column]))
+            for column in columns
+        })
+        condition = Q()
+        for word in words:
+            condition &= Q.create(
+                [(f"folded_{column}__icontains", word) for column in columns],
+                connector=Q.OR,
+            )
+        return queryset.filter(condition).annotate(search_rank=Value(0.0))
+
+    match = match_expression(vendor, words, columns, all_columns)
+    return queryset.filter(search_entry__document__match=match).annotate(
+        search_rank=SearchRank(F("search_entry__document"), match, len(all_columns))
+    )
+
+
+def vendor_sql_operation(sqlite, postgresql, reverse_sqlite, reverse_postgresql):
+    """
+    Migration operation running the statements written for the current database; a
+    no-op elsewhere (searches then fall back to ``icontains``).
+    """
+    statements = {"sqlite": (sqlite, reverse_sqlite), "postgresql": (postgresql, reverse_postgresql)}
+
+    def run(schema_editor, reverse):
+        vendor_statements = statements.get(schema_editor.connection.vendor)
+        if vendor_statements is None:
+            return
+        for statement in vendor_statements[reverse]:
+            schema_editor.execute(statement, params=None)
+
+    return migrations.RunPython(
+        lambda apps, schema_editor: run(schema_editor, False),
+        lambda apps, schema_editor: run(schema_editor, True),
+    )
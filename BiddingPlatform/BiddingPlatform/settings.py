@@ -85,6 +85,7 @@ INSTALLED_APPS = [
     "User",
     "Tender",
     "Bit",
+    "Storage",
 ]
 
 ASGI_APPLICATION = "BiddingPlatform.asgi.application"
@@ -187,6 +188,133 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Attachment blob store
+# Uploaded files are stored once per SHA-256 digest under this directory
+
+BLOB_STORAGE_ROOT = Path(os.getenv("BLOB_STORAGE_ROOT", BASE_DIR / "blobstore"))
+
+# Optional compression of stored payloads: "gzip", "zstd" (needs the zstandard package)
+# or empty to store them raw. A level of 0 uses the codec's default. Payloads are kept
+# compressed only if that saves at least BLOB_COMPRESSION_MIN_SAVING of their size.
+BLOB_STORAGE_CODEC = os.getenv("BLOB_STORAGE_CODEC", "")
+BLOB_STORAGE_COMPRESSION_LEVEL = int(os.getenv("BLOB_STORAGE_COMPRESSION_LEVEL", "0")) or None
+BLOB_COMPRESSION_MIN_SAVING = 0.1
+BLOB_COMPRESSION_MIN_SIZE = 1024
+
+# Cold storage (manage.py archive_blobs): attachments of tenders awarded and closed for
+# BLOB_ARCHIVE_AFTER_DAYS are moved here and kept compressed. Reads are transparent.
+BLOB_ARCHIVE_ROOT = Path(os.getenv("BLOB_ARCHIVE_ROOT", BASE_DIR / "blobstore-archive"))
+BLOB_ARCHIVE_CODEC = os.getenv("BLOB_ARCHIVE_CODEC", "gzip")
+BLOB_ARCHIVE_COMPRESSION_LEVEL = 9
+BLOB_ARCHIVE_AFTER_DAYS = 90
+
+# Uploaded files are streamed into the blob store chunk by chunk as the request is parsed,
+# so memory per upload is bounded by BLOB_UPLOAD_CHUNK_SIZE
+FILE_UPLOAD_HANDLERS = ["Storage.upload_handlers.BlobStoreUploadHandler"]
+BLOB_UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# What each upload endpoint accepts (see Storage.validation). Types are sniffed from the
+# payload, not taken from the client; max_size is in bytes
+ATTACHMENT_TYPES = [
+    "application/pdf",
+    "application/msword",
+    "application/vnd.ms-excel",
+    "application/vnd.ms-powerpoint",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "application/rtf",
+    "application/zip",
+    "text/plain",
+    "text/csv",
+    "image/jpeg",
+    "image/png",
+    "image/tiff",
+]
+UPLOAD_POLICIES = {
+    "tender_files": {"allowed_types": ATTACHMENT_TYPES, "max_size": 200 * 1024 * 1024},
+    "bid_files": {"allowed_types": ATTACHMENT_TYPES, "max_size": 200 * 1024 * 1024},
+    "vat_certificates": {
+        "allowed_types": [
+            "application/pdf",
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            "application/vnd.ms-excel",
+            "image/jpeg",
+            "image/png",
+        ],
+        "max_size": 10 * 1024 * 1024,
+    },
+}
+
+# Resumable upload sessions: default and allowed chunk sizes in bytes
+UPLOAD_SESSION_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_SESSION_MIN_CHUNK_SIZE = 256 * 1024
+UPLOAD_SESSION_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# PDF previews: a thumbnail and images of the first PREVIEW_PAGES pages, rendered once
+# per file by PREVIEW_WORKERS worker processes (widths in pixels)
+PREVIEW_PAGES = 3
+PREVIEW_PAGE_WIDTH = 800
+PREVIEW_THUMBNAIL_WIDTH = 200
+PREVIEW_WORKERS = 2
+PREVIEW_IN_BACKGROUND = True  # Also covers image renditions; off only in tests
+# Background work lives in memory, so previews and renditions still pending after this
+# many seconds are assumed lost with their process and queued again
+PREVIEW_PENDING_TIMEOUT = 15 * 60
+
+# Review renditions of uploaded VAT certificate images (needs Pillow): a JPEG of at most
+# IMAGE_RENDITION_MAX_DIMENSION pixels per side, re-encoded by IMAGE_RENDITION_WORKERS
+# processes. Images under IMAGE_RENDITION_MIN_SIZE bytes are reviewed as they are
+IMAGE_RENDITIONS = True
+IMAGE_RENDITION_MAX_DIMENSION = 2000
+IMAGE_RENDITION_QUALITY = 80
+IMAGE_RENDITION_MIN_SIZE = 512 * 1024
+IMAGE_RENDITION_WORKERS = 2
+
+# Store a linearized ("fast web view") copy of every PDF in the same background pass and
+# serve it for downloads; needs the pikepdf package
+PDF_LINEARIZE = True
+
+# Most pages one page-extraction request may ask for
+PDF_EXTRACT_MAX_PAGES = 50
+
+# Blob sweep (manage.py collect_blobs): payloads written or re-used within the grace
+# period are never removed, and upload sessions older than the max age are discarded
+BLOB_GC_GRACE_PERIOD = 60 * 60
+UPLOAD_SESSION_MAX_AGE = 7 * 24 * 60 * 60
+
+# S3-compatible object storage (needs boto3), e.g. {"bucket": "bids",
+# "endpoint_url": "http://minio:9000", "aws_access_key_id": ..., "aws_secret_access_key":
+# ...}. Payloads stored there are downloaded and uploaded by clients directly through
+# presigned URLs valid for OBJECT_STORAGE_URL_TTL seconds; empty disables it
+BLOB_OBJECT_STORAGE = {}
+if os.getenv("BLOB_OBJECT_STORAGE_BUCKET"):
+    BLOB_OBJECT_STORAGE = {
+        "bucket": os.getenv("BLOB_OBJECT_STORAGE_BUCKET"),
+        "endpoint_url": os.getenv("BLOB_OBJECT_STORAGE_ENDPOINT_URL") or None,
+        "region_name": os.getenv("BLOB_OBJECT_STORAGE_REGION") or None,
+    }
+OBJECT_STORAGE_URL_TTL = 5 * 60
+
+# Downloads are streamed in blocks of this size, so worker memory does not grow with file size
+FILE_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Let the front proxy send attachment bytes: "x-accel-redirect" (nginx), "x-sendfile"
+# (Apache mod_xsendfile, lighttpd) or empty to stream them from Django. The view still
+# does authorization, conditional requests and headers. For nginx, map the prefix onto
+# BLOB_STORAGE_ROOT with an internal location, e.g.:
+#   location /protected-blobs/ { internal; alias /srv/blobstore/;
+#       add_header Content-Encoding $upstream_http_content_encoding; }
+FILE_DOWNLOAD_OFFLOAD = os.getenv("FILE_DOWNLOAD_OFFLOAD", "")
+FILE_DOWNLOAD_ACCEL_PREFIX = os.getenv("FILE_DOWNLOAD_ACCEL_PREFIX", "/protected-blobs/")
+
+# List endpoints with ?count=estimate: result sets the PostgreSQL planner expects to hold
+# more than LIST_COUNT_ESTIMATE_THRESHOLD rows report its estimate; smaller ones (and
+# every list on other databases) report an exact count cached for LIST_COUNT_CACHE_TIMEOUT
+# seconds
+LIST_COUNT_ESTIMATE_THRESHOLD = 100000
+LIST_COUNT_CACHE_TIMEOUT = 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -24,6 +24,7 @@ urlpatterns = [
     path("api/User/", include("User.urls")),  # Include the User app's URLs
     path("api/Tender/", include("Tender.urls")),  # Include the Tender app's URLs
     path("api/Bit/", include("Bit.urls")),  # Include the Bit app's URLs
+    path("api/Storage/", include("Storage.urls")),  # Include the Storage app's URLs
     path(
         "notification-test/", NotificationTestView.as_view(), name="notification_test"
     ),
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Bit', '0002_bit_files_file_hash_alter_bit_files_file_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bit',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:40
+
+from django.db import migrations
+
+from Storage.migrations import _payload_backfill
+
+
+def move_file_data_to_blob_store(apps, schema_editor):
+    _payload_backfill.move_file_data_to_blob_store(
+        apps, schema_editor, "Bit", "Bit_Files", data_field="file_data", hash_field="file_hash"
+    )
+
+
+class Migration(migrations.Migration):
+
+    # Each batch commits on its own so the table is not locked for the whole backfill
+    atomic = False
+
+    dependencies = [
+        ('Storage', '0001_initial'),
+        ('Bit', '0003_bit_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_file_data_to_blob_store, migrations.RunPython.noop),
+    ]
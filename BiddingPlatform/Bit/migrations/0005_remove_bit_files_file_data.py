@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Bit', '0004_move_file_data_to_blob_store'),
+    ]
+
+    # Only the model state changes in this release: servers still running the previous
+    # release keep reading file_data until they are replaced. The next release drops the
+    # column and makes file_hash NOT NULL in the database.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='bit_files',
+                    name='file_data',
+                ),
+                migrations.AlterField(
+                    model_name='bit_files',
+                    name='file_hash',
+                    field=models.CharField(db_index=True, max_length=64),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Bit', '0005_remove_bit_files_file_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bit_files',
+            name='detected_type',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
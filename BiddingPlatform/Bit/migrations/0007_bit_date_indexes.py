@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Bit', '0006_bit_files_detected_type'),
+        ('Tender', '0007_tender_start_date_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bit',
+            index=models.Index(fields=['tender', '-date', '-bit_id'], name='bit_tender_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bit',
+            index=models.Index(fields=['created_by', '-date', '-bit_id'], name='bit_creator_date_idx'),
+        ),
+    ]
@@ -0,0 +1,174 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:19
+
+import BiddingPlatform.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+from BiddingPlatform.search import vendor_sql_operation
+
+BIT_CREATOR = (
+    "COALESCE((SELECT username FROM xx_user WHERE \"User_Id\" = new.created_by_id), '')"
+)
+BIT_TENDER_TITLE = (
+    "COALESCE((SELECT title FROM \"Tender_tender\" WHERE tender_id = new.tender_id), '')"
+)
+
+SQLITE = [
+    "CREATE VIRTUAL TABLE bit_search USING fts5("
+    "title, description, creator, tender_title, tokenize = 'unicode61 remove_diacritics 2')",
+    """
+    INSERT INTO bit_search (rowid, title, description, creator, tender_title)
+    SELECT b.bit_id, b.title, b.description, COALESCE(u.username, ''), COALESCE(t.title, '')
+    FROM "Bit_bit" b
+    LEFT JOIN xx_user u ON u."User_Id" = b.created_by_id
+    LEFT JOIN "Tender_tender" t ON t.tender_id = b.tender_id
+    """,
+    f"""
+    CREATE TRIGGER bit_search_insert AFTER INSERT ON "Bit_bit" BEGIN
+        INSERT INTO bit_search (rowid, title, description, creator, tender_title)
+        VALUES (new.bit_id, new.title, new.description, {BIT_CREATOR}, {BIT_TENDER_TITLE});
+    END
+    """,
+    f"""
+    CREATE TRIGGER bit_search_update AFTER UPDATE OF title, description, created_by_id, tender_id
+    ON "Bit_bit"
+    WHEN old.title IS NOT new.title OR old.description IS NOT new.description
+        OR old.created_by_id IS NOT new.created_by_id OR old.tender_id IS NOT new.tender_id
+    BEGIN
+        UPDATE bit_search
+        SET title = new.title, description = new.description, creator = {BIT_CREATOR},
+            tender_title = {BIT_TENDER_TITLE}
+        WHERE rowid = new.bit_id;
+    END
+    """,
+    """
+    CREATE TRIGGER bit_search_delete AFTER DELETE ON "Bit_bit" BEGIN
+        DELETE FROM bit_search WHERE rowid = old.bit_id;
+    END
+    """,
+    """
+    CREATE TRIGGER bit_search_creator AFTER UPDATE OF username ON xx_user
+    WHEN old.username IS NOT new.username
+    BEGIN
+        UPDATE bit_search SET creator = new.username
+        WHERE rowid IN (SELECT bit_id FROM "Bit_bit" WHERE created_by_id = new."User_Id");
+    END
+    """,
+    """
+    CREATE TRIGGER bit_search_tender_title AFTER UPDATE OF title ON "Tender_tender"
+    WHEN old.title IS NOT new.title
+    BEGIN
+        UPDATE bit_search SET tender_title = new.title
+        WHERE rowid IN (SELECT bit_id FROM "Bit_bit" WHERE tender_id = new.tender_id);
+    END
+    """,
+]
+
+REVERSE_SQLITE = [
+    "DROP TRIGGER bit_search_tender_title",
+    "DROP TRIGGER bit_search_creator",
+    "DROP TRIGGER bit_search_delete",
+    "DROP TRIGGER bit_search_update",
+    "DROP TRIGGER bit_search_insert",
+    "DROP TABLE bit_search",
+]
+
+POSTGRESQL = [
+    "CREATE TABLE bit_search (rowid integer PRIMARY KEY, bit_search tsvector NOT NULL)",
+    "CREATE INDEX bit_search_document_idx ON bit_search USING GIN (bit_search)",
+    """
+    CREATE FUNCTION bit_search_document(bit_pk integer) RETURNS tsvector
+    LANGUAGE sql STABLE AS $$
+        SELECT setweight(to_tsvector('simple', coalesce(b.title, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(b.description, '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(u.username, '')), 'C')
+            || setweight(to_tsvector('simple', coalesce(t.title, '')), 'D')
+        FROM "Bit_bit" b
+        LEFT JOIN xx_user u ON u."User_Id" = b.created_by_id
+        LEFT JOIN "Tender_tender" t ON t.tender_id = b.tender_id
+        WHERE b.bit_id = bit_pk
+    $$
+    """,
+    """
+    INSERT INTO bit_search (rowid, bit_search)
+    SELECT bit_id, bit_search_document(bit_id) FROM "Bit_bit"
+    """,
+    """
+    CREATE FUNCTION bit_search_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM bit_search WHERE rowid = OLD.bit_id;
+            RETURN OLD;
+        END IF;
+        INSERT INTO bit_search (rowid, bit_search)
+        VALUES (NEW.bit_id, bit_search_document(NEW.bit_id))
+        ON CONFLICT (rowid) DO UPDATE SET bit_search = EXCLUDED.bit_search;
+        RETURN NEW;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER bit_search_sync
+    AFTER INSERT OR DELETE OR UPDATE OF title, description, created_by_id, tender_id
+    ON "Bit_bit"
+    FOR EACH ROW EXECUTE FUNCTION bit_search_sync()
+    """,
+    """
+    CREATE FUNCTION bit_search_related_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_TABLE_NAME = 'xx_user' THEN
+            UPDATE bit_search SET bit_search = bit_search_document(rowid)
+            WHERE rowid IN (SELECT bit_id FROM "Bit_bit" WHERE created_by_id = NEW."User_Id");
+        ELSE
+            UPDATE bit_search SET bit_search = bit_search_document(rowid)
+            WHERE rowid IN (SELECT bit_id FROM "Bit_bit" WHERE tender_id = NEW.tender_id);
+        END IF;
+        RETURN NEW;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER bit_search_creator_sync AFTER UPDATE OF username ON xx_user
+    FOR EACH ROW WHEN (OLD.username IS DISTINCT FROM NEW.username)
+    EXECUTE FUNCTION bit_search_related_sync()
+    """,
+    """
+    CREATE TRIGGER bit_search_tender_title_sync AFTER UPDATE OF title ON "Tender_tender"
+    FOR EACH ROW WHEN (OLD.title IS DISTINCT FROM NEW.title)
+    EXECUTE FUNCTION bit_search_related_sync()
+    """,
+]
+
+REVERSE_POSTGRESQL = [
+    "DROP TRIGGER bit_search_tender_title_sync ON \"Tender_tender\"",
+    "DROP TRIGGER bit_search_creator_sync ON xx_user",
+    "DROP FUNCTION bit_search_related_sync()",
+    "DROP TRIGGER bit_search_sync ON \"Bit_bit\"",
+    "DROP FUNCTION bit_search_sync()",
+    "DROP TABLE bit_search",
+    "DROP FUNCTION bit_search_document(integer)",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Bit', '0007_bit_date_indexes'),
+        ('Tender', '0008_tender_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bit_Search',
+            fields=[
+                ('bit', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='Bit.bit')),
+                ('document', BiddingPlatform.search.SearchDocumentField(db_column='bit_search')),
+            ],
+            options={
+                'db_table': 'bit_search',
+                'managed': False,
+            },
+        ),
+        # The index table and the triggers that keep it in sync
+        vendor_sql_operation(SQLITE, POSTGRESQL, REVERSE_SQLITE, REVERSE_POSTGRESQL),
+    ]
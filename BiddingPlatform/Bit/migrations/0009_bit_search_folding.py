@@ -0,0 +1,119 @@
+from django.db import migrations
+
+from BiddingPlatform.search import vendor_sql_operation
+from User.migrations._search_folding import fold_select, fold_sql
+
+
+def unfolded(sql):
+    return sql
+
+
+def unfolded_select(columns, source="", keep=()):
+    selected = ", ".join(f"{expression} AS {alias}" for alias, expression in columns.items())
+    return f"SELECT {selected} {source}".rstrip()
+
+
+def sqlite_statements(select):
+    """Recreate the bit_search triggers, filling the index through ``select``."""
+    row = select({
+        "rowid": "new.bit_id",
+        "title": "new.title",
+        "description": "new.description",
+        "creator": (
+            "COALESCE((SELECT username FROM xx_user WHERE \"User_Id\" = new.created_by_id), '')"
+        ),
+        "tender_title": (
+            "COALESCE((SELECT title FROM \"Tender_tender\" WHERE tender_id = new.tender_id), '')"
+        ),
+    }, keep=("rowid",))
+    backfill = select({
+        "rowid": "b.bit_id",
+        "title": "b.title",
+        "description": "b.description",
+        "creator": "COALESCE(u.username, '')",
+        "tender_title": "COALESCE(t.title, '')",
+    }, """
+        FROM "Bit_bit" b
+        LEFT JOIN xx_user u ON u."User_Id" = b.created_by_id
+        LEFT JOIN "Tender_tender" t ON t.tender_id = b.tender_id
+    """, keep=("rowid",))
+    return [
+        "DROP TRIGGER bit_search_tender_title",
+        "DROP TRIGGER bit_search_creator",
+        "DROP TRIGGER bit_search_update",
+        "DROP TRIGGER bit_search_insert",
+        "DELETE FROM bit_search",
+        f"""
+        INSERT INTO bit_search (rowid, title, description, creator, tender_title)
+        {backfill}
+        """,
+        f"""
+        CREATE TRIGGER bit_search_insert AFTER INSERT ON "Bit_bit" BEGIN
+            INSERT INTO bit_search (rowid, title, description, creator, tender_title) {row};
+        END
+        """,
+        # FTS5 rewrites a row on update anyway, so it is simply replaced
+        f"""
+        CREATE TRIGGER bit_search_update
+        AFTER UPDATE OF title, description, created_by_id, tender_id ON "Bit_bit"
+        WHEN old.title IS NOT new.title OR old.description IS NOT new.description
+            OR old.created_by_id IS NOT new.created_by_id OR old.tender_id IS NOT new.tender_id
+        BEGIN
+            DELETE FROM bit_search WHERE rowid = new.bit_id;
+            INSERT INTO bit_search (rowid, title, description, creator, tender_title) {row};
+        END
+        """,
+        f"""
+        CREATE TRIGGER bit_search_creator AFTER UPDATE OF username ON xx_user
+        WHEN old.username IS NOT new.username
+        BEGIN
+            UPDATE bit_search SET creator = ({select({"creator": "new.username"})})
+            WHERE rowid IN (SELECT bit_id FROM "Bit_bit" WHERE created_by_id = new."User_Id");
+        END
+        """,
+        f"""
+        CREATE TRIGGER bit_search_tender_title AFTER UPDATE OF title ON "Tender_tender"
+        WHEN old.title IS NOT new.title
+        BEGIN
+            UPDATE bit_search SET tender_title = ({select({"tender_title": "new.title"})})
+            WHERE rowid IN (SELECT bit_id FROM "Bit_bit" WHERE tender_id = new.tender_id);
+        END
+        """,
+    ]
+
+
+def postgresql_statements(fold):
+    """Redefine the bit_search documents through ``fold`` and rebuild them."""
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION bit_search_document(bit_pk integer) RETURNS tsvector
+        LANGUAGE sql STABLE AS $$
+            SELECT setweight(to_tsvector('simple', {fold("coalesce(b.title, '')")}), 'A')
+                || setweight(to_tsvector('simple', {fold("coalesce(b.description, '')")}), 'B')
+                || setweight(to_tsvector('simple', {fold("coalesce(u.username, '')")}), 'C')
+                || setweight(to_tsvector('simple', {fold("coalesce(t.title, '')")}), 'D')
+            FROM "Bit_bit" b
+            LEFT JOIN xx_user u ON u."User_Id" = b.created_by_id
+            LEFT JOIN "Tender_tender" t ON t.tender_id = b.tender_id
+            WHERE b.bit_id = bit_pk
+        $$
+        """,
+        "UPDATE bit_search SET bit_search = bit_search_document(rowid)",
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Bit', '0008_bit_search'),
+    ]
+
+    operations = [
+        # Index Arabic text folded, as searches are (BiddingPlatform.search.fold_text)
+        vendor_sql_operation(
+            sqlite_statements(fold_select),
+            postgresql_statements(fold_sql),
+            sqlite_statements(unfolded_select),
+            postgresql_statements(unfolded),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models import F
 from User.models import AdminType
+from BiddingPlatform.search import SearchDocumentField
 
 class Bit_Files(models.Model):
     file_id = models.AutoField(primary_key=True)
@@ -14,13 +16,39 @@ class Bit_Files(models.Model):
     )
     file_name = models.CharField(max_length=100)
     file_type = models.CharField(max_length=255)
+    detected_type = models.CharField(
+        max_length=255, blank=True, default=""
+    )  # Type sniffed from the payload's first bytes; empty for files stored before sniffing
     file_size = models.PositiveIntegerField()
-    file_data = models.BinaryField()
+    file_hash = models.CharField(
+        max_length=64, db_index=True
+    )  # SHA-256 digest of the payload in the blob store
     Uploaded_At = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.file_name
 
+    @property
+    def content_type(self):
+        """The type sniffed from the payload when known, else the one the client sent."""
+        return self.detected_type or self.file_type
+
+    @classmethod
+    def visible_to(cls, user, queryset=None):
+        """
+        Restrict bit files to the ones a user may see.
+
+        Technical admins only see technical files and commercial admins only commercial
+        ones; admins without a type (and bidders) see every file.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        if user.is_superuser:
+            admin_type = getattr(user, "admin_type", None)
+            if admin_type in (AdminType.TECHNICAL, AdminType.COMMERCIAL):
+                queryset = queryset.filter(admin_type=admin_type.value)
+        return queryset
+
 
 # Create your models here.
 class Bit(models.Model):
@@ -46,9 +74,58 @@ class Bit(models.Model):
     Is_Accepted = models.BooleanField(
         default=None, blank=True, null=True
     )  # Indicates if the bit is accepted
+    version = models.PositiveIntegerField(default=1)  # Bumped on every change, used for ETags
 
     class Meta:
         unique_together = ('created_by', 'tender')  # Prevent multiple bids from same user for same tender
+        indexes = [
+            # Keyset pagination of a tender's bids and of a company's bids (newest first)
+            models.Index(fields=["tender", "-date", "-bit_id"], name="bit_tender_date_idx"),
+            models.Index(fields=["created_by", "-date", "-bit_id"], name="bit_creator_date_idx"),
+        ]
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if not self._state.adding and (update_fields is None or update_fields):
+            self.version += 1
+            if update_fields is not None:
+                # Partial saves must write the new version too
+                kwargs["update_fields"] = {*update_fields, "version"}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def bump_version(cls, bit_id):
+        """Mark a bit as changed without loading it (e.g. when its files change)."""
+        cls.objects.filter(bit_id=bit_id).update(version=F("version") + 1)
+
+
+class Bit_Search(models.Model):
+    """
+    Full-text index of bits, kept in sync by database triggers (see migration
+    0008_bit_search); only read through BiddingPlatform.search.full_text_search.
+    """
+
+    bit = models.OneToOneField(
+        Bit,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        related_name="search_entry",
+        db_column="rowid",
+        db_constraint=False,
+    )
+    document = SearchDocumentField(db_column="bit_search")
+
+    # Index columns, most relevant first, and the fields they are filled from
+    SEARCH_COLUMNS = {
+        "title": "title",
+        "description": "description",
+        "creator": "created_by__username",
+        "tender_title": "tender__title",
+    }
+
+    class Meta:
+        managed = False
+        db_table = "bit_search"
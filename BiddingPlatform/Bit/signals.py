@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Bit, Bit_Files
+
+
+@receiver(post_save, sender=Bit_Files)
+@receiver(post_delete, sender=Bit_Files)
+def bump_bit_version_on_file_change(sender, instance, **kwargs):
+    """Invalidate cached bit details when a file is added or removed."""
+    Bit.bump_version(instance.bit_id)
@@ -5,6 +5,7 @@ from Bit.views import (
     Get_All_My_BitsView,
     Get_Bit_DetailView,
     Get_BitFile_Data,
+    Get_BitFile_Preview,
     Create_BitView,
     Add_BitFileView,
     Delete_BitFileView,
@@ -18,6 +19,7 @@ urlpatterns = [
     path("getmy/", Get_All_My_BitsView.as_view(), name="create_tender"),
     path("details/", Get_Bit_DetailView.as_view(), name="get_tender_file_data"),
     path("getfiledata/", Get_BitFile_Data.as_view(), name="tender_detail"),
+    path("getfilepreview/", Get_BitFile_Preview.as_view(), name="get_bit_file_preview"),
     path("create/", Create_BitView.as_view(), name="update_tender"),
     path("addfile/", Add_BitFileView.as_view(), name="add_tender_file"),
     path("deletefile/", Delete_BitFileView.as_view(), name="delete_tender_file"),
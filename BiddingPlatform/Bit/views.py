@@ -3,9 +3,11 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound
+from BiddingPlatform.pagination import StandardPagination
+from BiddingPlatform.search import full_text_search
 from django.db.models import Q
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.http import FileResponse
 import io
 import datetime
@@ -15,15 +17,26 @@ from Tender.permissions import IsCompany, IsSuperUser
 
 from .models import Bit, Bit_Files
 from Tender.models import Tender
+from Storage.attachments import attach_uploads, unique_file_names
+from Storage.blob_store import stage_upload
+from Storage.direct_uploads import (
+    claim_direct_uploads,
+    consume_direct_uploads,
+    requested_upload_ids,
+)
+from Storage.downloads import file_download_response
+from Storage.linearize import linearized_payload
+from Storage.previews import preview_response
+from Storage.validation import rejected_uploads_response
+from BiddingPlatform.conditional import (
+    conditional_response,
+    make_etag,
+    set_validators,
+)
 
 
 # Create your views here.
 
-class StandardPagination(PageNumberPagination):
-    page_size = 5
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
 class Get_All_Bits_For_TenderView(APIView):
     """
     View to get all bits for a specific tender.
@@ -54,12 +67,12 @@ class Get_All_Bits_For_TenderView(APIView):
             bits = Bit.objects.filter(tender=tender)
             
             # Apply search filter if search query is provided
+            ordering = ['-date']
             if search_query:
-                bits = bits.filter(
-                    Q(title__icontains=search_query) |
-                    Q(description__icontains=search_query) |
-                    Q(created_by__username__icontains=search_query)
+                bits = full_text_search(
+                    bits, search_query, ["title", "description", "creator"]
                 )
+                ordering.insert(0, '-search_rank')
                 
             # Apply additional filters
             if min_cost:
@@ -74,8 +87,8 @@ class Get_All_Bits_For_TenderView(APIView):
                 is_accepted_bool = is_accepted.lower() == 'true'
                 bits = bits.filter(Is_Accepted=is_accepted_bool)
                 
-            # Order by date (newest first)
-            bits = bits.order_by('-date')
+            # Best matches first when searching, then by date (newest first)
+            bits = bits.order_by(*ordering)
             
             # Apply pagination
             paginator = StandardPagination()
@@ -112,7 +125,7 @@ class Get_All_Bits_For_TenderView(APIView):
                     "end_date": end_date,
                     "is_accepted": is_accepted
                 },
-                "total_count": bits.count(),
+                "total_count": paginator.get_total_count(bits),
                 "data": bits_data
             })
 
@@ -121,6 +134,11 @@ class Get_All_Bits_For_TenderView(APIView):
                 {"message": "Tender not found", "data": []},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        except NotFound as e:
+            return Response(
+                {"message": str(e.detail), "data": []},
+                status=status.HTTP_404_NOT_FOUND,
+            )
         except Exception as e:
             return Response(
                 {"message": str(e), "data": []},
@@ -153,12 +171,12 @@ class Get_All_My_BitsView(APIView):
             bits = Bit.objects.filter(created_by=user)
             
             # Apply search filter if search query is provided
+            ordering = ['-date']
             if search_query:
-                bits = bits.filter(
-                    Q(title__icontains=search_query) |
-                    Q(description__icontains=search_query) |
-                    Q(tender__title__icontains=search_query)
+                bits = full_text_search(
+                    bits, search_query, ["title", "description", "tender_title"]
                 )
+                ordering.insert(0, '-search_rank')
                 
             # Apply additional filters
             if min_cost:
@@ -175,8 +193,8 @@ class Get_All_My_BitsView(APIView):
             if tender_id:
                 bits = bits.filter(tender__tender_id=tender_id)
                 
-            # Order by date (newest first)
-            bits = bits.order_by('-date')
+            # Best matches first when searching, then by date (newest first)
+            bits = bits.order_by(*ordering)
             
             # Apply pagination
             paginator = StandardPagination()
@@ -209,10 +227,15 @@ class Get_All_My_BitsView(APIView):
                     "is_accepted": is_accepted,
                     "tender_id": tender_id
                 },
-                "total_count": bits.count(),
+                "total_count": paginator.get_total_count(bits),
                 "data": bits_data
             })
 
+        except NotFound as e:
+            return Response(
+                {"message": str(e.detail), "data": []},
+                status=status.HTTP_404_NOT_FOUND,
+            )
         except Exception as e:
             return Response(
                 {"message": str(e), "data": []},
@@ -236,17 +259,28 @@ class Get_Bit_DetailView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            bit = Bit.objects.get(bit_id=bit_id)
+            bit = Bit.objects.select_related("created_by", "tender").get(bit_id=bit_id)
 
             # Determine which files to return based on user type
-            files_qs = bit.files.all()
-            if request.user.is_superuser:
-                admin_type = getattr(request.user, "admin_type", None)
-                if admin_type == AdminType.TECHNICAL:
-                    files_qs = files_qs.filter(admin_type=AdminType.TECHNICAL.value)
-                elif admin_type == AdminType.COMMERCIAL:
-                    files_qs = files_qs.filter(admin_type=AdminType.COMMERCIAL.value)
-                # If admin_type is None, treat as general admin and return all files
+            files_qs = Bit_Files.visible_to(request.user, bit.files.all())
+            admin_type = (
+                getattr(request.user, "admin_type", None)
+                if request.user.is_superuser
+                else None
+            )
+
+            # The bit and tender versions change whenever either (or the bit's files) change
+            etag = make_etag(
+                "bit",
+                bit.bit_id,
+                bit.version,
+                bit.tender.version,
+                bit.created_by.username if bit.created_by else None,
+                admin_type.value if admin_type else None,
+            )
+            not_modified = conditional_response(request, etag)
+            if not_modified is not None:
+                return not_modified
 
             # Serialize the bit data
             bit_data = {
@@ -280,10 +314,11 @@ class Get_Bit_DetailView(APIView):
                 ],
             }
 
-            return Response(
+            response = Response(
                 {"message": "Bit details retrieved successfully", "data": bit_data},
                 status=status.HTTP_200_OK,
             )
+            return set_validators(response, etag, vary_on_auth=True)
 
         except Bit.DoesNotExist:
             return Response(
@@ -313,7 +348,7 @@ class Get_BitFile_Data(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            bit_file = Bit_Files.objects.get(file_id=file_id)
+            bit_file = Bit_Files.visible_to(request.user).get(file_id=file_id)
 
             # For file downloads, we need to handle differently since we're returning binary data
             # We'll return metadata in a standard format when requested
@@ -323,6 +358,7 @@ class Get_BitFile_Data(APIView):
                     "file_name": bit_file.file_name,
                     "file_type": bit_file.file_type,
                     "file_size": bit_file.file_size,
+                    "sha256": bit_file.file_hash,
                     "uploaded_at": bit_file.Uploaded_At,
                 }
                 return Response(
@@ -333,15 +369,55 @@ class Get_BitFile_Data(APIView):
                     status=status.HTTP_200_OK,
                 )
             else:
-                # For actual file download, create a file-like object and return it
-                file_stream = io.BytesIO(bit_file.file_data)
-                response = FileResponse(
-                    file_stream,
+                digest, size = bit_file.file_hash, bit_file.file_size
+                # ?linearized=true serves the linearized copy of a PDF when there is one,
+                # so viewers can show page 1 early
+                if request.query_params.get("linearized") == "true":
+                    digest, size = linearized_payload(digest, size, bit_file.content_type)
+
+                # For actual file download, stream the payload (or the requested byte ranges),
+                # answering conditional requests before touching it
+                return file_download_response(
+                    request,
+                    digest,
+                    size=size,
                     content_type=bit_file.file_type,
-                    as_attachment=True,
                     filename=bit_file.file_name,
+                    last_modified=bit_file.Uploaded_At,
                 )
-                return response
+
+        except Bit_Files.DoesNotExist:
+            return Response(
+                {"message": "File not found", "data": []},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception as e:
+            return Response(
+                {"message": str(e), "data": []},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class Get_BitFile_Preview(APIView):
+    """
+    View to get a rendered preview of a bit PDF file without downloading it.
+
+    Query parameters: file_id (required), kind ("thumbnail" or "page"), page (1-based).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            file_id = request.query_params.get("file_id")
+            if not file_id:
+                return Response(
+                    {"message": "file_id is required", "data": []},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            bit_file = Bit_Files.visible_to(request.user).get(file_id=file_id)
+            return preview_response(request, bit_file.file_hash, bit_file.content_type)
 
         except Bit_Files.DoesNotExist:
             return Response(
@@ -358,9 +434,14 @@ class Get_BitFile_Data(APIView):
 class Create_BitView(APIView):
     """
     View to create a new bit.
+
+    Attachments are sent as multipart ``Technical_files`` / ``Commercial_files``, or
+    uploaded to object storage first (see Create_DirectUploadView) and passed as
+    ``Technical_uploads`` / ``Commercial_uploads`` upload ids.
     """
 
     permission_classes = [IsAuthenticated, IsCompany]
+    upload_policy = "bid_files"
 
     def post(self, request):
         try:
@@ -383,68 +464,61 @@ class Create_BitView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            bit = Bit.objects.create(
-                title=data.get("title"),
-                description=data.get("description"),
-                date=data.get("date"),
-                created_by=user,
-                tender=tender,
-                cost=data.get("cost"),
-            )
-            
-            # Handle file uploads
+            # Write the payloads to the blob store first, then record the bit and all of
+            # its attachments in one transaction
             technical_files = request.FILES.getlist("Technical_files")
-            if technical_files:
-                for file in technical_files:
-                    # Read the file data
-                    file_data = file.read()
-
-                    # Create unique filenames with timestamp to avoid conflicts
-                    import datetime
-                    import os
-
-                    # Split the filename into name and extension
-                    file_name, file_extension = os.path.splitext(file.name)
-
-                    # Add current timestamp to ensure uniqueness
-                    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
-                    unique_filename = f"{file_name}_{timestamp}{file_extension}"
-
-                    # Create the attachment record
-                    Bit_Files.objects.create(
-                        bit=bit,
-                        file_name=unique_filename,
-                        file_type=file.content_type,
-                        file_size=file.size,
-                        file_data=file_data,
-                        admin_type=AdminType.TECHNICAL.value,  # Set admin type for technical files
-                    )
             commercial_files = request.FILES.getlist("Commercial_files")
-            if commercial_files:
-                for file in commercial_files:
-                    # Read the file data
-                    file_data = file.read()
-
-                    # Create unique filenames with timestamp to avoid conflicts
-                    import datetime
-                    import os
-
-                    # Split the filename into name and extension
-                    file_name, file_extension = os.path.splitext(file.name)
-
-                    # Add current timestamp to ensure uniqueness
-                    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
-                    unique_filename = f"{file_name}_{timestamp}{file_extension}"
-
-                    # Create the attachment record
-                    Bit_Files.objects.create(
-                        bit=bit,
-                        file_name=unique_filename,
-                        file_type=file.content_type,
-                        file_size=file.size,
-                        file_data=file_data,
-                        admin_type=AdminType.COMMERCIAL.value,  # Set admin type for commercial files
-                    )
+            rejected = rejected_uploads_response(
+                request, technical_files + commercial_files, self.upload_policy
+            )
+            if rejected is not None:
+                return rejected
+            technical_payloads = [stage_upload(file) for file in technical_files]
+            commercial_payloads = [stage_upload(file) for file in commercial_files]
+            # Files uploaded straight to object storage are passed by upload id
+            for files, payloads, field in (
+                (technical_files, technical_payloads, "Technical_uploads"),
+                (commercial_files, commercial_payloads, "Commercial_uploads"),
+            ):
+                claimed_files, claimed_payloads, error = claim_direct_uploads(
+                    request.user, requested_upload_ids(data, field), self.upload_policy
+                )
+                if error is not None:
+                    return error
+                files += claimed_files
+                payloads += claimed_payloads
+            file_names = unique_file_names(
+                [file.name for file in technical_files + commercial_files]
+            )
+
+            with transaction.atomic():
+                error = consume_direct_uploads(technical_files + commercial_files)
+                if error is not None:
+                    return error
+                bit = Bit.objects.create(
+                    title=data.get("title"),
+                    description=data.get("description"),
+                    date=data.get("date"),
+                    created_by=user,
+                    tender=tender,
+                    cost=data.get("cost"),
+                )
+                attach_uploads(
+                    Bit_Files,
+                    technical_files,
+                    technical_payloads,
+                    file_names[:len(technical_files)],
+                    bit=bit,
+                    admin_type=AdminType.TECHNICAL.value,  # Set admin type for technical files
+                )
+                attach_uploads(
+                    Bit_Files,
+                    commercial_files,
+                    commercial_payloads,
+                    file_names[len(technical_files):],
+                    bit=bit,
+                    admin_type=AdminType.COMMERCIAL.value,  # Set admin type for commercial files
+                )
 
             bit_data = {
                 "bit_id": bit.bit_id,
@@ -488,6 +562,8 @@ class Add_BitFileView(APIView):
     Form data:
     - bit_id: 123  (Required)
     - files: [file1.pdf, file2.xlsx, file3.pdf]  (Multiple file upload)
+    - Technical_uploads / Commercial_uploads: upload ids of files sent straight to
+      object storage (see Create_DirectUploadView)
 
     Response:
     {
@@ -506,6 +582,7 @@ class Add_BitFileView(APIView):
     """
 
     permission_classes = [IsAuthenticated]
+    upload_policy = "bid_files"
 
     def post(self, request):
         data = request.data
@@ -520,84 +597,66 @@ class Add_BitFileView(APIView):
             bit = Bit.objects.get(bit_id=bit_id)
 
             # Handle multiple file uploads
-            files = request.FILES.getlist("Technical_files")
-            
-            uploaded_files = []
-
-            for file in files:
-                # Read the file data as BLOB
-                file_data = file.read()
-
-                # Create unique filenames with timestamp if needed
-                import datetime
-                import os
-
-                # Split the filename into name and extension
-                file_name, file_extension = os.path.splitext(file.name)
-                
-                # Add current timestamp to ensure uniqueness
-                timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
-                unique_filename = f"{file_name}_{timestamp}{file_extension}"
-
-                # Create the attachment record with BLOB data
-                bit_file = Bit_Files.objects.create(
+            technical_files = request.FILES.getlist("Technical_files")
+            commercial_files = request.FILES.getlist("Commercial_files")
+            rejected = rejected_uploads_response(
+                request, technical_files + commercial_files, self.upload_policy
+            )
+            if rejected is not None:
+                return rejected
+
+            # Write the payloads first, then record every attachment in one transaction
+            technical_payloads = [stage_upload(file) for file in technical_files]
+            commercial_payloads = [stage_upload(file) for file in commercial_files]
+            # Files uploaded straight to object storage are passed by upload id
+            for files, payloads, field in (
+                (technical_files, technical_payloads, "Technical_uploads"),
+                (commercial_files, commercial_payloads, "Commercial_uploads"),
+            ):
+                claimed_files, claimed_payloads, error = claim_direct_uploads(
+                    request.user, requested_upload_ids(data, field), self.upload_policy
+                )
+                if error is not None:
+                    return error
+                files += claimed_files
+                payloads += claimed_payloads
+            file_names = unique_file_names(
+                [file.name for file in technical_files + commercial_files]
+            )
+
+            with transaction.atomic():
+                error = consume_direct_uploads(technical_files + commercial_files)
+                if error is not None:
+                    return error
+                bit_files = attach_uploads(
+                    Bit_Files,
+                    technical_files,
+                    technical_payloads,
+                    file_names[:len(technical_files)],
                     bit=bit,
-                    file_name=unique_filename,
-                    file_type=file.content_type,
-                    file_size=file.size,
-                    file_data=file_data,
                     admin_type=AdminType.TECHNICAL.value,  # Assuming these are technical files
                 )
-
-                uploaded_files.append(
-                    {
-                        "file_id": bit_file.file_id,
-                        "file_name": unique_filename,
-                        "original_filename": file.name,
-                        "file_type": file.content_type,
-                        "file_size": file.size,
-                        "type": bit_file.admin_type,
-                    }
-                )
-
-            # Handle multiple file uploads
-            files = request.FILES.getlist("Commercial_files")
-
-            for file in files:
-                # Read the file data as BLOB
-                file_data = file.read()
-
-                # Create unique filenames with timestamp if needed
-                import datetime
-                import os
-
-                # Split the filename into name and extension
-                file_name, file_extension = os.path.splitext(file.name)
-                
-                # Add current timestamp to ensure uniqueness
-                timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
-                unique_filename = f"{file_name}_{timestamp}{file_extension}"
-
-                # Create the attachment record with BLOB data
-                bit_file = Bit_Files.objects.create(
+                bit_files += attach_uploads(
+                    Bit_Files,
+                    commercial_files,
+                    commercial_payloads,
+                    file_names[len(technical_files):],
                     bit=bit,
-                    file_name=unique_filename,
-                    file_type=file.content_type,
-                    file_size=file.size,
-                    file_data=file_data,
                     admin_type=AdminType.COMMERCIAL.value,  # Assuming these are commercial files
                 )
+                Bit.bump_version(bit.bit_id)
 
-                uploaded_files.append(
-                    {
-                        "file_id": bit_file.file_id,
-                        "file_name": unique_filename,
-                        "original_filename": file.name,
-                        "file_type": file.content_type,
-                        "file_size": file.size,
-                        "type": bit_file.admin_type,
-                    }
-                )
+            uploaded_files = [
+                {
+                    "file_id": bit_file.file_id,
+                    "file_name": bit_file.file_name,
+                    "original_filename": file.name,
+                    "file_type": file.content_type,
+                    "file_size": file.size,
+                    "type": bit_file.admin_type,
+                }
+                for file, bit_file in zip(technical_files + commercial_files, bit_files)
+            ]
 
             return Response(
                 {
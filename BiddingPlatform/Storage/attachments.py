@@ -0,0 +1,68 @@
+import datetime
+import os
+from collections import Counter
+
+from django.db import connections, router
+
+from .models import Blob
+from .previews import schedule_previews
+
+
+def unique_file_names(names):
+    """
+    Stamp a batch of file names with one shared timestamp so they do not collide with
+    earlier uploads. Names repeated within the batch also get a running number.
+    """
+    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
+    seen = Counter()
+    unique_names = []
+    for name in names:
+        seen[name] += 1
+        file_name, file_extension = os.path.splitext(name)
+        suffix = timestamp if seen[name] == 1 else f"{timestamp}_{seen[name]}"
+        unique_names.append(f"{file_name}_{suffix}{file_extension}")
+    return unique_names
+
+
+def attach_uploads(model, files, payloads, file_names, **fields):
+    """
+    Create the file rows for a batch of staged uploads with a single bulk insert.
+
+    Call it inside ``transaction.atomic()`` together with any other writes of the
+    request, so either every attachment is recorded or none is. ``bulk_create`` sends
+    no ``post_save`` signals; callers bump the parent's version themselves. Databases
+    that cannot return primary keys from a bulk insert (MySQL) get one INSERT per row
+    instead. Previews of PDF files are queued to render once the transaction commits.
+
+    Args:
+        model: Tender_Files or Bit_Files
+        files (list[UploadedFile]): The uploaded files, checked by
+            ``rejected_uploads_response`` so their ``detected_type`` is set
+        payloads (list[StoredPayload]): Their staged payloads, from ``stage_upload``
+        file_names (list[str]): The names to record, one per file
+        **fields: Values shared by every row (e.g. ``tender=...``, ``admin_type=...``)
+
+    Returns:
+        list: The created rows, with primary keys set
+    """
+    Blob.acquire_many(payloads)
+    schedule_previews(
+        (payload.digest, file.detected_type) for file, payload in zip(files, payloads)
+    )
+    rows = [
+        model(
+            file_name=file_name,
+            file_type=file.content_type,
+            detected_type=file.detected_type or "",
+            file_size=payload.size,
+            file_hash=payload.digest,
+            **fields,
+        )
+        for file, payload, file_name in zip(files, payloads, file_names)
+    ]
+    connection = connections[router.db_for_write(model)]
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(rows)
+    for row in rows:
+        row.save(force_insert=True)
+    return rows
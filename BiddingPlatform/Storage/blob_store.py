@@ -0,0 +1,404 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+from . import codecs
+from .models import Blob
+from .object_store import get_object_store
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """
+    Content-addressed payload store on the local filesystem.
+
+    Every payload is written once under its SHA-256 digest, fanned out into two levels
+    of sub-directories (``ab/cd/abcd...``) so no directory grows too large. Writing the
+    same content twice is a no-op, which is what deduplicates identical uploads.
+
+    With a ``codec`` configured, payloads that shrink enough are stored compressed under
+    the codec's suffix; ``open`` always hands back the original bytes.
+
+    An optional ``archive`` store holds payloads moved to cold storage. Lookups fall
+    through to it, so callers never need to know which tier a payload is on.
+
+    An optional ``remote`` ObjectStore holds payloads kept in S3-compatible storage.
+    ``locate`` only reports local files, but ``exists``, ``open`` and ``local_path``
+    fall through to it as well.
+    """
+
+    def __init__(
+        self,
+        root,
+        codec=None,
+        level=None,
+        min_saving=0.1,
+        min_size=1024,
+        archive=None,
+        remote=None,
+    ):
+        self.root = Path(root)
+        self.codec = codecs.check_codec(codec)
+        self.level = level
+        self.min_saving = min_saving
+        self.min_size = min_size
+        self.archive = archive
+        self.remote = remote
+
+    def path(self, digest, codec=codecs.IDENTITY):
+        """Return the on-disk path of the payload with the given digest and codec."""
+        return self.root / digest[:2] / digest[2:4] / f"{digest}{codecs.CODEC_SUFFIXES[codec]}"
+
+    def locate(self, digest):
+        """
+        Find a stored payload.
+
+        Returns:
+            tuple[Path, str] | None: The file's path and the codec it is stored with,
+            or None if the payload is not on disk
+        """
+        for codec in codecs.CODEC_SUFFIXES:
+            path = self.path(digest, codec)
+            if path.is_file():
+                return path, codec
+        if self.archive is not None:
+            return self.archive.locate(digest)
+        return None
+
+    def is_archived(self, path):
+        """Whether a path returned by ``locate`` lives in the archive store."""
+        return self.archive is not None and path.is_relative_to(self.archive.root)
+
+    def exists(self, digest):
+        if self.locate(digest) is not None:
+            return True
+        return self.remote is not None and self.remote.exists(digest)
+
+    def open(self, digest):
+        """Open a stored payload for reading its original bytes, decompressing as needed."""
+        location = self.locate(digest)
+        if location is None and self.remote is not None:
+            return self.remote.open(digest)
+        if location is None:
+            raise FileNotFoundError(f"Payload {digest} is not in the blob store")
+        path, codec = location
+        return codecs.open_decoded(open(path, "rb"), codec)
+
+    @contextmanager
+    def local_path(self, digest):
+        """
+        Yield a filesystem path holding a payload's original bytes, for libraries that
+        need a real file. Compressed payloads are decompressed to a spool file first.
+        """
+        location = self.locate(digest)
+        if location is None and self.remote is None:
+            raise FileNotFoundError(f"Payload {digest} is not in the blob store")
+        if location is not None and location[1] == codecs.IDENTITY:
+            yield location[0]
+            return
+
+        fd, tmp_path = self.spool()
+        try:
+            if location is None:
+                os.close(fd)
+                self.remote.download(digest, tmp_path)
+            else:
+                with os.fdopen(fd, "wb") as tmp_file, self.open(digest) as payload:
+                    shutil.copyfileobj(payload, tmp_file, 1024 * 1024)
+            yield tmp_path
+        finally:
+            os.unlink(tmp_path)
+
+    def spool(self):
+        """
+        Create a temporary file inside the store to write a payload into.
+
+        Spool files live on the same filesystem as the store so ``commit`` is a rename.
+
+        Returns:
+            tuple[int, str]: An open OS-level file descriptor and the file's path
+        """
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        return tempfile.mkstemp(dir=tmp_dir)
+
+    def commit(self, tmp_path, digest, content_type=None, compress=True):
+        """
+        Move a fully written spool file into place under its digest.
+
+        Args:
+            tmp_path (str): Spool file holding the raw payload
+            digest (str): SHA-256 hex digest of the payload
+            content_type (str, optional): Known type, used to skip compressing media
+                and archives
+            compress (bool): False to store the payload uncompressed whatever the codec
+
+        Returns:
+            tuple[str, int]: The codec the payload is stored with and its size on disk
+        """
+        location = self.locate(digest)
+        if location is not None:
+            # Identical content is already stored. Touch it so the blob sweep, which
+            # spares recently written payloads, cannot remove it before the caller
+            # takes its reference.
+            os.unlink(tmp_path)
+            path, codec = location
+            os.utime(path)
+            return codec, path.stat().st_size
+
+        if not compress:
+            codec = codecs.IDENTITY
+        else:
+            codec, tmp_path = self._maybe_compress(tmp_path, content_type)
+        final_path = self.path(digest, codec)
+        final_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, final_path)
+        return codec, final_path.stat().st_size
+
+    def _maybe_compress(self, tmp_path, content_type):
+        """
+        Compress a spool file with the configured codec if that saves enough space.
+
+        Returns:
+            tuple[str, str]: The codec used and the spool file to move into place
+        """
+        raw_size = os.path.getsize(tmp_path)
+        if (
+            self.codec == codecs.IDENTITY
+            or raw_size < self.min_size
+            or not codecs.is_compressible(content_type)
+        ):
+            return codecs.IDENTITY, tmp_path
+
+        fd, packed_path = self.spool()
+        try:
+            with open(tmp_path, "rb") as src, os.fdopen(fd, "wb") as dst:
+                codecs.compress_file(src, dst, self.codec, self.level, raw_size)
+        except Exception:
+            os.unlink(packed_path)
+            raise
+
+        if os.path.getsize(packed_path) > raw_size * (1 - self.min_saving):
+            os.unlink(packed_path)
+            return codecs.IDENTITY, tmp_path
+        os.unlink(tmp_path)
+        return self.codec, packed_path
+
+    def save(self, chunks, content_type=None, compress=True):
+        """
+        Write a payload to the store.
+
+        Args:
+            chunks (Iterable[bytes]): The payload, one chunk at a time
+            content_type (str, optional): Known type of the payload
+            compress (bool): False to store the payload uncompressed whatever the codec
+
+        Returns:
+            tuple[str, int, str, int]: The SHA-256 hex digest and size of the payload,
+            the codec it is stored with and its size on disk
+        """
+        sha256 = hashlib.sha256()
+        size = 0
+        fd, tmp_path = self.spool()
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                for chunk in chunks:
+                    sha256.update(chunk)
+                    size += len(chunk)
+                    tmp_file.write(chunk)
+
+            digest = sha256.hexdigest()
+            codec, stored_size = self.commit(tmp_path, digest, content_type, compress)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        return digest, size, codec, stored_size
+
+    def iter_payloads(self):
+        """
+        Walk every payload file in the store.
+
+        Yields:
+            tuple[str, Path]: The digest and the path of each stored file
+        """
+        for first in sorted(self.root.glob("[0-9a-f][0-9a-f]")):
+            for second in sorted(first.glob("[0-9a-f][0-9a-f]")):
+                for entry in os.scandir(second):
+                    if entry.is_file():
+                        yield entry.name.split(".", 1)[0], Path(entry.path)
+        if self.archive is not None:
+            yield from self.archive.iter_payloads()
+
+    def archive_payload(self, digest):
+        """
+        Move a payload from this store into the archive store, recompressing it with
+        the archive's codec. Reads keep working throughout: the hot copy is removed only
+        once the archived one is in place.
+
+        Returns:
+            tuple[str, int] | None: The archive codec and size on disk, or None if the
+            payload is not in this store
+        """
+        location = self.locate(digest)
+        if location is None or self.is_archived(location[0]):
+            return None
+        path, codec = location
+
+        fd, tmp_path = self.archive.spool()
+        try:
+            with os.fdopen(fd, "wb") as tmp_file, codecs.open_decoded(
+                open(path, "rb"), codec
+            ) as payload:
+                shutil.copyfileobj(payload, tmp_file, 1024 * 1024)
+            stored = self.archive.commit(tmp_path, digest)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        os.unlink(path)
+        return stored
+
+    def move_to_remote(self, digest, content_type=None):
+        """
+        Move a local payload (hot or archived) to the object store, uncompressed so it
+        can be handed to clients as-is. The local copy is removed only once the upload
+        has been acknowledged.
+
+        Returns:
+            int | None: The payload's size, or None if it is not stored locally
+        """
+        if self.locate(digest) is None:
+            return None
+        with self.local_path(digest) as path:
+            size = os.path.getsize(path)
+            self.remote.upload(path, digest, content_type)
+        self._delete_local(digest)
+        return size
+
+    def chunk_path(self, session_id, index):
+        """Return the path of a received chunk of a resumable upload session."""
+        return self.root / "sessions" / str(session_id) / f"{index:08d}"
+
+    def save_chunk(self, session_id, index, chunks):
+        """
+        Write (or overwrite) one chunk of a resumable upload session.
+
+        Returns:
+            tuple[str, int]: The SHA-256 hex digest and the size of the chunk
+        """
+        final_path = self.chunk_path(session_id, index)
+        final_path.parent.mkdir(parents=True, exist_ok=True)
+
+        sha256 = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=final_path.parent, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                for chunk in chunks:
+                    sha256.update(chunk)
+                    size += len(chunk)
+                    tmp_file.write(chunk)
+            os.replace(tmp_path, final_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        return sha256.hexdigest(), size
+
+    def discard_session(self, session_id):
+        """Remove every chunk stored for an upload session."""
+        shutil.rmtree(self.root / "sessions" / str(session_id), ignore_errors=True)
+
+    def delete(self, digest):
+        """Remove a payload from every tier. Returns True if a copy was deleted."""
+        deleted = self._delete_local(digest)
+        if self.remote is not None and self.remote.exists(digest):
+            self.remote.delete(digest)
+            deleted = True
+        return deleted
+
+    def _delete_local(self, digest):
+        deleted = False
+        location = self.locate(digest)
+        while location is not None:
+            try:
+                os.unlink(location[0])
+                deleted = True
+            except FileNotFoundError:
+                break
+            location = self.locate(digest)
+        return deleted
+
+
+@lru_cache(maxsize=None)
+def get_blob_store():
+    """Return the blob store configured by ``settings.BLOB_STORAGE_*`` / ``BLOB_ARCHIVE_*``."""
+    archive = None
+    if settings.BLOB_ARCHIVE_ROOT:
+        # Cold payloads are always compressed when that saves anything at all
+        archive = BlobStore(
+            settings.BLOB_ARCHIVE_ROOT,
+            codec=settings.BLOB_ARCHIVE_CODEC,
+            level=settings.BLOB_ARCHIVE_COMPRESSION_LEVEL,
+            min_saving=0.0,
+            min_size=0,
+        )
+    return BlobStore(
+        settings.BLOB_STORAGE_ROOT,
+        codec=settings.BLOB_STORAGE_CODEC,
+        level=settings.BLOB_STORAGE_COMPRESSION_LEVEL,
+        min_saving=settings.BLOB_COMPRESSION_MIN_SAVING,
+        min_size=settings.BLOB_COMPRESSION_MIN_SIZE,
+        archive=archive,
+        remote=get_object_store(),
+    )
+
+
+StoredPayload = namedtuple("StoredPayload", ["digest", "size", "codec", "stored_size"])
+
+
+def stage_upload(uploaded_file):
+    """
+    Write an uploaded file's payload into the blob store without touching the database.
+
+    Files received through ``BlobStoreUploadHandler`` were already spooled and hashed
+    while the request was parsed, so they are moved into place without another pass.
+    A staged payload that never gets a reference is reclaimed by ``collect_blobs``.
+
+    Args:
+        uploaded_file (UploadedFile): The file from ``request.FILES``
+
+    Returns:
+        StoredPayload: Digest, size, codec and on-disk size of the payload
+    """
+    store = get_blob_store()
+    if getattr(uploaded_file, "digest", None):
+        codec, stored_size = uploaded_file.commit(store)
+        return StoredPayload(uploaded_file.digest, uploaded_file.size, codec, stored_size)
+    return StoredPayload(*store.save(uploaded_file.chunks(), uploaded_file.content_type))
+
+
+def store_upload(uploaded_file):
+    """
+    Store an uploaded file in the blob store and take a reference on it.
+
+    Args:
+        uploaded_file (UploadedFile): The file from ``request.FILES``
+
+    Returns:
+        Blob: The blob row now referenced by the caller
+    """
+    return Blob.acquire(*stage_upload(uploaded_file))
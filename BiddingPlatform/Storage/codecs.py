@@ -0,0 +1,172 @@
+"""
+Compression codecs for stored payloads.
+
+A compressed payload is kept on disk with the codec's suffix (``<digest>.gz``,
+``<digest>.zst``), so the store can always tell how to read a file back, and the codec
+is also recorded on the Blob row. ``identity`` means the payload is stored as-is.
+"""
+import gzip
+import io
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+IDENTITY = "identity"
+GZIP = "gzip"
+ZSTD = "zstd"
+
+CODEC_CHOICES = [
+    (IDENTITY, "Uncompressed"),
+    (GZIP, "gzip"),
+    (ZSTD, "Zstandard"),
+]
+
+# On-disk suffix of each codec; also the order in which the store looks for a payload
+CODEC_SUFFIXES = {
+    IDENTITY: "",
+    ZSTD: ".zst",
+    GZIP: ".gz",
+}
+
+DEFAULT_LEVELS = {
+    GZIP: 6,
+    ZSTD: 3,
+}
+
+# Payloads of these types are already compressed; compressing them again only burns CPU
+INCOMPRESSIBLE_TYPE_PREFIXES = (
+    "image/jpeg",
+    "image/png",
+    "image/gif",
+    "image/webp",
+    "video/",
+    "audio/",
+    "application/zip",
+    "application/gzip",
+    "application/zstd",
+    "application/vnd.rar",
+    "application/x-7z-compressed",
+)
+
+
+def check_codec(codec):
+    """Validate a configured codec name, returning ``identity`` for an empty value."""
+    codec = (codec or IDENTITY).lower()
+    if codec not in CODEC_SUFFIXES:
+        raise ImproperlyConfigured(
+            f"Unknown BLOB_STORAGE_CODEC {codec!r}; use one of {', '.join(CODEC_SUFFIXES)}"
+        )
+    if codec == ZSTD and zstandard is None:
+        raise ImproperlyConfigured("BLOB_STORAGE_CODEC 'zstd' requires the zstandard package")
+    return codec
+
+
+def codec_for_path(path):
+    """Tell the codec of a stored file from its suffix."""
+    name = str(path)
+    for codec, suffix in CODEC_SUFFIXES.items():
+        if suffix and name.endswith(suffix):
+            return codec
+    return IDENTITY
+
+
+def is_compressible(content_type):
+    return not (content_type or "").lower().startswith(INCOMPRESSIBLE_TYPE_PREFIXES)
+
+
+def compress_file(src, dst, codec, level=None, size=-1, block_size=1024 * 1024):
+    """
+    Compress the open binary file ``src`` into ``dst`` with ``codec``.
+
+    ``size`` is written into zstd frame headers so clients can decode in one call.
+    """
+    level = level or DEFAULT_LEVELS[codec]
+    if codec == GZIP:
+        # mtime=0 keeps the output deterministic for the same payload
+        writer = gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=level, mtime=0)
+    else:
+        writer = zstandard.ZstdCompressor(level=level).stream_writer(
+            dst, size=size, closefd=False
+        )
+    with writer:
+        for block in iter(lambda: src.read(block_size), b""):
+            writer.write(block)
+
+
+def open_decoded(raw, codec):
+    """
+    Wrap an open stored file so that reading it yields the original payload.
+
+    Returns the file itself for ``identity``, otherwise a ``DecodedPayload``.
+    """
+    if codec == IDENTITY:
+        return raw
+    if codec == ZSTD and zstandard is None:
+        raise ImproperlyConfigured("Reading zstd payloads requires the zstandard package")
+    return DecodedPayload(raw, codec)
+
+
+class DecodedPayload(io.RawIOBase):
+    """
+    Read-only stream decompressing a stored payload on the fly.
+
+    Seeking forward (as range requests do) decompresses and discards the skipped bytes;
+    seeking backward restarts from the beginning. ``seekable()`` reports False so
+    FileResponse does not seek to the end just to learn the size, which callers
+    already know from the file row.
+    """
+
+    def __init__(self, raw, codec):
+        self.raw = raw
+        self.codec = codec
+        self.reader = self._new_reader()
+        self.position = 0
+
+    def _new_reader(self):
+        if self.codec == GZIP:
+            return gzip.GzipFile(fileobj=self.raw, mode="rb")
+        return zstandard.ZstdDecompressor().stream_reader(self.raw, closefd=False)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def read(self, size=-1):
+        data = self.reader.read(size)
+        self.position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("Decoded payloads only support absolute seeks")
+        if offset < self.position:
+            self.reader.close()
+            self.raw.seek(0)
+            self.reader = self._new_reader()
+            self.position = 0
+        while self.position < offset:
+            if not self.read(min(offset - self.position, 1024 * 1024)):
+                break
+        return self.position
+
+    def close(self):
+        if not self.closed:
+            try:
+                self.reader.close()
+            finally:
+                self.raw.close()
+        super().close()
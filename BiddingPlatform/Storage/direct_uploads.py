@@ -0,0 +1,185 @@
+"""
+Attaching files that clients uploaded straight to object storage.
+
+A client first announces a file (name, size, type and SHA-256) and gets a presigned
+PUT URL for it (``Create_DirectUploadView``); the bytes go to the storage service,
+which checks them against the SHA-256. The view creating the bid then only receives
+the upload ids: ``claim_direct_uploads`` checks each upload's own object is there with
+the announced size and checksum, sniffs its type from its first bytes, stores it under
+its digest and hands back the same ``(files, payloads)`` lists ``attach_uploads`` takes
+for multipart uploads.
+
+Every upload is sent and checked, even when the content is already stored: knowing a
+file's SHA-256 must not be enough to attach it.
+"""
+import uuid
+from collections import namedtuple
+
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import codecs
+from .blob_store import StoredPayload, get_blob_store
+from .mime import SNIFF_LENGTH, resolve_content_type, sniff_content_type
+from .models import Blob, Direct_Upload
+from .validation import get_upload_policy
+
+# Stand-in for an UploadedFile, with the attributes attach_uploads reads
+DirectUploadFile = namedtuple(
+    "DirectUploadFile", ["name", "content_type", "detected_type", "size", "upload_id"]
+)
+
+
+def requested_upload_ids(data, field):
+    """Read a list of upload ids from form data (repeated field) or JSON (list)."""
+    if hasattr(data, "getlist"):
+        return data.getlist(field)
+    value = data.get(field) or []
+    return value if isinstance(value, list) else [value]
+
+
+def _error(message, http_status, data=None):
+    return Response({"message": message, "data": data or []}, status=http_status)
+
+
+def claim_direct_uploads(user, upload_ids, policy_name):
+    """
+    Check a user's completed direct uploads before attaching them.
+
+    Args:
+        user: The requesting user; only their own uploads can be claimed
+        upload_ids (list[str]): Ids returned by ``Create_DirectUploadView``
+        policy_name (str): Key of ``settings.UPLOAD_POLICIES`` the files must satisfy
+
+    Returns:
+        tuple[list[DirectUploadFile], list[StoredPayload], Response | None]: The files
+        and their payloads, or an error response
+    """
+    if not upload_ids:
+        return [], [], None
+    remote = get_blob_store().remote
+    if remote is None:
+        return [], [], _error("Direct uploads are not enabled.", status.HTTP_400_BAD_REQUEST)
+
+    try:
+        ids = [uuid.UUID(str(upload_id)) for upload_id in upload_ids]
+    except ValueError:
+        return [], [], _error("Invalid upload id.", status.HTTP_400_BAD_REQUEST)
+    uploads = {
+        upload.upload_id: upload
+        for upload in Direct_Upload.objects.filter(
+            upload_id__in=ids, created_by=user, policy=policy_name
+        )
+    }
+    missing = [str(upload_id) for upload_id in ids if upload_id not in uploads]
+    if missing:
+        return [], [], _error("Upload not found.", status.HTTP_404_NOT_FOUND, missing)
+
+    policy = get_upload_policy(policy_name)
+    store = get_blob_store()
+    files, payloads, rejected = [], [], []
+    for upload_id in ids:
+        upload = uploads[upload_id]
+        stat = remote.stat_upload(upload_id)
+        if stat is None:
+            rejected.append({"file_name": upload.file_name, "reason": "File was not uploaded."})
+            continue
+        # Without a checksum recorded by the service the content is unverified
+        if stat["size"] != upload.file_size or stat["sha256"] != upload.file_hash:
+            rejected.append(
+                {"file_name": upload.file_name, "reason": "Uploaded file does not match."}
+            )
+            continue
+
+        head = b""
+        if upload.file_size:
+            body = remote.open_upload(upload_id, (0, SNIFF_LENGTH - 1))
+            try:
+                head = body.read()
+            finally:
+                body.close()
+        detected_type = resolve_content_type(sniff_content_type(head), upload.file_type)
+        rejection = policy.check_type(upload.file_name, detected_type)
+        if rejection is not None:
+            rejected.append({"file_name": upload.file_name, "reason": rejection.reason})
+            continue
+
+        files.append(
+            DirectUploadFile(
+                upload.file_name, upload.file_type, detected_type, upload.file_size, upload_id
+            )
+        )
+        payloads.append(
+            StoredPayload(upload.file_hash, upload.file_size, codecs.IDENTITY, upload.file_size)
+        )
+
+    if rejected:
+        return [], [], _error(
+            "Some files were rejected.", status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, rejected
+        )
+
+    # Keep each payload under its digest; content already stored locally stays there.
+    # New payloads are registered where they are, so attach_uploads only adds references
+    blobs = []
+    for index, (file, payload) in enumerate(zip(files, payloads)):
+        location = store.locate(payload.digest)
+        if location is None:
+            remote.promote_upload(file.upload_id, payload.digest)
+            tier = Blob.OBJECT
+        else:
+            path, codec = location
+            tier = Blob.ARCHIVE if store.is_archived(path) else Blob.HOT
+            payload = payloads[index] = payload._replace(
+                codec=codec, stored_size=path.stat().st_size
+            )
+        blobs.append(
+            Blob(
+                digest=payload.digest,
+                size=payload.size,
+                codec=payload.codec,
+                stored_size=payload.stored_size,
+                tier=tier,
+                ref_count=0,
+            )
+        )
+    Blob.objects.bulk_create(blobs, ignore_conflicts=True)
+    return files, payloads, None
+
+
+def discard_upload_objects(upload_ids):
+    remote = get_blob_store().remote
+    for upload_id in upload_ids:
+        remote.delete_upload(upload_id)
+
+
+def consume_direct_uploads(files):
+    """
+    Forget the direct uploads among ``files`` once they are attached, removing their
+    own objects when the transaction commits.
+
+    Must run in the transaction attaching the files. The uploads are locked, so when
+    two requests attach the same upload only the first succeeds; the other's
+    transaction is marked for rollback.
+
+    Returns:
+        Response | None: An error response if one of the uploads was already attached
+    """
+    upload_ids = {file.upload_id for file in files if isinstance(file, DirectUploadFile)}
+    if not upload_ids:
+        return None
+    locked = set(
+        Direct_Upload.objects.select_for_update()
+        .filter(upload_id__in=upload_ids)
+        .values_list("upload_id", flat=True)
+    )
+    if locked != upload_ids:
+        transaction.set_rollback(True)
+        return _error(
+            "Upload was already attached.",
+            status.HTTP_409_CONFLICT,
+            [str(upload_id) for upload_id in upload_ids - locked],
+        )
+    Direct_Upload.objects.filter(upload_id__in=upload_ids).delete()
+    transaction.on_commit(lambda: discard_upload_objects(upload_ids))
+    return None
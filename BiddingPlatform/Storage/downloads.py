@@ -0,0 +1,422 @@
+import base64
+import re
+import uuid
+import zipfile
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
+from django.utils.cache import patch_vary_headers
+from django.utils.http import content_disposition_header
+
+from BiddingPlatform.conditional import (
+    conditional_response,
+    if_range_matches,
+    payload_etag,
+    set_validators,
+)
+
+from . import codecs
+from .blob_store import get_blob_store
+
+RANGE_SPEC_RE = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+
+# Requests asking for more (non-overlapping) ranges than this are served in full
+MAX_RANGES_PER_REQUEST = 16
+
+OFFLOAD_HEADERS = {
+    "x-accel-redirect": "X-Accel-Redirect",
+    "x-sendfile": "X-Sendfile",
+}
+
+
+class PayloadResponse(FileResponse):
+    """FileResponse streaming in ``settings.FILE_DOWNLOAD_CHUNK_SIZE`` blocks."""
+
+    def __init__(self, *args, **kwargs):
+        self.block_size = settings.FILE_DOWNLOAD_CHUNK_SIZE
+        super().__init__(*args, **kwargs)
+
+
+def set_digest_headers(response, digest):
+    """
+    Announce the SHA-256 digest of the whole payload, so clients can verify what they
+    downloaded without a second request: ``Repr-Digest`` (RFC 9530) and the older
+    ``Digest`` (RFC 3230). Both describe the complete payload, also on 206 responses.
+    """
+    value = base64.b64encode(bytes.fromhex(digest)).decode("ascii")
+    response["Repr-Digest"] = f"sha-256=:{value}:"
+    response["Digest"] = f"SHA-256={value}"
+    return response
+
+
+def accepts_encoding(request, coding):
+    """Check whether the client's Accept-Encoding allows ``coding`` (q > 0)."""
+    header = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    wildcard = None
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name == coding:
+            return quality > 0
+        if name == "*":
+            wildcard = quality > 0
+    return bool(wildcard)
+
+
+def parse_range_header(header, size):
+    """
+    Parse a ``Range: bytes=...`` header against a payload of ``size`` bytes.
+
+    Overlapping and adjacent ranges are merged so a client cannot make the server send
+    the same bytes twice.
+
+    Returns:
+        list[tuple[int, int]] | None: Inclusive ``(start, end)`` windows, an empty list
+        if no range can be satisfied, or None if the header should be ignored and the
+        full payload served.
+    """
+    if not header:
+        return None
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs:
+        return None
+
+    ranges = []
+    for spec in specs.split(","):
+        match = RANGE_SPEC_RE.match(spec)
+        if not match:
+            return None
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if last and end < start:
+                return None
+            if start >= size:
+                continue
+            end = min(end, size - 1)
+        elif last:
+            # Suffix range: the final N bytes
+            suffix_length = int(last)
+            if suffix_length == 0:
+                continue
+            start = max(size - suffix_length, 0)
+            end = size - 1
+        else:
+            return None
+        ranges.append((start, end))
+
+    ranges.sort()
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    if len(merged) > MAX_RANGES_PER_REQUEST:
+        return None
+    return merged
+
+
+def iter_payload_window(stream, start, end, block_size):
+    """Yield bytes ``start`` to ``end`` (inclusive) of a seekable payload stream."""
+    stream.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        chunk = stream.read(min(block_size, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def payload_response(
+    request, stream, size, content_type, filename, etag=None, last_modified=None
+):
+    """
+    Build the download response for a stored payload, honouring ``Range`` requests.
+
+    Single ranges are answered with ``206 Partial Content`` and ``Content-Range``;
+    several ranges with a ``multipart/byteranges`` body. Only the requested windows
+    are read from the stream. A stale ``If-Range`` falls back to the full payload.
+
+    Args:
+        request: The incoming request
+        stream: Seekable binary file-like object over the payload
+        size (int): Payload size in bytes
+        content_type (str): MIME type of the payload
+        filename (str): Name offered to the client in Content-Disposition
+        etag (str, optional): Strong ETag of the payload
+        last_modified (datetime, optional): Upload time of the payload
+    """
+    ranges = parse_range_header(request.META.get("HTTP_RANGE"), size)
+    if ranges is not None and not if_range_matches(request, etag, last_modified):
+        ranges = None
+
+    if ranges is None:
+        response = PayloadResponse(
+            stream, content_type=content_type, as_attachment=True, filename=filename
+        )
+        # Decompressing streams cannot report their length themselves
+        response["Content-Length"] = str(size)
+        response["Accept-Ranges"] = "bytes"
+        return set_validators(response, etag, last_modified)
+
+    if not ranges:
+        stream.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        response["Accept-Ranges"] = "bytes"
+        return response
+
+    block_size = settings.FILE_DOWNLOAD_CHUNK_SIZE
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+
+        def body():
+            try:
+                yield from iter_payload_window(stream, start, end, block_size)
+            finally:
+                stream.close()
+
+        response = StreamingHttpResponse(body(), status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+    else:
+        boundary = uuid.uuid4().hex
+        part_headers = [
+            (
+                f"--{boundary}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+            ).encode()
+            for start, end in ranges
+        ]
+        closing = f"--{boundary}--\r\n".encode()
+
+        def body():
+            try:
+                for header, (start, end) in zip(part_headers, ranges):
+                    yield header
+                    yield from iter_payload_window(stream, start, end, block_size)
+                    yield b"\r\n"
+                yield closing
+            finally:
+                stream.close()
+
+        content_length = len(closing) + sum(
+            len(header) + (end - start + 1) + 2
+            for header, (start, end) in zip(part_headers, ranges)
+        )
+        response = StreamingHttpResponse(
+            body(),
+            status=206,
+            content_type=f"multipart/byteranges; boundary={boundary}",
+        )
+        response["Content-Length"] = str(content_length)
+
+    response["Accept-Ranges"] = "bytes"
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    return set_validators(response, etag, last_modified)
+
+
+def offload_response(store, path, content_type, filename):
+    """
+    Hand the transfer of a stored file to the front proxy.
+
+    The response carries no body, only the internal-redirect header naming the file;
+    the proxy then serves it (including any Range requests) without a Django worker.
+
+    Returns:
+        HttpResponse | None: The offload response, or None if offloading is disabled
+        or the file is in the archive store
+    """
+    mode = (settings.FILE_DOWNLOAD_OFFLOAD or "").lower()
+    if not mode:
+        return None
+    if mode not in OFFLOAD_HEADERS:
+        raise ImproperlyConfigured(
+            f"Unknown FILE_DOWNLOAD_OFFLOAD {mode!r}; use one of {', '.join(OFFLOAD_HEADERS)}"
+        )
+
+    if store.is_archived(path):
+        # Only the hot store is exposed to the proxy
+        return None
+
+    if mode == "x-accel-redirect":
+        prefix = settings.FILE_DOWNLOAD_ACCEL_PREFIX.rstrip("/")
+        location = f"{prefix}/{path.relative_to(store.root).as_posix()}"
+    else:
+        location = str(path.resolve())
+
+    response = HttpResponse(content_type=content_type)
+    response[OFFLOAD_HEADERS[mode]] = location
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    return response
+
+
+def file_download_response(request, digest, size, content_type, filename, last_modified=None):
+    """
+    Answer a download of a stored payload.
+
+    Conditional requests are evaluated first. A payload stored compressed is sent as-is
+    with ``Content-Encoding`` when the client accepts its codec and asks for no range;
+    otherwise it is decompressed as it streams, and ranges refer to the original bytes.
+    With ``settings.FILE_DOWNLOAD_OFFLOAD`` set, stored files sent unchanged are handed
+    to the front proxy; only payloads that must be decompressed are streamed here.
+
+    Responses carrying the original bytes announce the payload's digest (see
+    ``set_digest_headers``); the digest of the compressed bytes is not known.
+
+    Payloads kept in object storage are not streamed at all: the client is redirected
+    to a short-lived presigned URL (see ``redirect_download_response``).
+
+    Args:
+        request: The incoming request
+        digest (str): SHA-256 hex digest of the payload
+        size (int): Size of the original payload in bytes
+        content_type (str): MIME type of the payload
+        filename (str): Name offered to the client in Content-Disposition
+        last_modified (datetime, optional): Upload time of the payload
+    """
+    store = get_blob_store()
+    location = store.locate(digest)
+    if location is None and store.remote is not None:
+        return redirect_download_response(
+            request, store.remote, digest, content_type, filename, last_modified
+        )
+    if location is None:
+        raise FileNotFoundError(f"Payload {digest} is not in the blob store")
+    path, codec = location
+
+    encoded = (
+        codec != codecs.IDENTITY
+        and not request.META.get("HTTP_RANGE")
+        and accepts_encoding(request, codec)
+    )
+    etag = payload_etag(digest, codec if encoded else None)
+
+    not_modified = conditional_response(request, etag, last_modified)
+    offloaded = None
+    if not_modified is None and (encoded or codec == codecs.IDENTITY):
+        # The bytes to send are exactly the stored file, so the proxy can send them
+        offloaded = offload_response(store, path, content_type, filename)
+
+    if not_modified is not None:
+        response = not_modified
+    elif offloaded is not None:
+        response = offloaded
+        if encoded:
+            response["Content-Encoding"] = codec
+        else:
+            response["Accept-Ranges"] = "bytes"
+        set_validators(response, etag, last_modified)
+    elif encoded:
+        response = PayloadResponse(
+            open(path, "rb"), content_type=content_type, as_attachment=True, filename=filename
+        )
+        response["Content-Encoding"] = codec
+        set_validators(response, etag, last_modified)
+    else:
+        stream = codecs.open_decoded(open(path, "rb"), codec)
+        response = payload_response(
+            request, stream, size, content_type, filename, etag, last_modified
+        )
+
+    if not encoded and response.status_code in (200, 206):
+        set_digest_headers(response, digest)
+    if codec != codecs.IDENTITY:
+        patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+def redirect_download_response(
+    request, remote, digest, content_type, filename, last_modified=None
+):
+    """
+    Send the client to a presigned URL of a payload in object storage. The bytes,
+    including range requests, are then served by the storage service; this view only
+    authorizes the download. Conditional requests are still answered here.
+    """
+    etag = payload_etag(digest)
+    not_modified = conditional_response(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    response = HttpResponseRedirect(remote.download_url(digest, filename, content_type))
+    # The URL expires; never let a cache replay it
+    response["Cache-Control"] = "private, no-store"
+    return response
+
+
+class _ZipStreamBuffer:
+    """Write-only sink that lets ``zipfile`` write to a response without seeking."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def iter_zip_stream(entries):
+    """
+    Build a ZIP archive on the fly from stored payloads.
+
+    Entries are written uncompressed with trailing data descriptors, so nothing is
+    buffered beyond one read block and no temporary file is needed.
+
+    Args:
+        entries (Iterable[tuple[str, str, int, datetime]]): ``(archive path, digest,
+            size, modified time)`` for every file to include
+    """
+    store = get_blob_store()
+    block_size = settings.FILE_DOWNLOAD_CHUNK_SIZE
+    buffer = _ZipStreamBuffer()
+
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for arcname, digest, size, modified in entries:
+            info = zipfile.ZipInfo(arcname, date_time=modified.timetuple()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            # Knowing the size up front lets zipfile pick ZIP64 records when needed
+            info.file_size = size
+            with store.open(digest) as payload, archive.open(info, "w") as entry:
+                for block in iter(lambda: payload.read(block_size), b""):
+                    entry.write(block)
+                    yield buffer.drain()
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def zip_stream_response(entries, filename):
+    """Stream a ZIP of the given ``(archive path, digest, size, modified)`` entries."""
+    response = StreamingHttpResponse(
+        (chunk for chunk in iter_zip_stream(entries) if chunk),
+        content_type="application/zip",
+    )
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    return response
@@ -0,0 +1,423 @@
+"""
+Reclaiming space in the blob store.
+
+Deleting file rows only drops references (see Storage.signals); the bytes stay on disk
+until a sweep removes payloads nothing points at any more. The sweep never trusts
+``Blob.ref_count`` alone: candidates are re-checked against the file tables, and
+payloads written or re-used within the grace period are always kept, so an upload
+that is about to take a reference cannot lose its bytes.
+"""
+import logging
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .blob_store import get_blob_store
+from .models import Blob, Direct_Upload, Image_Rendition, Preview, Upload_Session
+
+logger = logging.getLogger(__name__)
+
+# (app label, model, digest field, size field) of every table that references blobs
+BLOB_REFERENCES = [
+    ("Tender", "Tender_Files", "file_hash", "file_size"),
+    ("Bit", "Bit_Files", "file_hash", "file_size"),
+    ("User", "VAT_Certificate_Manager", "File_Hash", "File_Size"),
+    ("Storage", "Preview_Image", "image_hash", "size"),
+    ("Storage", "Preview", "linearized_hash", "linearized_size"),
+    ("Storage", "Image_Rendition", "image_hash", "size"),
+]
+
+# The tables whose rows are files users uploaded; previews and renditions live as long
+# as one of them
+FILE_REFERENCES = BLOB_REFERENCES[:3]
+
+
+def iter_reference_models():
+    for app_label, model_name, hash_field, size_field in BLOB_REFERENCES:
+        yield apps.get_model(app_label, model_name), hash_field, size_field
+
+
+def referenced_digests(digests):
+    """Return the subset of ``digests`` that some file row still references."""
+    referenced = set()
+    for model, hash_field, _ in iter_reference_models():
+        referenced.update(
+            model.objects.filter(**{f"{hash_field}__in": digests}).values_list(
+                hash_field, flat=True
+            )
+        )
+    return referenced
+
+
+def reconcile_ref_counts():
+    """
+    Recompute every blob's reference count from the file tables.
+
+    Blob rows missing for referenced payloads are recreated.
+
+    Returns:
+        dict: Number of counts corrected and rows created
+    """
+    actual = Counter()
+    sizes = {}
+    for model, hash_field, size_field in iter_reference_models():
+        rows = (
+            model.objects.exclude(**{f"{hash_field}__isnull": True})
+            .values_list(hash_field)
+            .annotate(refs=Count("pk"), size=Max(size_field))
+            .order_by()
+        )
+        for digest, refs, size in rows:
+            actual[digest] += refs
+            sizes[digest] = size
+
+    corrected = 0
+    by_count = {}
+    for digest, ref_count in Blob.objects.values_list("digest", "ref_count").iterator():
+        refs = actual.pop(digest, 0)
+        if refs != ref_count:
+            by_count.setdefault(refs, []).append(digest)
+            corrected += 1
+    for refs, digests in by_count.items():
+        Blob.objects.filter(digest__in=digests).update(ref_count=refs)
+
+    # Whatever is left is referenced but has no Blob row
+    store = get_blob_store()
+    created = []
+    for digest, refs in actual.items():
+        location = store.locate(digest)
+        codec = location[1] if location else "identity"
+        stored_size = location[0].stat().st_size if location else None
+        tier = Blob.ARCHIVE if location and store.is_archived(location[0]) else Blob.HOT
+        if location is None and store.remote is not None and store.remote.exists(digest):
+            tier = Blob.OBJECT
+        created.append(
+            Blob(
+                digest=digest,
+                size=sizes[digest],
+                codec=codec,
+                stored_size=stored_size,
+                tier=tier,
+                ref_count=refs,
+            )
+        )
+    Blob.objects.bulk_create(created, ignore_conflicts=True)
+
+    return {"ref_counts_corrected": corrected, "blob_rows_created": len(created)}
+
+
+def _older_than(path, cutoff):
+    try:
+        return path.stat().st_mtime < cutoff
+    except FileNotFoundError:
+        return False
+
+
+def sweep_blobs(grace_period, batch_size=100, pause=0.0, dry_run=False):
+    """
+    Delete unreferenced payloads, ``batch_size`` at a time.
+
+    A payload is removed when its Blob row has no references (or it has no row at all),
+    no file row points at it, and it was not written or re-used within ``grace_period``.
+
+    Args:
+        grace_period (timedelta): Minimum age of a payload before it can be removed
+        batch_size (int): Payloads handled per batch
+        pause (float): Seconds to sleep between batches, to limit the I/O load
+        dry_run (bool): Only report what would be removed
+
+    Returns:
+        dict: Number of payloads removed and bytes reclaimed
+    """
+    store = get_blob_store()
+    cutoff = time.time() - grace_period.total_seconds()
+    removed = 0
+    reclaimed = 0
+
+    def flush(batch):
+        nonlocal removed, reclaimed
+        digests = [digest for digest, _ in batch]
+        referenced = referenced_digests(digests)
+        live = set(
+            Blob.objects.filter(digest__in=digests, ref_count__gt=0).values_list(
+                "digest", flat=True
+            )
+        )
+        doomed = [
+            (digest, path)
+            for digest, path in batch
+            if digest not in referenced and digest not in live and _older_than(path, cutoff)
+        ]
+        if not doomed:
+            return
+        if not dry_run:
+            with transaction.atomic():
+                Blob.objects.filter(
+                    digest__in=[digest for digest, _ in doomed], ref_count=0
+                ).delete()
+        for digest, path in doomed:
+            try:
+                size = path.stat().st_size
+                if not dry_run:
+                    os.unlink(path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+            reclaimed += size
+            logger.debug(f"Removed unreferenced payload {digest} ({size} bytes)")
+
+    batch = []
+    for digest, path in store.iter_payloads():
+        if not _older_than(path, cutoff):
+            continue
+        batch.append((digest, path))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+            if pause:
+                time.sleep(pause)
+    if batch:
+        flush(batch)
+
+    # Rows whose payload is already gone from disk
+    orphan_rows = Blob.objects.filter(
+        ref_count=0, Created_At__lt=timezone.now() - grace_period
+    ).values_list("digest", flat=True)
+    stale = [digest for digest in orphan_rows.iterator() if not store.exists(digest)]
+    if stale and not dry_run:
+        stale = list(set(stale) - referenced_digests(stale))
+        Blob.objects.filter(digest__in=stale, ref_count=0).delete()
+
+    return {
+        "payloads_removed": removed,
+        "bytes_reclaimed": reclaimed,
+        "blob_rows_removed": len(stale),
+    }
+
+
+def _sweep_derived(model, grace_period, dry_run):
+    rows = model.objects.filter(Updated_At__lt=timezone.now() - grace_period)
+    for app_label, model_name, hash_field, _ in FILE_REFERENCES:
+        file_model = apps.get_model(app_label, model_name)
+        rows = rows.exclude(source_hash__in=file_model.objects.values(hash_field))
+    count = rows.count()
+    if count and not dry_run:
+        # Delete row by row so the post_delete signals release their blobs
+        for row in rows.iterator():
+            row.delete()
+    return count
+
+
+def sweep_remote_blobs(grace_period, batch_size=100, dry_run=False):
+    """
+    Delete unreferenced objects from the object store, with the same checks as
+    ``sweep_blobs``: no references, no file row pointing at them, and older than
+    ``grace_period`` (which also spares direct uploads not attached yet).
+
+    Returns:
+        dict: Number of objects removed and bytes reclaimed
+    """
+    remote = get_blob_store().remote
+    if remote is None:
+        return {}
+    cutoff = timezone.now() - grace_period
+    removed = 0
+    reclaimed = 0
+
+    def flush(batch):
+        nonlocal removed, reclaimed
+        digests = [digest for digest, _ in batch]
+        keep = referenced_digests(digests) | set(
+            Blob.objects.filter(digest__in=digests, ref_count__gt=0).values_list(
+                "digest", flat=True
+            )
+        )
+        pending = set(
+            Direct_Upload.objects.filter(file_hash__in=digests).values_list(
+                "file_hash", flat=True
+            )
+        )
+        for digest, size in batch:
+            if digest in keep or digest in pending:
+                continue
+            if not dry_run:
+                Blob.objects.filter(digest=digest, ref_count=0).delete()
+                remote.delete(digest)
+            removed += 1
+            reclaimed += size
+            logger.debug(f"Removed unreferenced object {digest} ({size} bytes)")
+
+    batch = []
+    for digest, last_modified, size in remote.iter_payloads():
+        if last_modified >= cutoff:
+            continue
+        batch.append((digest, size))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    return {"objects_removed": removed, "object_bytes_reclaimed": reclaimed}
+
+
+def sweep_previews(grace_period, dry_run=False):
+    """
+    Remove the previews and review renditions of payloads no file row references any
+    more. Their images are released, and reclaimed by the next blob sweep.
+
+    Returns:
+        dict: Number of previews and renditions removed
+    """
+    return {
+        "previews_removed": _sweep_derived(Preview, grace_period, dry_run),
+        "renditions_removed": _sweep_derived(Image_Rendition, grace_period, dry_run),
+    }
+
+
+def sweep_upload_state(grace_period, session_max_age, dry_run=False):
+    """
+    Remove abandoned upload state: expired resumable upload sessions with their chunks,
+    expired direct uploads with their objects, chunk directories without a session, and
+    leftover spool files.
+
+    Returns:
+        dict: Number of sessions, direct uploads, chunk directories and spool files
+        removed and bytes reclaimed
+    """
+    store = get_blob_store()
+    reclaimed = 0
+
+    def tree_size(path):
+        return sum(entry.stat().st_size for entry in path.rglob("*") if entry.is_file())
+
+    expired = list(
+        Upload_Session.objects.filter(
+            Created_At__lt=timezone.now() - session_max_age
+        ).values_list("session_id", flat=True)
+    )
+    for session_id in expired:
+        session_dir = store.root / "sessions" / str(session_id)
+        if session_dir.is_dir():
+            reclaimed += tree_size(session_dir)
+        if not dry_run:
+            store.discard_session(session_id)
+    if expired and not dry_run:
+        Upload_Session.objects.filter(session_id__in=expired).delete()
+
+    cutoff = time.time() - grace_period.total_seconds()
+    sessions_root = store.root / "sessions"
+    orphan_dirs = 0
+    if sessions_root.is_dir():
+        known = {
+            str(session_id)
+            for session_id in Upload_Session.objects.values_list("session_id", flat=True)
+        }
+        for session_dir in sessions_root.iterdir():
+            if session_dir.name in known or not _older_than(session_dir, cutoff):
+                continue
+            reclaimed += tree_size(session_dir)
+            orphan_dirs += 1
+            if not dry_run:
+                store.discard_session(session_dir.name)
+
+    # Direct uploads never attached, and upload objects no upload row points at
+    expired_direct = list(
+        Direct_Upload.objects.filter(
+            Created_At__lt=timezone.now() - session_max_age
+        ).values_list("upload_id", flat=True)
+    )
+    if expired_direct and not dry_run:
+        Direct_Upload.objects.filter(upload_id__in=expired_direct).delete()
+    direct_uploads = len(expired_direct)
+    if store.remote is not None:
+        pending = {
+            str(upload_id)
+            for upload_id in Direct_Upload.objects.exclude(
+                upload_id__in=expired_direct
+            ).values_list("upload_id", flat=True)
+        }
+        upload_cutoff = timezone.now() - grace_period
+        for upload_id, last_modified, size in store.remote.iter_uploads():
+            if upload_id in pending or last_modified >= upload_cutoff:
+                continue
+            reclaimed += size
+            if not dry_run:
+                store.remote.delete_upload(upload_id)
+
+    spool_files = 0
+    tmp_root = store.root / "tmp"
+    if tmp_root.is_dir():
+        for tmp_file in tmp_root.iterdir():
+            if not _older_than(tmp_file, cutoff):
+                continue
+            try:
+                reclaimed += tmp_file.stat().st_size
+                if not dry_run:
+                    tmp_file.unlink()
+                spool_files += 1
+            except FileNotFoundError:
+                continue
+
+    return {
+        "upload_sessions_removed": len(expired),
+        "direct_uploads_removed": direct_uploads,
+        "chunk_dirs_removed": orphan_dirs,
+        "spool_files_removed": spool_files,
+        "upload_bytes_reclaimed": reclaimed,
+    }
+
+
+def find_missing_payloads():
+    """
+    Check that every file row's payload is present in the blob store.
+
+    Returns:
+        list[tuple[str, int, str]]: ``(model name, primary key, digest)`` of every file
+        row whose payload is missing
+    """
+    store = get_blob_store()
+    missing = []
+    for model, hash_field, _ in iter_reference_models():
+        rows = model.objects.exclude(**{f"{hash_field}__isnull": True}).values_list(
+            "pk", hash_field
+        )
+        present = {}
+        for pk, digest in rows.iterator():
+            if digest not in present:
+                present[digest] = store.exists(digest)
+            if not present[digest]:
+                missing.append((model.__name__, pk, digest))
+    return missing
+
+
+def collect_blobs(dry_run=False, verify=True, batch_size=100, pause=0.0):
+    """
+    Run a full storage maintenance pass: reconcile reference counts, sweep unreferenced
+    payloads and abandoned uploads, then check every file row still has its payload.
+
+    Returns:
+        dict: Counters from every step, plus ``missing_payloads``
+    """
+    grace_period = timedelta(seconds=settings.BLOB_GC_GRACE_PERIOD)
+    report = {}
+    if not dry_run:
+        report.update(reconcile_ref_counts())
+    report.update(sweep_previews(grace_period, dry_run))
+    report.update(sweep_blobs(grace_period, batch_size, pause, dry_run))
+    report.update(sweep_remote_blobs(grace_period, batch_size, dry_run))
+    report.update(
+        sweep_upload_state(
+            grace_period, timedelta(seconds=settings.UPLOAD_SESSION_MAX_AGE), dry_run
+        )
+    )
+    if verify:
+        report["missing_payloads"] = find_missing_payloads()
+    return report
@@ -0,0 +1,37 @@
+"""
+Image re-encoding run in worker processes.
+
+This module must not import Django: ``ProcessPoolExecutor`` workers are spawned fresh
+and only import what the submitted function needs.
+"""
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Renditions are disabled without Pillow
+    Image = None
+
+
+def render_review_image(src_path, dst_path, max_dimension, quality):
+    """
+    Write a JPEG copy of an image, scaled to fit in ``max_dimension`` pixels.
+
+    EXIF orientation is applied so phone photos come out upright, and transparency is
+    flattened onto white.
+
+    Returns:
+        tuple[int, int, int, int]: Width and height of the rendition, then of the original
+    """
+    with Image.open(src_path) as image:
+        original_size = image.size
+        # Let the JPEG decoder scale down while decoding instead of expanding every pixel
+        image.draft("RGB", (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        image.save(dst_path, "JPEG", quality=quality, optimize=True, progressive=True)
+        return image.width, image.height, original_size[0], original_size[1]
@@ -0,0 +1,89 @@
+"""
+Checking stored payloads against their digests.
+
+Every payload is stored under the SHA-256 digest computed while it was uploaded, so
+re-hashing its original bytes must give its file name back. A mismatch means the file
+was damaged on disk (or in the archive) after it was written.
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from . import codecs
+from .blob_store import get_blob_store
+from .models import Blob
+
+logger = logging.getLogger(__name__)
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_stored_file(path, block_size=READ_BLOCK_SIZE):
+    """
+    Hash the original bytes of one stored file, decompressing as needed.
+
+    Returns:
+        tuple[str, int]: SHA-256 hex digest and size of the original bytes
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    with codecs.open_decoded(open(path, "rb"), codecs.codec_for_path(path)) as payload:
+        for block in iter(lambda: payload.read(block_size), b""):
+            sha256.update(block)
+            size += len(block)
+    return sha256.hexdigest(), size
+
+
+def _check(entry):
+    digest, path = entry
+    try:
+        actual, size = hash_stored_file(path)
+    except Exception as e:  # Truncated or corrupt compressed data
+        return digest, path, None, None, str(e)
+    return digest, path, actual, size, None
+
+
+def verify_payloads(workers=4, batch_size=256):
+    """
+    Re-hash every stored payload, ``workers`` files at a time.
+
+    Hashing and reading release the GIL, so threads keep several disks or a network
+    volume busy without extra processes. Files are handed out in batches, so the walk
+    never holds more than ``batch_size`` paths in memory.
+
+    Returns:
+        dict: Number of payloads and bytes checked, and the ``mismatches`` found as
+        ``(digest, path, problem)`` tuples
+    """
+    store = get_blob_store()
+    checked = 0
+    checked_bytes = 0
+    mismatches = []
+    payloads = store.iter_payloads()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="verify") as executor:
+        while True:
+            batch = list(islice(payloads, batch_size))
+            if not batch:
+                break
+            sizes = dict(
+                Blob.objects.filter(digest__in=[digest for digest, _ in batch]).values_list(
+                    "digest", "size"
+                )
+            )
+            for digest, path, actual, size, error in executor.map(_check, batch):
+                checked += 1
+                if error is not None:
+                    problem = f"unreadable: {error}"
+                elif actual != digest:
+                    problem = f"content hashes to {actual}"
+                elif digest in sizes and sizes[digest] != size:
+                    problem = f"size is {size}, recorded {sizes[digest]}"
+                else:
+                    checked_bytes += size
+                    continue
+                logger.error(f"Payload {digest} at {path} is damaged: {problem}")
+                mismatches.append((digest, str(path), problem))
+
+    return {"payloads_checked": checked, "bytes_checked": checked_bytes, "mismatches": mismatches}
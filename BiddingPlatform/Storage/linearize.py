@@ -0,0 +1,120 @@
+"""
+Linearized ("fast web view") copies of PDF attachments.
+
+A linearized PDF starts with everything needed to show its first page, so a viewer
+fetching it with range requests can render page 1 after the first few hundred KB
+instead of the whole file. The copy is written by qpdf (through pikepdf) in the same
+background pass as the preview and stored as its own blob. Downloads serve the
+original payload, which is never changed (its checksum, size and any digital signature
+stay valid); clients opt into the copy with ``?linearized=true``.
+
+For each PDF, ``Preview.first_page_bytes`` records how many bytes a viewer needs before
+it can render page 1 of the original (the whole file, unless it was already
+linearized) and ``linearized_first_page_bytes`` the same for the copy, taken from the
+``/E`` entry of its linearization dictionary.
+"""
+import logging
+import os
+import re
+
+from django.conf import settings
+from django.db import transaction
+
+from .blob_store import StoredPayload, get_blob_store
+from .models import Blob, Preview
+
+try:
+    import pikepdf
+except ImportError:  # Linearization is skipped without pikepdf
+    pikepdf = None
+
+logger = logging.getLogger(__name__)
+
+# The linearization dictionary must be the first object in the file
+LINEARIZATION_SNIFF_LENGTH = 1024
+LINEARIZED_RE = re.compile(rb"/Linearized\s[^>]*?/E\s+(\d+)", re.DOTALL)
+
+
+def first_page_end(head):
+    """
+    Return the ``/E`` offset (end of the first page's objects) of a linearized PDF.
+
+    Args:
+        head (bytes): The first ``LINEARIZATION_SNIFF_LENGTH`` bytes of the file
+
+    Returns:
+        int | None: The offset, or None if the PDF is not linearized
+    """
+    match = LINEARIZED_RE.search(head)
+    return int(match.group(1)) if match else None
+
+
+def _read_head(store, digest):
+    with store.open(digest) as payload:
+        return payload.read(LINEARIZATION_SNIFF_LENGTH)
+
+
+def linearize_payload(digest):
+    """Store a linearized copy of a PDF payload and record first-page byte counts."""
+    if pikepdf is None or not settings.PDF_LINEARIZE:
+        return
+    preview = Preview.objects.filter(source_hash=digest).first()
+    if preview is None or preview.linearized_hash:
+        return
+
+    store = get_blob_store()
+    original_size = Blob.objects.filter(digest=digest).values_list("size", flat=True).first()
+    already_linearized = first_page_end(_read_head(store, digest))
+    if already_linearized is not None:
+        Preview.objects.filter(source_hash=digest).update(
+            first_page_bytes=already_linearized
+        )
+        return
+
+    fd, tmp_path = store.spool()
+    os.close(fd)
+    try:
+        with store.local_path(digest) as path, pikepdf.open(path) as pdf:
+            pdf.save(tmp_path, linearize=True)
+        # Kept uncompressed: viewers fetch the copy with range requests, which compressed
+        # payloads can only answer by decoding from the start
+        with open(tmp_path, "rb") as linearized:
+            chunks = iter(lambda: linearized.read(1024 * 1024), b"")
+            payload = StoredPayload(*store.save(chunks, "application/pdf", compress=False))
+    except Exception as e:
+        logger.warning(f"Could not linearize {digest}: {e}")
+        return
+    finally:
+        os.unlink(tmp_path)
+
+    first_page_bytes = first_page_end(_read_head(store, payload.digest))
+    with transaction.atomic():
+        Blob.acquire_many([payload])
+        Preview.objects.filter(source_hash=digest).update(
+            linearized_hash=payload.digest,
+            linearized_size=payload.size,
+            first_page_bytes=original_size,
+            linearized_first_page_bytes=first_page_bytes,
+        )
+    logger.info(
+        f"Linearized {digest}: first page after {first_page_bytes} bytes "
+        f"instead of {original_size}"
+    )
+
+
+def linearized_payload(digest, size, content_type):
+    """
+    Pick the payload to serve for ``?linearized=true``: the linearized copy of a PDF
+    when it is ready, otherwise the original.
+
+    Returns:
+        tuple[str, int]: Digest and size of the payload to serve
+    """
+    if (content_type or "").lower() != "application/pdf":
+        return digest, size
+    linearized = (
+        Preview.objects.filter(source_hash=digest, linearized_hash__isnull=False)
+        .values_list("linearized_hash", "linearized_size")
+        .first()
+    )
+    return linearized or (digest, size)
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Storage.tiering import archive_closed_tender_files
+
+
+class Command(BaseCommand):
+    help = (
+        "Move attachments of tenders that were awarded and closed more than N days ago "
+        "into the compressed archive store."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.BLOB_ARCHIVE_AFTER_DAYS,
+            help="Days since the tender's end date (default: BLOB_ARCHIVE_AFTER_DAYS).",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Archive at most this many payloads in this run.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be archived without moving anything.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = archive_closed_tender_files(
+                options["days"], limit=options["limit"], dry_run=options["dry_run"]
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        prefix = "[dry run] " if options["dry_run"] else ""
+        for key, value in report.items():
+            self.stdout.write(f"{prefix}{key}: {value}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix}Freed {report['hot_bytes_freed'] / (1024 * 1024):.1f} MiB of hot storage"
+            )
+        )
@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Storage.gc import collect_blobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Reclaim blob store space: reconcile reference counts, delete unreferenced "
+        "payloads and abandoned uploads, and check every file row still has its payload."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be removed without deleting anything.",
+        )
+        parser.add_argument(
+            "--no-verify",
+            action="store_true",
+            help="Skip checking that every file row's payload is present.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Payloads examined per batch (default: 100).",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between batches to throttle disk I/O (default: 0).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Run forever, starting a new pass every INTERVAL seconds.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.run_pass(options)
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    def run_pass(self, options):
+        report = collect_blobs(
+            dry_run=options["dry_run"],
+            verify=not options["no_verify"],
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+        )
+        missing = report.pop("missing_payloads", [])
+        reclaimed = (
+            report["bytes_reclaimed"]
+            + report["upload_bytes_reclaimed"]
+            + report.get("object_bytes_reclaimed", 0)
+        )
+
+        prefix = "[dry run] " if options["dry_run"] else ""
+        for key, value in report.items():
+            self.stdout.write(f"{prefix}{key}: {value}")
+        self.stdout.write(
+            self.style.SUCCESS(f"{prefix}Reclaimed {reclaimed / (1024 * 1024):.1f} MiB")
+        )
+
+        for model_name, pk, digest in missing:
+            self.stderr.write(
+                self.style.ERROR(f"{model_name} {pk}: payload {digest} is missing")
+            )
+        if missing:
+            self.stderr.write(
+                self.style.ERROR(f"{len(missing)} file row(s) have no payload in the store")
+            )
@@ -0,0 +1,37 @@
+from statistics import median
+
+from django.core.management.base import BaseCommand
+
+from Storage.models import Preview
+
+
+class Command(BaseCommand):
+    help = (
+        "Report how many bytes viewers must fetch before they can render the first page "
+        "of stored PDFs, for the originals and their linearized copies."
+    )
+
+    def handle(self, *args, **options):
+        rows = list(
+            Preview.objects.filter(
+                first_page_bytes__isnull=False, linearized_first_page_bytes__isnull=False
+            ).values_list("first_page_bytes", "linearized_first_page_bytes")
+        )
+        pending = Preview.objects.filter(
+            status=Preview.READY, first_page_bytes__isnull=True
+        ).count()
+        self.stdout.write(f"linearized_pdfs: {len(rows)}")
+        self.stdout.write(f"not_yet_linearized: {pending}")
+        if not rows:
+            return
+
+        before = [original for original, _ in rows]
+        after = [linearized for _, linearized in rows]
+        self.stdout.write(f"bytes_to_first_page_before: {sum(before)}")
+        self.stdout.write(f"bytes_to_first_page_after: {sum(after)}")
+        self.stdout.write(f"median_before: {median(before):.0f}")
+        self.stdout.write(f"median_after: {median(after):.0f}")
+        reduction = 1 - sum(after) / sum(before) if sum(before) else 0
+        self.stdout.write(
+            self.style.SUCCESS(f"Bytes to first page reduced by {reduction:.1%}")
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Storage.tiering import move_tender_files_to_object_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Move tender attachments to the configured S3-compatible object store, so "
+        "downloads are served there through presigned URLs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Move at most this many payloads in this run.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be moved without moving anything.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = move_tender_files_to_object_store(
+                limit=options["limit"], dry_run=options["dry_run"]
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        prefix = "[dry run] " if options["dry_run"] else ""
+        for key, value in report.items():
+            self.stdout.write(f"{prefix}{key}: {value}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix}Freed {report['local_bytes_freed'] / (1024 * 1024):.1f} MiB of local storage"
+            )
+        )
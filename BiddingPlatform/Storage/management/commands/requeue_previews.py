@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Storage.previews import requeue_stale_previews
+from Storage.renditions import requeue_stale_renditions
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue again the PDF previews and image renditions still pending after a "
+        "timeout, whose background work was lost (e.g. when the server restarted)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=settings.PREVIEW_PENDING_TIMEOUT,
+            help="Seconds since the row was last touched (default: PREVIEW_PENDING_TIMEOUT).",
+        )
+
+    def handle(self, *args, **options):
+        timeout = timedelta(seconds=options["older_than"])
+        previews = requeue_stale_previews(timeout)
+        renditions = requeue_stale_renditions(timeout)
+        self.stdout.write(f"previews_requeued: {previews}")
+        self.stdout.write(f"renditions_requeued: {renditions}")
+        self.stdout.write(self.style.SUCCESS(f"Requeued {previews + renditions} item(s)"))
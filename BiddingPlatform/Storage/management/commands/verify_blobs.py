@@ -0,0 +1,32 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Storage.integrity import verify_payloads
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-hash every stored payload (hot and archived) and report the ones that no "
+        "longer match their SHA-256 digest."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=min(8, os.cpu_count() or 1),
+            help="Payloads hashed in parallel (default: CPU count, at most 8).",
+        )
+
+    def handle(self, *args, **options):
+        report = verify_payloads(workers=options["workers"])
+        mismatches = report.pop("mismatches")
+
+        for key, value in report.items():
+            self.stdout.write(f"{key}: {value}")
+        for digest, path, problem in mismatches:
+            self.stderr.write(self.style.ERROR(f"{digest} ({path}): {problem}"))
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} payload(s) do not match their digest")
+        self.stdout.write(self.style.SUCCESS("Every payload matches its digest"))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('Created_At', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'blob',
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:37
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Storage', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Upload_Session',
+            fields=[
+                ('session_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('target_type', models.CharField(choices=[('tender', 'Tender File'), ('bit', 'Bit File')], max_length=10)),
+                ('target_id', models.PositiveIntegerField()),
+                ('admin_type', models.CharField(blank=True, choices=[('technical', 'Technical Admin'), ('commercial', 'Commercial Admin')], max_length=50)),
+                ('file_name', models.CharField(max_length=100)),
+                ('file_type', models.CharField(max_length=255)),
+                ('file_size', models.PositiveBigIntegerField()),
+                ('file_hash', models.CharField(max_length=64)),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('Created_At', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(db_column='created_by_id', on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'upload_session',
+            },
+        ),
+        migrations.CreateModel(
+            name='Upload_Chunk',
+            fields=[
+                ('Id', models.AutoField(primary_key=True, serialize=False)),
+                ('index', models.PositiveIntegerField()),
+                ('size', models.PositiveIntegerField()),
+                ('chunk_hash', models.CharField(max_length=64)),
+                ('Received_At', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(db_column='session_id', on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='Storage.upload_session')),
+            ],
+            options={
+                'db_table': 'upload_chunk',
+                'unique_together': {('session', 'index')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Storage', '0002_upload_session_upload_chunk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='codec',
+            field=models.CharField(choices=[('identity', 'Uncompressed'), ('gzip', 'gzip'), ('zstd', 'Zstandard')], default='identity', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='blob',
+            name='stored_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Storage', '0003_blob_codec'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='tier',
+            field=models.CharField(choices=[('hot', 'Hot storage'), ('archive', 'Archive storage')], default='hot', max_length=10),
+        ),
+    ]
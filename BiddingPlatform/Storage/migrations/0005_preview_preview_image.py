@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Storage', '0004_blob_tier'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Preview',
+            fields=[
+                ('source_hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('page_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('Created_At', models.DateTimeField(auto_now_add=True)),
+                ('Updated_At', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'preview',
+            },
+        ),
+        migrations.CreateModel(
+            name='Preview_Image',
+            fields=[
+                ('Id', models.AutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('thumbnail', 'Thumbnail'), ('page', 'Page')], max_length=10)),
+                ('page', models.PositiveIntegerField()),
+                ('image_hash', models.CharField(db_index=True, max_length=64)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('size', models.PositiveIntegerField()),
+                ('preview', models.ForeignKey(db_column='source_hash', on_delete=django.db.models.deletion.CASCADE, related_name='images', to='Storage.preview')),
+            ],
+            options={
+                'db_table': 'preview_image',
+                'unique_together': {('preview', 'kind', 'page')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Storage', '0005_preview_preview_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Pdf_Page',
+            fields=[
+                ('Id', models.AutoField(primary_key=True, serialize=False)),
+                ('page', models.PositiveIntegerField()),
+                ('width', models.FloatField()),
+                ('height', models.FloatField()),
+                ('text', models.TextField(blank=True)),
+                ('preview', models.ForeignKey(db_column='source_hash', on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='Storage.preview')),
+            ],
+            options={
+                'db_table': 'pdf_page',
+                'unique_together': {('preview', 'page')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Storage', '0006_pdf_page'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='preview',
+            name='first_page_bytes',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='preview',
+            name='linearized_first_page_bytes',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='preview',
+            name='linearized_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='preview',
+            name='linearized_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
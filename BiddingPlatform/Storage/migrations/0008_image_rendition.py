@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Storage', '0007_preview_linearized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Image_Rendition',
+            fields=[
+                ('source_hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('image_hash', models.CharField(blank=True, db_index=True, max_length=64, null=True)),
+                ('size', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('original_width', models.PositiveIntegerField(blank=True, null=True)),
+                ('original_height', models.PositiveIntegerField(blank=True, null=True)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('Created_At', models.DateTimeField(auto_now_add=True)),
+                ('Updated_At', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'image_rendition',
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:09
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Storage', '0008_image_rendition'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='blob',
+            name='tier',
+            field=models.CharField(choices=[('hot', 'Hot storage'), ('archive', 'Archive storage'), ('object', 'Object storage')], default='hot', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='Direct_Upload',
+            fields=[
+                ('upload_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('policy', models.CharField(max_length=50)),
+                ('file_name', models.CharField(max_length=100)),
+                ('file_type', models.CharField(max_length=255)),
+                ('file_size', models.PositiveBigIntegerField()),
+                ('file_hash', models.CharField(max_length=64)),
+                ('Created_At', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(db_column='created_by_id', on_delete=django.db.models.deletion.CASCADE, related_name='direct_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'direct_upload',
+            },
+        ),
+    ]
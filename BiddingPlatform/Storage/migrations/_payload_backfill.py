@@ -0,0 +1,139 @@
+"""
+The payload backfill shared by the Tender, Bit and User data migrations that moved file
+contents out of their tables. It is frozen here rather than using Storage.blob_store, so
+later changes to the store cannot break replaying those migrations; the module name
+starts with an underscore so the migration loader does not take it for a migration.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+# Payloads are written uncompressed as <BLOB_STORAGE_ROOT>/ab/cd/<sha256>, a layout every
+# version of the store reads.
+READ_CHUNK_SIZE = 1024 * 1024
+BATCH_SIZE = 100
+
+
+def iter_column_chunks(connection, table, column, pk_column, pk):
+    """Yield the value of one BLOB cell in slices, without loading it whole."""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT LENGTH({quote(column)}) FROM {quote(table)} WHERE {quote(pk_column)} = %s",
+            [pk],
+        )
+        row = cursor.fetchone()
+    length = row[0] if row and row[0] is not None else 0
+
+    function = "DBMS_LOB.SUBSTR" if connection.vendor == "oracle" else "SUBSTR"
+    slice_sql = (
+        f"SELECT {function}({quote(column)}, %s, %s) FROM {quote(table)} "
+        f"WHERE {quote(pk_column)} = %s"
+    )
+    offset = 0
+    while offset < length:
+        size = min(READ_CHUNK_SIZE, length - offset)
+        params = [size, offset + 1] if connection.vendor == "oracle" else [offset + 1, size]
+        with connection.cursor() as cursor:
+            cursor.execute(slice_sql, params + [pk])
+            chunk = cursor.fetchone()[0]
+        chunk = bytes(chunk) if chunk is not None else b""
+        if not chunk:
+            break
+        offset += len(chunk)
+        yield chunk
+
+
+def write_payload(root, chunks):
+    """Store a payload under its SHA-256 digest; returns the digest and size."""
+    tmp_dir = root / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            for chunk in chunks:
+                sha256.update(chunk)
+                size += len(chunk)
+                tmp_file.write(chunk)
+        digest = sha256.hexdigest()
+        final_path = root / digest[:2] / digest[2:4] / digest
+        if final_path.is_file():
+            os.unlink(tmp_path)
+        else:
+            final_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return digest, size
+
+
+def move_file_data_to_blob_store(apps, schema_editor, app_label, model_name, data_field,
+                                 hash_field):
+    """
+    Copy every remaining in-database payload of one file model into the blob store, in
+    primary-key order, BATCH_SIZE rows per short transaction. Rows that already have a
+    digest are skipped, which makes the backfill safe to re-run.
+
+    Rows with neither a payload nor a digest have no file left to serve and would keep
+    the digest column from becoming NOT NULL, so they are deleted.
+
+    Args:
+        app_label (str): App of the file model
+        model_name (str): Name of the file model
+        data_field (str): Name of its in-database payload field
+        hash_field (str): Name of its payload digest field
+    """
+    model = apps.get_model(app_label, model_name)
+    blob_model = apps.get_model("Storage", "Blob")
+    connection = schema_editor.connection
+    root = Path(settings.BLOB_STORAGE_ROOT)
+
+    table = model._meta.db_table
+    column = model._meta.get_field(data_field).column
+    pk_name = model._meta.pk.name
+    pk_column = model._meta.pk.column
+    # Later states of the Blob model record how a payload is stored
+    blob_fields = {field.name for field in blob_model._meta.get_fields()}
+
+    pending = model.objects.filter(
+        **{f"{hash_field}__isnull": True, f"{data_field}__isnull": False}
+    )
+    last_pk = 0
+    while True:
+        pks = list(
+            pending.filter(**{f"{pk_name}__gt": last_pk})
+            .order_by(pk_name)
+            .values_list(pk_name, flat=True)[:BATCH_SIZE]
+        )
+        if not pks:
+            break
+
+        with transaction.atomic(using=connection.alias):
+            for pk in pks:
+                digest, size = write_payload(
+                    root, iter_column_chunks(connection, table, column, pk_column, pk)
+                )
+                defaults = {"size": size, "ref_count": 1}
+                if "codec" in blob_fields:
+                    defaults.update(codec="identity", stored_size=size)
+                _, created = blob_model.objects.get_or_create(digest=digest, defaults=defaults)
+                if not created:
+                    blob_model.objects.filter(digest=digest).update(
+                        ref_count=F("ref_count") + 1
+                    )
+                model.objects.filter(**{pk_name: pk}).update(**{hash_field: digest})
+        last_pk = pks[-1]
+
+    model.objects.filter(
+        **{f"{hash_field}__isnull": True, f"{data_field}__isnull": True}
+    ).delete()
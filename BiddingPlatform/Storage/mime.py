@@ -0,0 +1,100 @@
+# Number of leading bytes needed to recognise every signature below
+SNIFF_LENGTH = 2048
+
+# (offset, signature, MIME type), checked in order
+MAGIC_SIGNATURES = [
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"II*\x00", "image/tiff"),
+    (0, b"MM\x00*", "image/tiff"),
+    (0, b"BM", "image/bmp"),
+    (0, b"{\\rtf", "application/rtf"),
+    (0, b"\x1f\x8b", "application/gzip"),
+    (0, b"Rar!\x1a\x07", "application/vnd.rar"),
+    (0, b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+]
+
+# Office Open XML packages are ZIP files; the first entries name the document part
+OOXML_MARKERS = [
+    (b"word/", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    (b"xl/", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    (b"ppt/", "application/vnd.openxmlformats-officedocument.presentationml.presentation"),
+]
+
+
+def sniff_content_type(head):
+    """
+    Detect the real type of a payload from its first bytes.
+
+    Args:
+        head (bytes): At least the first ``SNIFF_LENGTH`` bytes (or the whole payload)
+
+    Returns:
+        str | None: The detected MIME type, or None if it could not be recognised
+    """
+    if not head:
+        return None
+
+    for offset, signature, content_type in MAGIC_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return content_type
+
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+
+    if head[:4] == b"PK\x03\x04":
+        for marker, content_type in OOXML_MARKERS:
+            if marker in head:
+                return content_type
+        return "application/zip"
+
+    if b"\x00" not in head:
+        try:
+            head.decode("utf-8")
+        except UnicodeDecodeError as e:
+            # A multi-byte character may be cut at the end of the sniffed window
+            if e.start < len(head) - 3:
+                return None
+        return "text/plain"
+
+    return None
+
+
+# Legacy Office documents all share the OLE compound file signature
+OLE_TYPES = {
+    "application/msword",
+    "application/vnd.ms-excel",
+    "application/vnd.ms-powerpoint",
+}
+
+OOXML_TYPES = {content_type for _, content_type in OOXML_MARKERS}
+
+# Text types a declared type may narrow plain text to. Others (text/html, text/xml...)
+# are rendered or executed by browsers, so such files are recorded as plain text
+TEXT_TYPES = {"text/plain", "text/csv"}
+
+
+def resolve_content_type(detected_type, declared_type):
+    """
+    Combine a sniffed type with the type the client declared.
+
+    Signatures shared by a family of formats cannot tell its members apart, so the
+    declared type is trusted only when it belongs to the sniffed family: an OLE file
+    declared as a Word document, a ZIP declared as an Office Open XML document, or
+    plain text declared as CSV.
+
+    Returns:
+        str | None: The type to record, or None if the payload was not recognised
+    """
+    declared_type = (declared_type or "").split(";")[0].strip().lower()
+    if detected_type == "application/x-ole-storage" and declared_type in OLE_TYPES:
+        return declared_type
+    if detected_type == "application/zip" and declared_type in OOXML_TYPES:
+        return declared_type
+    if detected_type == "text/plain" and declared_type in TEXT_TYPES:
+        return declared_type
+    return detected_type
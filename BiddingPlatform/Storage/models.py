@@ -0,0 +1,352 @@
+import uuid
+from collections import Counter, defaultdict
+
+from django.db import models
+from django.db.models import F
+
+from User.models import AdminType
+
+from .codecs import CODEC_CHOICES, IDENTITY
+
+
+# Create your models here.
+class Blob(models.Model):
+    """
+    A payload stored in the content-addressed blob store.
+
+    The bytes themselves live on the filesystem (see Storage.blob_store); this row only
+    tracks the SHA-256 digest, the size, the codec the bytes are stored with and how
+    many file rows currently reference it.
+    """
+
+    HOT = "hot"
+    ARCHIVE = "archive"
+    OBJECT = "object"
+    TIERS = [
+        (HOT, "Hot storage"),
+        (ARCHIVE, "Archive storage"),
+        (OBJECT, "Object storage"),
+    ]
+
+    digest = models.CharField(max_length=64, primary_key=True)  # SHA-256 hex digest
+    size = models.PositiveBigIntegerField()  # Size of the original payload
+    codec = models.CharField(max_length=10, choices=CODEC_CHOICES, default=IDENTITY)
+    stored_size = models.PositiveBigIntegerField(null=True, blank=True)  # Size on disk
+    tier = models.CharField(max_length=10, choices=TIERS, default=HOT)
+    ref_count = models.PositiveIntegerField(default=0)
+    Created_At = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "blob"
+
+    def __str__(self):
+        return f"{self.digest} ({self.ref_count} refs)"
+
+    @classmethod
+    def acquire(cls, digest, size, codec=IDENTITY, stored_size=None):
+        """
+        Register a new reference to a stored payload, creating the row on first use.
+
+        Args:
+            digest (str): SHA-256 hex digest of the payload
+            size (int): Size of the payload in bytes
+            codec (str): Codec the payload is stored with
+            stored_size (int, optional): Size of the payload on disk
+
+        Returns:
+            Blob: The blob row for the digest
+        """
+        blob, created = cls.objects.get_or_create(
+            digest=digest,
+            defaults={
+                "size": size,
+                "codec": codec,
+                "stored_size": size if stored_size is None else stored_size,
+                "ref_count": 1,
+            },
+        )
+        if not created:
+            cls.objects.filter(digest=digest).update(ref_count=F("ref_count") + 1)
+        return blob
+
+    @classmethod
+    def acquire_many(cls, payloads, tier=HOT):
+        """
+        Register one reference per payload in a constant number of queries.
+
+        Must run inside the transaction that creates the referencing rows.
+
+        Args:
+            payloads (Iterable[StoredPayload]): Staged payloads; a digest may repeat
+            tier (str): Where payloads seen for the first time are stored
+        """
+        payloads = list(payloads)
+        if not payloads:
+            return
+        first_seen = {}
+        for payload in payloads:
+            first_seen.setdefault(payload.digest, payload)
+        cls.objects.bulk_create(
+            [
+                cls(
+                    digest=payload.digest,
+                    size=payload.size,
+                    codec=payload.codec,
+                    stored_size=payload.stored_size,
+                    tier=tier,
+                    ref_count=0,
+                )
+                for payload in first_seen.values()
+            ],
+            ignore_conflicts=True,
+        )
+
+        # Usually every digest gains one reference, so this is a single UPDATE
+        digests_by_count = defaultdict(list)
+        for digest, count in Counter(payload.digest for payload in payloads).items():
+            digests_by_count[count].append(digest)
+        for count, digests in digests_by_count.items():
+            cls.objects.filter(digest__in=digests).update(ref_count=F("ref_count") + count)
+
+    @classmethod
+    def release(cls, digest):
+        """
+        Drop one reference to a stored payload.
+
+        Payloads whose count reaches zero are kept on disk; reclaiming them is left to a
+        sweep so a concurrent upload of the same content never loses its bytes.
+        """
+        if not digest:
+            return
+        cls.objects.filter(digest=digest, ref_count__gt=0).update(
+            ref_count=F("ref_count") - 1
+        )
+
+
+class Upload_Session(models.Model):
+    """
+    A resumable upload of one large file, sent as numbered chunks.
+
+    Chunks may arrive in any order (or in parallel) and be re-sent; once every chunk is
+    present the session is finalized into a Tender_Files or Bit_Files row.
+    """
+
+    TARGET_TYPES = [
+        ("tender", "Tender File"),
+        ("bit", "Bit File"),
+    ]
+
+    session_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(
+        "User.User",
+        on_delete=models.CASCADE,
+        related_name="upload_sessions",
+        db_column="created_by_id",
+    )
+    target_type = models.CharField(max_length=10, choices=TARGET_TYPES)
+    target_id = models.PositiveIntegerField()  # tender_id or bit_id
+    admin_type = models.CharField(
+        max_length=50, choices=AdminType.choices(), blank=True
+    )  # Only used for bit files
+    file_name = models.CharField(max_length=100)
+    file_type = models.CharField(max_length=255)
+    file_size = models.PositiveBigIntegerField()
+    file_hash = models.CharField(max_length=64)  # Expected SHA-256 of the whole file
+    chunk_size = models.PositiveIntegerField()
+    Created_At = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "upload_session"
+
+    def __str__(self):
+        return f"{self.file_name} ({self.session_id})"
+
+    @property
+    def total_chunks(self):
+        return max(1, -(-self.file_size // self.chunk_size))
+
+    def expected_chunk_size(self, index):
+        """Size in bytes chunk ``index`` must have; only the last one may be shorter."""
+        if index == self.total_chunks - 1:
+            return self.file_size - index * self.chunk_size
+        return self.chunk_size
+
+
+class Direct_Upload(models.Model):
+    """
+    A file a client uploads straight to object storage with a presigned URL.
+
+    The row records what the client announced; the file is attached (and the row
+    removed) by the view that creates the bid or tender file, once the object is found
+    with the announced size and an allowed type.
+    """
+
+    upload_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(
+        "User.User",
+        on_delete=models.CASCADE,
+        related_name="direct_uploads",
+        db_column="created_by_id",
+    )
+    policy = models.CharField(max_length=50)  # Key of settings.UPLOAD_POLICIES
+    file_name = models.CharField(max_length=100)
+    file_type = models.CharField(max_length=255)
+    file_size = models.PositiveBigIntegerField()
+    file_hash = models.CharField(max_length=64)  # SHA-256 the object is signed with
+    Created_At = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "direct_upload"
+
+    def __str__(self):
+        return f"{self.file_name} ({self.upload_id})"
+
+
+class Upload_Chunk(models.Model):
+    """A received chunk of an upload session, verified against its SHA-256."""
+
+    Id = models.AutoField(primary_key=True)
+    session = models.ForeignKey(
+        Upload_Session,
+        on_delete=models.CASCADE,
+        related_name="chunks",
+        db_column="session_id",
+    )
+    index = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+    chunk_hash = models.CharField(max_length=64)
+    Received_At = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "upload_chunk"
+        unique_together = ("session", "index")
+
+
+class Preview(models.Model):
+    """
+    Rendered previews of a PDF payload: a thumbnail and images of its first pages.
+
+    Previews are generated once per payload digest in a background worker (see
+    Storage.previews), so every file row sharing the payload shares them too.
+    """
+
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+    STATUSES = [
+        (PENDING, "Pending"),
+        (READY, "Ready"),
+        (FAILED, "Failed"),
+    ]
+
+    source_hash = models.CharField(max_length=64, primary_key=True)  # Digest of the PDF
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    page_count = models.PositiveIntegerField(null=True, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    # Linearized copy of the PDF, served for downloads (see Storage.linearize)
+    linearized_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    linearized_size = models.PositiveBigIntegerField(null=True, blank=True)
+    # Bytes a viewer must fetch before it can render page 1, before and after
+    first_page_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    linearized_first_page_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    Created_At = models.DateTimeField(auto_now_add=True)
+    Updated_At = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "preview"
+
+    def __str__(self):
+        return f"{self.source_hash} ({self.status})"
+
+
+class Preview_Image(models.Model):
+    """One rendered PNG of a preview, stored as a blob like any other payload."""
+
+    THUMBNAIL = "thumbnail"
+    PAGE = "page"
+    KINDS = [
+        (THUMBNAIL, "Thumbnail"),
+        (PAGE, "Page"),
+    ]
+
+    Id = models.AutoField(primary_key=True)
+    preview = models.ForeignKey(
+        Preview,
+        on_delete=models.CASCADE,
+        related_name="images",
+        db_column="source_hash",
+    )
+    kind = models.CharField(max_length=10, choices=KINDS)
+    page = models.PositiveIntegerField()  # 1-based page number
+    image_hash = models.CharField(max_length=64, db_index=True)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = "preview_image"
+        unique_together = ("preview", "kind", "page")
+
+
+class Pdf_Page(models.Model):
+    """
+    Per-page index of a PDF payload, built in the same background pass as its preview.
+
+    Page-range requests are validated against it, and text is served from it without
+    opening the PDF.
+    """
+
+    Id = models.AutoField(primary_key=True)
+    preview = models.ForeignKey(
+        Preview,
+        on_delete=models.CASCADE,
+        related_name="pages",
+        db_column="source_hash",
+    )
+    page = models.PositiveIntegerField()  # 1-based page number
+    width = models.FloatField()  # In PDF points
+    height = models.FloatField()
+    text = models.TextField(blank=True)
+
+    class Meta:
+        db_table = "pdf_page"
+        unique_together = ("preview", "page")
+
+
+class Image_Rendition(models.Model):
+    """
+    A bounded-resolution JPEG rendition of an uploaded image, for on-screen review.
+
+    Renditions are made once per payload digest in a worker process (see
+    Storage.renditions); the original payload is kept untouched for audit. Images that
+    are already small are marked SKIPPED and reviewed from the original.
+    """
+
+    PENDING = "pending"
+    READY = "ready"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+    STATUSES = [
+        (PENDING, "Pending"),
+        (READY, "Ready"),
+        (SKIPPED, "Skipped"),
+        (FAILED, "Failed"),
+    ]
+
+    source_hash = models.CharField(max_length=64, primary_key=True)  # Digest of the original
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    image_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    size = models.PositiveBigIntegerField(null=True, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    original_width = models.PositiveIntegerField(null=True, blank=True)
+    original_height = models.PositiveIntegerField(null=True, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    Created_At = models.DateTimeField(auto_now_add=True)
+    Updated_At = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "image_rendition"
+
+    def __str__(self):
+        return f"{self.source_hash} ({self.status})"
@@ -0,0 +1,221 @@
+"""
+S3-compatible object storage for payloads.
+
+Payloads moved here (or uploaded here directly by clients) are kept uncompressed under
+the same content-addressed layout as the local store (``<prefix>ab/cd/<digest>``), so a
+short-lived presigned URL can hand them to clients as-is: downloads and direct uploads
+then never pass through the application servers. Any service speaking the S3 API works
+(AWS S3, MinIO, Ceph RGW...); ``endpoint_url`` selects it.
+
+Direct uploads go to a key of their own (``<prefix>uploads/<upload id>``), signed with
+the payload's SHA-256, which the storage service checks before accepting the body. The
+object is copied under its digest only once the application has checked it, so a
+client cannot claim content it never sent.
+"""
+import base64
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.http import content_disposition_header
+
+try:
+    import boto3
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+except ImportError:  # Object storage support is optional
+    boto3 = None
+
+MISSING_OBJECT_CODES = {"404", "NoSuchKey", "NotFound"}
+
+# Where direct uploads land, below the store's prefix, until they are checked
+UPLOADS_PREFIX = "uploads/"
+
+
+def sha256_base64(digest):
+    """Convert a SHA-256 hex digest to the base64 form used by S3 checksums."""
+    return base64.b64encode(bytes.fromhex(digest)).decode("ascii")
+
+
+class ObjectStore:
+    """A bucket (or a prefix in one) holding payloads under their digest."""
+
+    def __init__(self, bucket, prefix="", url_ttl=300, client=None, **client_options):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_ttl = url_ttl
+        self.client = client or boto3.client(
+            "s3", config=Config(signature_version="s3v4"), **client_options
+        )
+
+    def key(self, digest):
+        return f"{self.prefix}{digest[:2]}/{digest[2:4]}/{digest}"
+
+    def upload_key(self, upload_id):
+        return f"{self.prefix}{UPLOADS_PREFIX}{upload_id}"
+
+    def stat(self, digest):
+        """
+        Look up a stored object.
+
+        Returns:
+            dict | None: ``size``, ``last_modified`` and ``sha256`` (hex, when the
+            service recorded a checksum), or None if there is no such object
+        """
+        return self._stat(self.key(digest))
+
+    def stat_upload(self, upload_id):
+        """Look up a direct upload's object, as ``stat`` does."""
+        return self._stat(self.upload_key(upload_id))
+
+    def _stat(self, key):
+        try:
+            head = self.client.head_object(
+                Bucket=self.bucket, Key=key, ChecksumMode="ENABLED"
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in MISSING_OBJECT_CODES:
+                return None
+            raise
+        checksum = head.get("ChecksumSHA256")
+        return {
+            "size": head["ContentLength"],
+            "last_modified": head["LastModified"],
+            "sha256": base64.b64decode(checksum).hex() if checksum else None,
+        }
+
+    def exists(self, digest):
+        return self.stat(digest) is not None
+
+    def open(self, digest, byte_range=None):
+        """Open a stored object for sequential reading, optionally only ``(start, end)``."""
+        return self._open(self.key(digest), byte_range)
+
+    def open_upload(self, upload_id, byte_range=None):
+        """Open a direct upload's object, as ``open`` does."""
+        return self._open(self.upload_key(upload_id), byte_range)
+
+    def _open(self, key, byte_range):
+        options = {"Range": f"bytes={byte_range[0]}-{byte_range[1]}"} if byte_range else {}
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key, **options)["Body"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in MISSING_OBJECT_CODES:
+                raise FileNotFoundError(f"Object {key} is not in the object store")
+            raise
+
+    def download(self, digest, path):
+        self.client.download_file(self.bucket, self.key(digest), str(path))
+
+    def upload(self, path, digest, content_type=None):
+        """Upload a file holding a payload's original bytes, checksummed by the service."""
+        extra_args = {"ChecksumAlgorithm": "SHA256"}
+        if content_type:
+            extra_args["ContentType"] = content_type
+        self.client.upload_file(
+            str(path), self.bucket, self.key(digest), ExtraArgs=extra_args
+        )
+
+    def promote_upload(self, upload_id, digest):
+        """
+        Store a checked direct upload under its digest, unless that object is already
+        there. The upload's own object is kept until ``delete_upload``.
+        """
+        if self.exists(digest):
+            return
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=self.key(digest),
+            CopySource={"Bucket": self.bucket, "Key": self.upload_key(upload_id)},
+            ChecksumAlgorithm="SHA256",
+        )
+
+    def delete(self, digest):
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(digest))
+
+    def delete_upload(self, upload_id):
+        self.client.delete_object(Bucket=self.bucket, Key=self.upload_key(upload_id))
+
+    def _iter_objects(self, prefix):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                yield item["Key"], item["LastModified"], item["Size"]
+
+    def iter_payloads(self):
+        """
+        List every stored payload (direct uploads not checked yet excluded).
+
+        Yields:
+            tuple[str, datetime, int]: The digest, last modification time and size
+        """
+        uploads = self.upload_key("")
+        for key, last_modified, size in self._iter_objects(self.prefix):
+            if not key.startswith(uploads):
+                yield key.rsplit("/", 1)[-1], last_modified, size
+
+    def iter_uploads(self):
+        """
+        List the objects of direct uploads.
+
+        Yields:
+            tuple[str, datetime, int]: The upload id, last modification time and size
+        """
+        for key, last_modified, size in self._iter_objects(self.upload_key("")):
+            yield key.rsplit("/", 1)[-1], last_modified, size
+
+    def download_url(self, digest, filename, content_type):
+        """Presign a GET of a payload, served with the file's name and type."""
+        disposition = content_disposition_header(as_attachment=True, filename=filename)
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self.key(digest),
+                "ResponseContentDisposition": disposition,
+                "ResponseContentType": content_type or "application/octet-stream",
+            },
+            ExpiresIn=self.url_ttl,
+        )
+
+    def upload_url(self, upload_id, digest, size, content_type):
+        """
+        Presign the PUT of a direct upload, which must have the SHA-256 ``digest``.
+
+        Returns:
+            tuple[str, dict]: The URL and the headers the client must send with it
+        """
+        checksum = sha256_base64(digest)
+        url = self.client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self.upload_key(upload_id),
+                "ContentLength": size,
+                "ContentType": content_type,
+                "ChecksumSHA256": checksum,
+            },
+            ExpiresIn=self.url_ttl,
+        )
+        headers = {
+            "Content-Type": content_type,
+            "Content-Length": str(size),
+            "x-amz-checksum-sha256": checksum,
+        }
+        return url, headers
+
+
+@lru_cache(maxsize=None)
+def get_object_store():
+    """Return the object store configured by ``settings.BLOB_OBJECT_STORAGE``, if any."""
+    options = dict(settings.BLOB_OBJECT_STORAGE or {})
+    if not options:
+        return None
+    if boto3 is None:
+        raise ImproperlyConfigured("BLOB_OBJECT_STORAGE requires the boto3 package")
+    return ObjectStore(
+        options.pop("bucket"),
+        prefix=options.pop("prefix", ""),
+        url_ttl=settings.OBJECT_STORAGE_URL_TTL,
+        **options,
+    )
@@ -0,0 +1,148 @@
+"""
+Extracting selected pages of a stored PDF, as a new PDF or as text.
+
+Pages are validated (and text is served) from the Pdf_Page index built when the file
+was uploaded. Building a PDF only loads the requested pages: PyMuPDF reads the
+document's cross-reference table and page tree, not every page. PyMuPDF runs in the
+PDF process pool, never in the request thread (see Storage.pdf_render).
+"""
+import os
+import re
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.http import content_disposition_header
+from rest_framework import status
+from rest_framework.response import Response
+
+from .blob_store import get_blob_store
+from .models import Pdf_Page, Preview
+from .pdf_render import extract_pages, extract_text
+from .previews import is_previewable, run_pdf_task, schedule_previews
+
+PAGE_RANGE_RE = re.compile(r"^\s*(\d+)\s*(?:-\s*(\d+)\s*)?$")
+
+
+def parse_page_ranges(spec, page_count=None):
+    """
+    Parse a page selection such as ``"3"``, ``"5-9"`` or ``"1,4-6"``.
+
+    Returns:
+        list[tuple[int, int]]: Inclusive, 1-based ``(first, last)`` ranges in request
+        order
+
+    Raises:
+        ValueError: If the selection is malformed or outside the document
+    """
+    if not spec:
+        raise ValueError("pages is required (e.g. 3, 5-9 or 1,4-6)")
+    ranges = []
+    for part in spec.split(","):
+        match = PAGE_RANGE_RE.match(part)
+        if not match:
+            raise ValueError(f"Invalid page range '{part.strip()}'")
+        first = int(match.group(1))
+        last = int(match.group(2) or first)
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid page range '{part.strip()}'")
+        if page_count is not None and last > page_count:
+            raise ValueError(f"The document has only {page_count} page(s)")
+        ranges.append((first, last))
+
+    total = sum(last - first + 1 for first, last in ranges)
+    if total > settings.PDF_EXTRACT_MAX_PAGES:
+        raise ValueError(
+            f"At most {settings.PDF_EXTRACT_MAX_PAGES} pages can be extracted at once"
+        )
+    return ranges
+
+
+def _indexed_text(preview, ranges):
+    wanted = set()
+    for first, last in ranges:
+        wanted.update(range(first, last + 1))
+    texts = dict(
+        Pdf_Page.objects.filter(preview=preview, page__in=wanted).values_list("page", "text")
+    )
+    return [
+        {"page": page, "text": texts.get(page, "")}
+        for first, last in ranges
+        for page in range(first, last + 1)
+    ]
+
+
+def page_extract_response(request, digest, content_type, filename):
+    """
+    Answer a page extraction request for a stored PDF.
+
+    Query parameters: ``pages`` (required, e.g. ``5-9``) and ``output`` (``pdf``, the
+    default, or ``text``).
+    """
+    if not is_previewable(content_type):
+        return Response(
+            {"message": "Pages can only be extracted from PDF files.", "data": []},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        )
+
+    output = request.query_params.get("output", "pdf")
+    if output not in ("pdf", "text"):
+        return Response(
+            {"message": "output must be 'pdf' or 'text'", "data": []},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    preview = Preview.objects.filter(source_hash=digest, status=Preview.READY).first()
+    if preview is None:
+        # Not indexed yet (or uploaded before indexing existed); read the PDF directly
+        schedule_previews([(digest, content_type)])
+
+    try:
+        ranges = parse_page_ranges(
+            request.query_params.get("pages"), preview.page_count if preview else None
+        )
+    except ValueError as e:
+        return Response(
+            {"message": str(e), "data": []},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if output == "text" and preview is not None:
+        return Response(
+            {
+                "message": "Pages extracted successfully.",
+                "data": {
+                    "page_count": preview.page_count,
+                    "pages": _indexed_text(preview, ranges),
+                },
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    with get_blob_store().local_path(digest) as path:
+        page_count, content = run_pdf_task(
+            extract_text if output == "text" else extract_pages, str(path), ranges
+        )
+    if content is None:
+        return Response(
+            {"message": f"The document has only {page_count} page(s)", "data": []},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if output == "text":
+        return Response(
+            {
+                "message": "Pages extracted successfully.",
+                "data": {"page_count": page_count, "pages": content},
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    name, _ = os.path.splitext(filename)
+    selection = "_".join(
+        str(first) if first == last else f"{first}-{last}" for first, last in ranges
+    )
+    response = HttpResponse(content, content_type="application/pdf")
+    response["Content-Disposition"] = content_disposition_header(
+        True, f"{name}_pages_{selection}.pdf"
+    )
+    return response
@@ -0,0 +1,72 @@
+"""
+PDF rendering and page extraction run in worker processes.
+
+PyMuPDF is not thread-safe, so documents are only ever opened here, one at a time per
+``ProcessPoolExecutor`` worker. This module must not import Django: workers are spawned
+fresh and only import what the submitted function needs.
+"""
+try:
+    import pymupdf
+except ImportError:  # Previews are disabled without PyMuPDF
+    pymupdf = None
+
+
+def _render_page(page, width):
+    """Render a page to PNG bytes, scaled to ``width`` pixels."""
+    zoom = width / max(page.rect.width, 1)
+    pixmap = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+    return pixmap.tobytes("png"), pixmap.width, pixmap.height
+
+
+def render_preview(path, thumbnail_width, page_width, preview_pages):
+    """
+    Render the thumbnail and first page images of a PDF and index its pages.
+
+    Returns:
+        tuple: The page count; ``(width, height, text)`` of every page; the thumbnail
+        as ``(png, width, height)``, or None for an empty document; and the images of
+        the first ``preview_pages`` pages, as ``(png, width, height)``
+    """
+    with pymupdf.open(path, filetype="pdf") as document:
+        pages = [(page.rect.width, page.rect.height, page.get_text()) for page in document]
+        thumbnail = _render_page(document[0], thumbnail_width) if document.page_count else None
+        page_images = [
+            _render_page(document[index], page_width)
+            for index in range(min(preview_pages, document.page_count))
+        ]
+        return document.page_count, pages, thumbnail, page_images
+
+
+def extract_pages(path, ranges):
+    """
+    Copy the inclusive, 1-based page ``ranges`` of a PDF into a new PDF.
+
+    Returns:
+        tuple[int, bytes | None]: The page count, and the new PDF (None when a range is
+        past the last page)
+    """
+    with pymupdf.open(path, filetype="pdf") as document:
+        if max(last for _, last in ranges) > document.page_count:
+            return document.page_count, None
+        with pymupdf.open() as extract:
+            for first, last in ranges:
+                extract.insert_pdf(document, from_page=first - 1, to_page=last - 1)
+            return document.page_count, extract.tobytes(garbage=3, deflate=True)
+
+
+def extract_text(path, ranges):
+    """
+    Read the text of the inclusive, 1-based page ``ranges`` of a PDF.
+
+    Returns:
+        tuple[int, list[dict] | None]: The page count, and ``{"page", "text"}`` for every
+        selected page (None when a range is past the last page)
+    """
+    with pymupdf.open(path, filetype="pdf") as document:
+        if max(last for _, last in ranges) > document.page_count:
+            return document.page_count, None
+        return document.page_count, [
+            {"page": page, "text": document[page - 1].get_text()}
+            for first, last in ranges
+            for page in range(first, last + 1)
+        ]
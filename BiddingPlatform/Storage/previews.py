@@ -0,0 +1,277 @@
+"""
+Preview images of PDF attachments.
+
+When a PDF is attached, a background worker renders a small thumbnail of its first page
+and a larger image of each of its first ``settings.PREVIEW_PAGES`` pages with PyMuPDF,
+in a process pool since PyMuPDF is not thread-safe (see Storage.pdf_render).
+The PNGs are stored as blobs and recorded as Preview_Image rows keyed by the source
+payload's digest, so reviewers can see what a file is without downloading it. The same
+pass indexes every page (size and text) as Pdf_Page rows for page extraction.
+
+The queue is in memory: previews left pending by a restart are queued again by the
+``requeue_previews`` command, or when they are requested, once they are older than
+``settings.PREVIEW_PENDING_TIMEOUT``.
+"""
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache, partial
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.http import FileResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from BiddingPlatform.conditional import conditional_response, payload_etag, set_validators
+
+from .blob_store import StoredPayload, get_blob_store
+from .linearize import linearize_payload
+from .models import Blob, Pdf_Page, Preview, Preview_Image
+from .pdf_render import pymupdf, render_preview
+
+logger = logging.getLogger(__name__)
+
+PREVIEWABLE_TYPES = {"application/pdf"}
+
+
+def is_previewable(content_type):
+    return pymupdf is not None and (content_type or "").lower() in PREVIEWABLE_TYPES
+
+
+@lru_cache(maxsize=None)
+def get_preview_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.PREVIEW_WORKERS, thread_name_prefix="preview"
+    )
+
+
+@lru_cache(maxsize=None)
+def get_pdf_pool():
+    # Spawned workers start clean instead of inheriting the server's threads and sockets
+    return ProcessPoolExecutor(
+        max_workers=settings.PREVIEW_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def run_pdf_task(function, *args):
+    """
+    Run a Storage.pdf_render function in the PDF process pool and return its result;
+    in-process when ``settings.PREVIEW_IN_BACKGROUND`` is off (tests).
+    """
+    if not settings.PREVIEW_IN_BACKGROUND:
+        return function(*args)
+    return get_pdf_pool().submit(function, *args).result()
+
+
+def schedule_previews(payloads):
+    """
+    Queue preview generation for the PDF payloads among ``payloads``.
+
+    Rendering starts once the current transaction commits, so the worker never races
+    the rows that reference the payload. Payloads that already have a preview (in any
+    state) are skipped.
+
+    Args:
+        payloads (Iterable[tuple[str, str]]): ``(digest, content type)`` pairs
+    """
+    digests = {digest for digest, content_type in payloads if is_previewable(content_type)}
+    if not digests:
+        return
+    digests -= set(
+        Preview.objects.filter(source_hash__in=digests).values_list("source_hash", flat=True)
+    )
+    Preview.objects.bulk_create(
+        [Preview(source_hash=digest) for digest in digests], ignore_conflicts=True
+    )
+    for digest in digests:
+        transaction.on_commit(partial(_dispatch, digest))
+
+
+def claim_stale(model, timeout=None, digests=None):
+    """
+    Take over the pending rows of ``model`` (Preview or Image_Rendition) untouched for
+    ``timeout``, whose queued work was lost. Each row is claimed by touching it, so
+    only one caller queues it again.
+
+    Args:
+        model: Preview or Image_Rendition
+        timeout (timedelta | None): Defaults to ``settings.PREVIEW_PENDING_TIMEOUT``
+        digests (Iterable[str] | None): Only consider these source payloads
+
+    Returns:
+        list[str]: Digests of the claimed rows
+    """
+    if timeout is None:
+        timeout = timedelta(seconds=settings.PREVIEW_PENDING_TIMEOUT)
+    now = timezone.now()
+    stale = model.objects.filter(status=model.PENDING, Updated_At__lt=now - timeout)
+    if digests is not None:
+        stale = stale.filter(source_hash__in=digests)
+    return [
+        digest
+        for digest in list(stale.values_list("source_hash", flat=True))
+        if stale.filter(source_hash=digest).update(Updated_At=now)
+    ]
+
+
+def requeue_stale_previews(timeout=None):
+    """Queue again the previews pending for longer than ``timeout``; returns how many."""
+    digests = claim_stale(Preview, timeout)
+    for digest in digests:
+        transaction.on_commit(partial(_dispatch, digest))
+    return len(digests)
+
+
+def _dispatch(digest):
+    if settings.PREVIEW_IN_BACKGROUND:
+        get_preview_executor().submit(_process_in_worker, digest)
+    else:
+        process_pdf(digest)
+
+
+def _process_in_worker(digest):
+    close_old_connections()
+    try:
+        process_pdf(digest)
+    except Exception:
+        logger.exception(f"Processing PDF {digest} failed")
+    finally:
+        close_old_connections()
+
+
+def process_pdf(digest):
+    """Run every background step for a newly stored PDF."""
+    generate_preview(digest)
+    linearize_payload(digest)
+
+
+def generate_preview(digest):
+    """Render the thumbnail and page images of one PDF payload and index its pages."""
+    preview = Preview.objects.get(source_hash=digest)
+    store = get_blob_store()
+
+    try:
+        with store.local_path(digest) as path:
+            page_count, page_info, thumbnail, page_images = run_pdf_task(
+                render_preview,
+                str(path),
+                settings.PREVIEW_THUMBNAIL_WIDTH,
+                settings.PREVIEW_PAGE_WIDTH,
+                settings.PREVIEW_PAGES,
+            )
+    except Exception as e:
+        Preview.objects.filter(source_hash=digest).update(
+            status=Preview.FAILED, error=str(e)[:255]
+        )
+        logger.warning(f"Could not render a preview of {digest}: {e}")
+        return
+
+    pages = [
+        Pdf_Page(preview=preview, page=index + 1, width=width, height=height, text=text)
+        for index, (width, height, text) in enumerate(page_info)
+    ]
+    rendered = [(Preview_Image.THUMBNAIL, 1) + thumbnail] if thumbnail else []
+    rendered += [
+        (Preview_Image.PAGE, index + 1) + image for index, image in enumerate(page_images)
+    ]
+    payloads = [
+        StoredPayload(*store.save([png], "image/png")) for _, _, png, _, _ in rendered
+    ]
+    with transaction.atomic():
+        Blob.acquire_many(payloads)
+        Preview_Image.objects.bulk_create(
+            [
+                Preview_Image(
+                    preview=preview,
+                    kind=kind,
+                    page=page,
+                    image_hash=payload.digest,
+                    width=width,
+                    height=height,
+                    size=payload.size,
+                )
+                for (kind, page, _, width, height), payload in zip(rendered, payloads)
+            ]
+        )
+        Pdf_Page.objects.bulk_create(pages, batch_size=500)
+        preview.status = Preview.READY
+        preview.page_count = page_count
+        preview.error = ""
+        preview.save()
+
+
+def preview_response(request, digest, content_type):
+    """
+    Answer a preview request for a stored file.
+
+    Query parameters: ``kind`` (``thumbnail``, the default, or ``page``) and ``page``
+    (1-based, for page images). Returns 202 while the preview is being generated.
+    """
+    if not is_previewable(content_type):
+        return Response(
+            {"message": "Previews are only available for PDF files.", "data": []},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        )
+
+    kind = request.query_params.get("kind", Preview_Image.THUMBNAIL)
+    if kind not in (Preview_Image.THUMBNAIL, Preview_Image.PAGE):
+        return Response(
+            {"message": "kind must be 'thumbnail' or 'page'", "data": []},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        page = int(request.query_params.get("page", 1))
+    except ValueError:
+        page = 0
+    if page < 1:
+        return Response(
+            {"message": "page must be a positive integer", "data": []},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    preview = Preview.objects.filter(source_hash=digest).first()
+    if preview is None:
+        # Files stored before previews existed are rendered on first request
+        schedule_previews([(digest, content_type)])
+        preview = Preview(source_hash=digest)
+    if preview.status == Preview.PENDING:
+        if preview.pk is not None and claim_stale(Preview, digests=[digest]):
+            transaction.on_commit(partial(_dispatch, digest))
+        response = Response(
+            {"message": "Preview is being generated.", "data": {"status": preview.status}},
+            status=status.HTTP_202_ACCEPTED,
+        )
+        response["Retry-After"] = "5"
+        return response
+    if preview.status == Preview.FAILED:
+        return Response(
+            {
+                "message": "Preview could not be generated.",
+                "data": {"status": preview.status, "error": preview.error},
+            },
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+
+    image = preview.images.filter(kind=kind, page=page).first()
+    if image is None:
+        return Response(
+            {
+                "message": "No preview for this page.",
+                "data": {"page_count": preview.page_count, "preview_pages": settings.PREVIEW_PAGES},
+            },
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    etag = payload_etag(image.image_hash)
+    not_modified = conditional_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    response = FileResponse(get_blob_store().open(image.image_hash), content_type="image/png")
+    response["Content-Length"] = str(image.size)
+    response["Cache-Control"] = "private, max-age=86400"
+    return set_validators(response, etag)
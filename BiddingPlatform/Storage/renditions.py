@@ -0,0 +1,171 @@
+"""
+Review renditions of uploaded images.
+
+Scans of VAT certificates are often full-resolution phone photos of several MB.
+Reviewers get a JPEG bounded to ``settings.IMAGE_RENDITION_MAX_DIMENSION`` pixels
+instead, while the original stays stored, untouched, for audit. Decoding and
+re-encoding is CPU-bound, so it runs in a process pool; a background thread waits for
+the result and records it, keeping request workers free.
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .blob_store import StoredPayload, get_blob_store
+from .imaging import Image, render_review_image
+from .models import Blob, Image_Rendition
+from .previews import claim_stale, get_preview_executor
+
+logger = logging.getLogger(__name__)
+
+RENDITION_TYPES = {"image/jpeg", "image/png", "image/tiff", "image/webp", "image/bmp"}
+
+
+def is_renderable(content_type):
+    return (
+        Image is not None
+        and settings.IMAGE_RENDITIONS
+        and (content_type or "").lower() in RENDITION_TYPES
+    )
+
+
+@lru_cache(maxsize=None)
+def get_rendition_pool():
+    # Spawned workers start clean instead of inheriting the server's threads and sockets
+    return ProcessPoolExecutor(
+        max_workers=settings.IMAGE_RENDITION_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def schedule_renditions(payloads):
+    """
+    Queue review renditions for the images among ``payloads`` once the current
+    transaction commits. Payloads that already have a rendition are skipped.
+
+    Args:
+        payloads (Iterable[tuple[str, str]]): ``(digest, detected type)`` pairs
+    """
+    digests = {digest for digest, content_type in payloads if is_renderable(content_type)}
+    if not digests:
+        return
+    digests -= set(
+        Image_Rendition.objects.filter(source_hash__in=digests).values_list(
+            "source_hash", flat=True
+        )
+    )
+    Image_Rendition.objects.bulk_create(
+        [Image_Rendition(source_hash=digest) for digest in digests], ignore_conflicts=True
+    )
+    for digest in digests:
+        transaction.on_commit(partial(_dispatch, digest))
+
+
+def requeue_stale_renditions(timeout=None):
+    """Queue again the renditions pending for longer than ``timeout``; returns how many."""
+    digests = claim_stale(Image_Rendition, timeout)
+    for digest in digests:
+        transaction.on_commit(partial(_dispatch, digest))
+    return len(digests)
+
+
+def _dispatch(digest):
+    if settings.PREVIEW_IN_BACKGROUND:
+        get_preview_executor().submit(_generate_in_worker, digest)
+    else:
+        generate_rendition(digest)
+
+
+def _generate_in_worker(digest):
+    close_old_connections()
+    try:
+        generate_rendition(digest, get_rendition_pool())
+    except Exception:
+        logger.exception(f"Rendition of {digest} failed")
+    finally:
+        close_old_connections()
+
+
+def generate_rendition(digest, pool=None):
+    """
+    Make the review rendition of one image payload.
+
+    Args:
+        digest (str): Digest of the original image
+        pool (Executor | None): Where to run the re-encoding; in-process when None
+    """
+    store = get_blob_store()
+    original_size = Blob.objects.filter(digest=digest).values_list("size", flat=True).first()
+    if original_size is not None and original_size < settings.IMAGE_RENDITION_MIN_SIZE:
+        Image_Rendition.objects.filter(source_hash=digest).update(status=Image_Rendition.SKIPPED)
+        return
+
+    fd, tmp_path = store.spool()
+    os.close(fd)
+    try:
+        args = (settings.IMAGE_RENDITION_MAX_DIMENSION, settings.IMAGE_RENDITION_QUALITY)
+        with store.local_path(digest) as path:
+            if pool is None:
+                dimensions = render_review_image(str(path), tmp_path, *args)
+            else:
+                dimensions = pool.submit(render_review_image, str(path), tmp_path, *args).result()
+        width, height, original_width, original_height = dimensions
+
+        if original_size is not None and os.path.getsize(tmp_path) >= original_size:
+            # Re-encoding would not save anything; review from the original
+            Image_Rendition.objects.filter(source_hash=digest).update(
+                status=Image_Rendition.SKIPPED,
+                original_width=original_width,
+                original_height=original_height,
+            )
+            return
+
+        with open(tmp_path, "rb") as rendition:
+            payload = StoredPayload(
+                *store.save(iter(lambda: rendition.read(1024 * 1024), b""), "image/jpeg")
+            )
+    except Exception as e:
+        Image_Rendition.objects.filter(source_hash=digest).update(
+            status=Image_Rendition.FAILED, error=str(e)[:255]
+        )
+        logger.warning(f"Could not make a review rendition of {digest}: {e}")
+        return
+    finally:
+        os.unlink(tmp_path)
+
+    with transaction.atomic():
+        Blob.acquire_many([payload])
+        Image_Rendition.objects.filter(source_hash=digest).update(
+            status=Image_Rendition.READY,
+            image_hash=payload.digest,
+            size=payload.size,
+            width=width,
+            height=height,
+            original_width=original_width,
+            original_height=original_height,
+            error="",
+        )
+    logger.info(f"Review rendition of {digest}: {original_size} -> {payload.size} bytes")
+
+
+def review_payload(digest, size, content_type, file_name):
+    """
+    Pick the payload to show a reviewer: the rendition when it is ready, otherwise the
+    original.
+
+    Returns:
+        tuple[str, int, str, str]: Digest, size, content type and file name to serve
+    """
+    rendition = (
+        Image_Rendition.objects.filter(source_hash=digest, status=Image_Rendition.READY)
+        .values_list("image_hash", "size")
+        .first()
+    )
+    if rendition is None:
+        return digest, size, content_type, file_name
+    return rendition + ("image/jpeg", f"{os.path.splitext(file_name)[0]}.jpg")
@@ -0,0 +1,39 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from Bit.models import Bit_Files
+from Tender.models import Tender_Files
+from User.models import VAT_Certificate_Manager
+
+from .models import Blob, Image_Rendition, Preview, Preview_Image
+
+
+@receiver(post_delete, sender=Tender_Files)
+@receiver(post_delete, sender=Bit_Files)
+def release_file_blob(sender, instance, **kwargs):
+    """Drop the blob reference held by a deleted tender or bid file."""
+    Blob.release(instance.file_hash)
+
+
+@receiver(post_delete, sender=VAT_Certificate_Manager)
+def release_vat_certificate_blob(sender, instance, **kwargs):
+    """Drop the blob reference held by a deleted VAT certificate."""
+    Blob.release(instance.File_Hash)
+
+
+@receiver(post_delete, sender=Preview_Image)
+def release_preview_image_blob(sender, instance, **kwargs):
+    """Drop the blob reference held by a deleted preview image."""
+    Blob.release(instance.image_hash)
+
+
+@receiver(post_delete, sender=Preview)
+def release_linearized_copy_blob(sender, instance, **kwargs):
+    """Drop the blob reference held by a deleted preview's linearized PDF."""
+    Blob.release(instance.linearized_hash)
+
+
+@receiver(post_delete, sender=Image_Rendition)
+def release_image_rendition_blob(sender, instance, **kwargs):
+    """Drop the blob reference held by a deleted review rendition."""
+    Blob.release(instance.image_hash)
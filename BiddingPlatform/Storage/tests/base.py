@@ -0,0 +1,83 @@
+import hashlib
+import shutil
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from Storage.blob_store import StoredPayload, get_blob_store
+from Storage.models import Blob
+from Storage.object_store import get_object_store
+from Storage.pdf_render import pymupdf
+from Tender.models import Tender, Tender_Files
+from User.models import User
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_pdf(page_count):
+    """A PDF whose pages read "Page 1", "Page 2"..."""
+    with pymupdf.open() as document:
+        for number in range(1, page_count + 1):
+            document.new_page(width=200, height=300).insert_text((20, 40), f"Page {number}")
+        return document.tobytes()
+
+
+class Blob_Store_TestCase(TestCase):
+    """Runs every test against empty blob stores in a temporary directory."""
+
+    def setUp(self):
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        overrides = override_settings(
+            BLOB_STORAGE_ROOT=root / "blobs",
+            BLOB_ARCHIVE_ROOT=root / "archive",
+            BLOB_OBJECT_STORAGE={},
+            PREVIEW_IN_BACKGROUND=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for cached in (get_blob_store, get_object_store):
+            cached.cache_clear()
+            self.addCleanup(cached.cache_clear)
+        self.store = get_blob_store()
+
+    def put(self, data, content_type=None):
+        """Store ``data`` and take a reference on it, as an upload does."""
+        payload = StoredPayload(*self.store.save([data], content_type))
+        Blob.acquire(*payload)
+        return payload
+
+
+class Tender_File_TestCase(Blob_Store_TestCase):
+    """Adds a superuser's tender, with an API client logged in as them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+        cls.tender = Tender.objects.create(
+            title="Tender",
+            description="Description",
+            start_date="2025-01-01T00:00:00Z",
+            budget=Decimal("1000.00"),
+            created_by=cls.admin,
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def attach(self, data, file_name="terms.pdf", file_type="application/pdf"):
+        payload = self.put(data, file_type)
+        return Tender_Files.objects.create(
+            tender=self.tender,
+            file_name=file_name,
+            file_type=file_type,
+            file_size=payload.size,
+            file_hash=payload.digest,
+        )
@@ -0,0 +1,196 @@
+import gzip
+import io
+import os
+import unittest
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+
+from Storage import codecs
+from Storage.blob_store import StoredPayload
+from Storage.migrations import _payload_backfill
+from Storage.models import Blob
+
+from .base import Blob_Store_TestCase, Tender_File_TestCase, sha256
+
+
+class Blob_Store_Tests(Blob_Store_TestCase):
+    def test_identical_payloads_are_stored_once(self):
+        data = b"tender terms" * 100
+        first = self.store.save([data[:500], data[500:]])
+        second = self.store.save([data])
+        self.assertEqual(first, second)
+        self.assertEqual(first[:2], (sha256(data), len(data)))
+
+        digest = first[0]
+        path = self.store.path(digest)
+        self.assertEqual(path.relative_to(self.store.root).parts, (digest[:2], digest[2:4], digest))
+        with self.store.open(digest) as payload:
+            self.assertEqual(payload.read(), data)
+
+    def test_spool_files_do_not_outlive_a_save(self):
+        self.store.save([b"a"])
+        self.store.save([b"a"])
+        self.assertEqual(list((self.store.root / "tmp").iterdir()), [])
+
+    def test_reference_counts(self):
+        payload = self.put(b"proposal")
+        self.put(b"proposal")
+        self.assertEqual(Blob.objects.get(digest=payload.digest).ref_count, 2)
+
+        Blob.release(payload.digest)
+        Blob.release(payload.digest)
+        Blob.release(payload.digest)
+        # Unreferenced payloads stay until a sweep reclaims them
+        self.assertEqual(Blob.objects.get(digest=payload.digest).ref_count, 0)
+        self.assertTrue(self.store.exists(payload.digest))
+
+    def test_acquire_many_counts_repeated_digests(self):
+        one = StoredPayload(*self.store.save([b"one"]))
+        two = StoredPayload(*self.store.save([b"two"]))
+        Blob.acquire(*one)
+        with self.assertNumQueries(3):
+            Blob.acquire_many([one, two, two])
+        self.assertEqual(
+            dict(Blob.objects.values_list("digest", "ref_count")),
+            {one.digest: 2, two.digest: 2},
+        )
+
+
+class Payload_Backfill_Tests(Blob_Store_TestCase):
+    def test_legacy_column_is_read_in_slices_into_the_store_layout(self):
+        data = bytes(range(256)) * 10
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TEMP TABLE legacy_file (id integer PRIMARY KEY, data blob)")
+            cursor.execute("INSERT INTO legacy_file VALUES (1, %s), (2, NULL)", [data])
+
+        with mock.patch.object(_payload_backfill, "READ_CHUNK_SIZE", 1000):
+            chunks = list(
+                _payload_backfill.iter_column_chunks(connection, "legacy_file", "data", "id", 1)
+            )
+            self.assertEqual([len(chunk) for chunk in chunks], [1000, 1000, 560])
+            empty = _payload_backfill.iter_column_chunks(connection, "legacy_file", "data", "id", 2)
+            self.assertEqual(list(empty), [])
+
+        # Whatever the store's current version, it reads what the migration wrote
+        digest, size = _payload_backfill.write_payload(self.store.root, chunks)
+        self.assertEqual((digest, size), (sha256(data), len(data)))
+        self.assertEqual(_payload_backfill.write_payload(self.store.root, [data]), (digest, size))
+        with self.store.open(digest) as payload:
+            self.assertEqual(payload.read(), data)
+
+
+class Decoded_Payload_Tests(SimpleTestCase):
+    DATA = bytes(range(256)) * 4096
+
+    def decoded(self, codec):
+        packed = io.BytesIO()
+        codecs.compress_file(io.BytesIO(self.DATA), packed, codec, size=len(self.DATA))
+        packed.seek(0)
+        return codecs.open_decoded(packed, codec)
+
+    def check_seeks(self, codec):
+        with self.decoded(codec) as payload:
+            self.assertFalse(payload.seekable())
+            self.assertEqual(payload.read(10), self.DATA[:10])
+            # Forward: decompress and skip
+            self.assertEqual(payload.seek(700000), 700000)
+            self.assertEqual(payload.read(100), self.DATA[700000:700100])
+            # Backward: restart from the beginning
+            self.assertEqual(payload.seek(5), 5)
+            self.assertEqual(payload.tell(), 5)
+            self.assertEqual(payload.read(5), self.DATA[5:10])
+            # Past the end stops at the end
+            self.assertEqual(payload.seek(len(self.DATA) + 10), len(self.DATA))
+            self.assertEqual(payload.read(), b"")
+            with self.assertRaises(io.UnsupportedOperation):
+                payload.seek(0, io.SEEK_END)
+
+    def test_gzip(self):
+        self.check_seeks(codecs.GZIP)
+
+    @unittest.skipUnless(codecs.zstandard, "zstandard is not installed")
+    def test_zstd(self):
+        self.check_seeks(codecs.ZSTD)
+
+    def test_identity_is_the_file_itself(self):
+        raw = io.BytesIO(self.DATA)
+        self.assertIs(codecs.open_decoded(raw, codecs.IDENTITY), raw)
+
+
+@override_settings(BLOB_STORAGE_CODEC="gzip")
+class Compressed_Payload_Tests(Tender_File_TestCase):
+    URL = "/api/Tender/getfiledata/"
+    DATA = b"Item;Quantity;Unit price\n" * 2000
+
+    def test_only_payloads_that_shrink_are_compressed(self):
+        digest, size, codec, stored_size = self.store.save([self.DATA], "text/csv")
+        self.assertEqual(codec, codecs.GZIP)
+        self.assertLess(stored_size, size / 10)
+        self.assertTrue(self.store.path(digest, codecs.GZIP).is_file())
+
+        for data, content_type in [
+            (self.DATA[:500], "text/csv"),  # Too small
+            (self.DATA + b"png", "image/png"),  # Already compressed
+            (os.urandom(4096), "text/plain"),  # Does not shrink enough
+        ]:
+            with self.subTest(content_type=content_type):
+                self.assertEqual(self.store.save([data], content_type)[2], codecs.IDENTITY)
+
+    def test_downloads(self):
+        tender_file = self.attach(self.DATA, file_name="boq.csv", file_type="text/csv")
+        params = {"file_id": tender_file.file_id}
+
+        # Clients accepting the codec get the stored bytes as they are
+        response = self.client.get(self.URL, params, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["ETag"], f'"{tender_file.file_hash}.gzip"')
+        self.assertIn("Accept-Encoding", response["Vary"])
+        body = b"".join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), self.DATA)
+
+        response = self.client.get(self.URL, params)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response["ETag"], f'"{tender_file.file_hash}"')
+        self.assertEqual(b"".join(response.streaming_content), self.DATA)
+
+        # Ranges refer to the original bytes
+        response = self.client.get(
+            self.URL, params, HTTP_ACCEPT_ENCODING="gzip", HTTP_RANGE="bytes=30000-30099"
+        )
+        self.assertEqual(response.status_code, 206)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(b"".join(response.streaming_content), self.DATA[30000:30100])
+
+
+@override_settings(BLOB_STORAGE_CODEC="gzip")
+class Verify_Blobs_Tests(Blob_Store_TestCase):
+    DATA = b"Item;Quantity;Unit price\n" * 2000
+
+    def setUp(self):
+        super().setUp()
+        self.digest = self.put(self.DATA, "text/csv").digest
+
+    def test_damaged_payloads_are_reported(self):
+        stdout = io.StringIO()
+        call_command("verify_blobs", "--workers=2", stdout=stdout)
+        self.assertIn("payloads_checked: 1", stdout.getvalue())
+        self.assertIn(f"bytes_checked: {len(self.DATA)}", stdout.getvalue())
+
+        # Bytes changed on disk after the payload was written
+        path = self.store.path(self.digest, codecs.GZIP)
+        original = path.read_bytes()
+        path.write_bytes(gzip.compress(self.DATA.replace(b"Item", b"Itex", 1)))
+        stderr = io.StringIO()
+        with self.assertRaisesMessage(CommandError, "1 payload(s) do not match"):
+            call_command("verify_blobs", stdout=io.StringIO(), stderr=stderr)
+        self.assertIn("content hashes to", stderr.getvalue())
+
+        # Truncated compressed data cannot even be read back
+        path.write_bytes(original[: len(original) // 2])
+        stderr = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command("verify_blobs", stdout=io.StringIO(), stderr=stderr)
+        self.assertIn("unreadable", stderr.getvalue())
@@ -0,0 +1,348 @@
+import base64
+import hashlib
+import io
+import unittest
+import zipfile
+from decimal import Decimal
+
+from django.test import SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+from Bit.models import Bit, Bit_Files
+from Storage.blob_store import get_blob_store
+from Storage.downloads import MAX_RANGES_PER_REQUEST, parse_range_header
+from Storage.linearize import pikepdf
+from Storage.models import Blob, Preview
+from Storage.pdf_render import pymupdf
+from Storage.previews import schedule_previews
+from Tender.models import Tender_Files
+from User.models import User
+
+from .base import Tender_File_TestCase, make_pdf
+
+
+@override_settings(FILE_DOWNLOAD_CHUNK_SIZE=1024)
+class Download_Tests(Tender_File_TestCase):
+    URL = "/api/Tender/getfiledata/"
+
+    def setUp(self):
+        super().setUp()
+        self.data = bytes(range(256)) * 20
+        self.file = self.attach(self.data)
+
+    def download(self, **headers):
+        return self.client.get(self.URL, {"file_id": self.file.file_id}, **headers)
+
+    def test_payload_is_streamed_in_blocks(self):
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Length"], str(len(self.data)))
+        self.assertIn('filename="terms.pdf"', response["Content-Disposition"])
+        chunks = list(response.streaming_content)
+        self.assertEqual(b"".join(chunks), self.data)
+        self.assertEqual(max(len(chunk) for chunk in chunks), 1024)
+
+    def test_missing_file(self):
+        response = self.client.get(self.URL, {"file_id": 0})
+        self.assertEqual(response.status_code, 404)
+
+    def test_single_range(self):
+        response = self.download(HTTP_RANGE="bytes=1000-2999")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 1000-2999/{len(self.data)}")
+        self.assertEqual(response["Content-Length"], "2000")
+        self.assertEqual(b"".join(response.streaming_content), self.data[1000:3000])
+
+    def test_multiple_ranges(self):
+        response = self.download(HTTP_RANGE="bytes=0-9, -10")
+        self.assertEqual(response.status_code, 206)
+        content_type = response["Content-Type"]
+        self.assertTrue(content_type.startswith("multipart/byteranges; boundary="))
+        boundary = content_type.split("boundary=")[1].encode()
+        body = b"".join(response.streaming_content)
+        self.assertEqual(response["Content-Length"], str(len(body)))
+        parts = body.split(b"--" + boundary)
+        self.assertEqual(len(parts), 4)
+        self.assertIn(b"bytes 0-9/5120\r\n\r\n" + self.data[:10] + b"\r\n", parts[1])
+        self.assertIn(b"bytes 5110-5119/5120\r\n\r\n" + self.data[-10:] + b"\r\n", parts[2])
+
+    def test_unsatisfiable_range(self):
+        response = self.download(HTTP_RANGE="bytes=6000-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.data)}")
+
+    def test_malformed_range_is_ignored(self):
+        response = self.download(HTTP_RANGE="bytes=abc")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.data)
+
+
+class Conditional_Request_Tests(Tender_File_TestCase):
+    DOWNLOAD_URL = "/api/Tender/getfiledata/"
+    DETAIL_URL = "/api/Tender/details/"
+
+    def setUp(self):
+        super().setUp()
+        self.data = b"%PDF-1.4 terms" * 100
+        self.file = self.attach(self.data)
+        self.etag = f'"{self.file.file_hash}"'
+
+    def download(self, **headers):
+        return self.client.get(self.DOWNLOAD_URL, {"file_id": self.file.file_id}, **headers)
+
+    def test_download_validators(self):
+        response = self.download()
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(response["Last-Modified"], http_date(self.file.Uploaded_At.timestamp()))
+
+        response = self.download(HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertFalse(response.content)
+
+        response = self.download(HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.download(HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_range(self):
+        response = self.download(HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE=self.etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF")
+
+        # A changed payload gets the whole file instead of a stitched range
+        response = self.download(HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.data)
+
+    def test_detail_etag_follows_the_tender_version(self):
+        params = {"tender_id": self.tender.tender_id}
+        etag = self.client.get(self.DETAIL_URL, params)["ETag"]
+        response = self.client.get(self.DETAIL_URL, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.attach(b"addendum", file_name="addendum.txt", file_type="text/plain")
+        response = self.client.get(self.DETAIL_URL, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.data["data"]["files"]), 2)
+
+
+class Tender_Bundle_Tests(Tender_File_TestCase):
+    URL = "/api/Tender/download_bundle/"
+
+    def setUp(self):
+        super().setUp()
+        self.attach(b"terms v1", file_name="terms.pdf")
+        self.attach(b"terms v2", file_name="terms.pdf")
+        company = User.objects.create_user("company", "company@example.com")
+        bid = Bit.objects.create(
+            title="Bid",
+            description="Description",
+            date="2025-01-02T00:00:00Z",
+            cost=Decimal("900.00"),
+            created_by=company,
+            tender=self.tender,
+        )
+        for admin_type in ("technical", "commercial"):
+            payload = self.put(admin_type.encode())
+            Bit_Files.objects.create(
+                bit=bid,
+                admin_type=admin_type,
+                file_name=f"{admin_type}.pdf",
+                file_type="application/pdf",
+                file_size=payload.size,
+                file_hash=payload.digest,
+            )
+
+    def bundle(self):
+        response = self.client.get(self.URL, {"tender_id": self.tender.tender_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        return {name: archive.read(name) for name in archive.namelist()}
+
+    def test_every_file_is_streamed_into_one_zip(self):
+        admin = User.objects.create_superuser("owner", "owner@example.com", _admin_type="")
+        self.client.force_authenticate(admin)
+        self.assertEqual(
+            self.bundle(),
+            {
+                "tender/terms.pdf": b"terms v1",
+                "tender/terms (2).pdf": b"terms v2",
+                "bids/company/commercial/commercial.pdf": b"commercial",
+                "bids/company/technical/technical.pdf": b"technical",
+            },
+        )
+
+    def test_typed_admins_only_get_their_bid_files(self):
+        admin = User.objects.create_commercial_admin("commercial", "commercial@example.com")
+        self.client.force_authenticate(admin)
+        self.assertEqual(
+            sorted(self.bundle()),
+            ["bids/company/commercial/commercial.pdf", "tender/terms (2).pdf", "tender/terms.pdf"],
+        )
+
+
+    def test_typed_admins_only_download_their_bid_files(self):
+        admin = User.objects.create_commercial_admin("commercial", "commercial@example.com")
+        self.client.force_authenticate(admin)
+        for bit_file in Bit_Files.objects.all():
+            response = self.client.get("/api/Bit/getfiledata/", {"file_id": bit_file.file_id})
+            with self.subTest(admin_type=bit_file.admin_type):
+                expected = 200 if bit_file.admin_type == "commercial" else 404
+                self.assertEqual(response.status_code, expected)
+
+@override_settings(FILE_DOWNLOAD_OFFLOAD="x-accel-redirect")
+class Download_Offload_Tests(Tender_File_TestCase):
+    URL = "/api/Tender/getfiledata/"
+
+    def download(self, tender_file, **headers):
+        return self.client.get(self.URL, {"file_id": tender_file.file_id}, **headers)
+
+    def test_proxy_sends_stored_files(self):
+        tender_file = self.attach(b"terms")
+        digest = tender_file.file_hash
+        response = self.download(tender_file)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected-blobs/{digest[:2]}/{digest[2:4]}/{digest}"
+        )
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], f'"{digest}"')
+
+        response = self.download(tender_file, HTTP_IF_NONE_MATCH=f'"{digest}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.has_header("X-Accel-Redirect"))
+
+        with self.settings(FILE_DOWNLOAD_OFFLOAD="x-sendfile"):
+            response = self.download(tender_file)
+        self.assertEqual(response["X-Sendfile"], str(self.store.path(digest).resolve()))
+
+    @override_settings(BLOB_STORAGE_CODEC="gzip")
+    def test_payloads_to_decompress_are_streamed_here(self):
+        get_blob_store.cache_clear()
+        self.store = get_blob_store()
+        data = b"Item;Quantity\n" * 1000
+        tender_file = self.attach(data, file_name="boq.csv", file_type="text/csv")
+
+        response = self.download(tender_file, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertTrue(response["X-Accel-Redirect"].endswith(".gz"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+        response = self.download(tender_file)
+        self.assertFalse(response.has_header("X-Accel-Redirect"))
+        self.assertEqual(b"".join(response.streaming_content), data)
+
+
+@unittest.skipUnless(pymupdf and pikepdf, "PyMuPDF and pikepdf are needed")
+class Linearized_Download_Tests(Tender_File_TestCase):
+    URL = "/api/Tender/getfiledata/"
+
+    def test_linearized_copy_is_opt_in(self):
+        pdf = make_pdf(3)
+        tender_file = self.attach(pdf)
+        params = {"file_id": tender_file.file_id}
+        # Not made yet: the original is served either way
+        response = self.client.get(self.URL, {**params, "linearized": "true"})
+        self.assertEqual(b"".join(response.streaming_content), pdf)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_previews([(tender_file.file_hash, "application/pdf")])
+        preview = Preview.objects.get()
+        self.assertIsNotNone(preview.linearized_hash)
+        self.assertEqual(preview.first_page_bytes, len(pdf))
+        self.assertLess(preview.linearized_first_page_bytes, preview.linearized_size)
+
+        response = self.client.get(self.URL, params)
+        self.assertEqual(response["ETag"], f'"{tender_file.file_hash}"')
+        self.assertEqual(b"".join(response.streaming_content), pdf)
+
+        response = self.client.get(self.URL, {**params, "linearized": "true"})
+        self.assertEqual(response["ETag"], f'"{preview.linearized_hash}"')
+        self.assertEqual(response["Content-Length"], str(preview.linearized_size))
+        self.assertIn(b"/Linearized", b"".join(response.streaming_content)[:1024])
+
+
+    @override_settings(BLOB_STORAGE_CODEC="gzip")
+    def test_sniffed_pdfs_get_an_uncompressed_copy(self):
+        get_blob_store.cache_clear()
+        self.store = get_blob_store()
+        pdf = make_pdf(3)
+        tender_file = self.attach(pdf, file_type="application/octet-stream")
+        Tender_Files.objects.filter(pk=tender_file.pk).update(detected_type="application/pdf")
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_previews([(tender_file.file_hash, "application/pdf")])
+        preview = Preview.objects.get()
+        # Range requests on the copy are answered without decoding it from the start
+        self.assertEqual(Blob.objects.get(digest=preview.linearized_hash).codec, "identity")
+
+        params = {"file_id": tender_file.file_id, "linearized": "true"}
+        response = self.client.get(self.URL, params)
+        self.assertEqual(response["ETag"], f'"{preview.linearized_hash}"')
+
+@override_settings(BLOB_STORAGE_CODEC="gzip")
+class Digest_Header_Tests(Tender_File_TestCase):
+    URL = "/api/Tender/getfiledata/"
+    DATA = b"Item;Quantity;Unit price\n" * 2000
+
+    def setUp(self):
+        super().setUp()
+        self.file = self.attach(self.DATA, file_name="boq.csv", file_type="text/csv")
+        self.digest = base64.b64encode(hashlib.sha256(self.DATA).digest()).decode()
+
+    def download(self, **headers):
+        return self.client.get(self.URL, {"file_id": self.file.file_id}, **headers)
+
+    def test_digest_of_the_whole_payload_is_announced(self):
+        for headers in [{}, {"HTTP_RANGE": "bytes=0-99"}]:
+            with self.subTest(headers=headers):
+                response = self.download(**headers)
+                self.assertIn(response.status_code, (200, 206))
+                self.assertEqual(response["Repr-Digest"], f"sha-256=:{self.digest}:")
+                self.assertEqual(response["Digest"], f"SHA-256={self.digest}")
+
+    def test_no_digest_for_encoded_or_empty_responses(self):
+        response = self.download(HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Repr-Digest"))
+        self.assertFalse(response.has_header("Digest"))
+
+        response = self.download(HTTP_IF_NONE_MATCH=f'"{self.file.file_hash}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.has_header("Repr-Digest"))
+
+
+class Parse_Range_Header_Tests(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range_header("bytes=0-99", 1000), [(0, 99)])
+        self.assertEqual(parse_range_header("bytes=900-", 1000), [(900, 999)])
+        self.assertEqual(parse_range_header("bytes=-100", 1000), [(900, 999)])
+        self.assertEqual(parse_range_header("bytes=-2000", 1000), [(0, 999)])
+        self.assertEqual(parse_range_header("bytes=990-2000", 1000), [(990, 999)])
+        self.assertEqual(parse_range_header("BYTES = 1-2", 1000), [(1, 2)])
+
+    def test_overlapping_and_adjacent_ranges_are_merged(self):
+        self.assertEqual(
+            parse_range_header("bytes=50-99,0-49,80-120,500-510", 1000),
+            [(0, 120), (500, 510)],
+        )
+
+    def test_unsatisfiable(self):
+        self.assertEqual(parse_range_header("bytes=1000-", 1000), [])
+        self.assertEqual(parse_range_header("bytes=-0", 1000), [])
+        self.assertEqual(parse_range_header("bytes=0-", 0), [])
+
+    def test_ignored(self):
+        for header in (None, "", "items=0-1", "bytes=", "bytes=5-1", "bytes=-", "bytes=a-b"):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range_header(header, 1000))
+
+    def test_too_many_ranges(self):
+        specs = ",".join(
+            f"{start * 10}-{start * 10 + 1}" for start in range(MAX_RANGES_PER_REQUEST + 1)
+        )
+        self.assertIsNone(parse_range_header(f"bytes={specs}", 1000))
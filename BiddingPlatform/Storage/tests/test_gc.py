@@ -0,0 +1,71 @@
+import io
+import os
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+
+from Storage.gc import collect_blobs
+from Storage.models import Blob
+
+from .base import Tender_File_TestCase
+
+
+class Collect_Blobs_Tests(Tender_File_TestCase):
+    def setUp(self):
+        super().setUp()
+        self.kept = self.attach(b"referenced").file_hash
+        self.orphan = self.put(b"orphan").digest
+        Blob.release(self.orphan)
+        self.recent = self.put(b"recent").digest
+        Blob.release(self.recent)
+        # Written before the grace period, but referenced only by a file row
+        self.unregistered = self.attach(b"no blob row").file_hash
+        Blob.objects.filter(digest=self.unregistered).delete()
+        for digest in (self.kept, self.orphan, self.unregistered):
+            self.make_old(self.store.locate(digest)[0])
+
+        fd, self.spool_file = self.store.spool()
+        os.close(fd)
+        self.make_old(Path(self.spool_file))
+
+    def make_old(self, path):
+        past = time.time() - 2 * 60 * 60
+        os.utime(path, (past, past))
+
+    def test_dry_run_removes_nothing(self):
+        report = collect_blobs(dry_run=True)
+        self.assertEqual(report["payloads_removed"], 1)
+        self.assertEqual(report["bytes_reclaimed"], len(b"orphan"))
+        self.assertEqual(report["spool_files_removed"], 1)
+        self.assertTrue(self.store.exists(self.orphan))
+        self.assertTrue(os.path.exists(self.spool_file))
+        self.assertTrue(Blob.objects.filter(digest=self.orphan).exists())
+
+    def test_sweep(self):
+        Blob.objects.filter(digest=self.kept).update(ref_count=5)
+        report = collect_blobs()
+
+        self.assertEqual(report["ref_counts_corrected"], 1)
+        self.assertEqual(report["blob_rows_created"], 1)
+        self.assertEqual(Blob.objects.get(digest=self.kept).ref_count, 1)
+        self.assertEqual(Blob.objects.get(digest=self.unregistered).ref_count, 1)
+
+        self.assertEqual(report["payloads_removed"], 1)
+        self.assertFalse(self.store.exists(self.orphan))
+        self.assertFalse(Blob.objects.filter(digest=self.orphan).exists())
+        for digest in (self.kept, self.recent, self.unregistered):
+            self.assertTrue(self.store.exists(digest))
+        self.assertFalse(os.path.exists(self.spool_file))
+        self.assertEqual(report["missing_payloads"], [])
+
+    def test_missing_payloads_are_reported(self):
+        tender_file = self.attach(b"lost")
+        os.unlink(self.store.locate(tender_file.file_hash)[0])
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command("collect_blobs", "--dry-run", stdout=stdout, stderr=stderr)
+        self.assertIn("[dry run] payloads_removed: 1", stdout.getvalue())
+        self.assertIn(
+            f"Tender_Files {tender_file.file_id}: payload {tender_file.file_hash} is missing",
+            stderr.getvalue(),
+        )
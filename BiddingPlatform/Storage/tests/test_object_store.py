@@ -0,0 +1,317 @@
+import base64
+import hashlib
+import io
+import unittest
+from datetime import timedelta
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from Bit.models import Bit_Files
+from Storage.direct_uploads import claim_direct_uploads, consume_direct_uploads
+from Storage.gc import sweep_upload_state
+from Storage.models import Blob, Direct_Upload
+from Storage.object_store import ObjectStore, boto3
+from User.models import User
+
+from .base import Tender_File_TestCase, sha256
+
+try:
+    from botocore.exceptions import ClientError
+except ImportError:  # Object storage tests are skipped without boto3
+    ClientError = None
+
+
+class FakeS3Client:
+    """
+    In-memory stand-in for the boto3 S3 client, answering the calls ObjectStore makes
+    the way S3 (or MinIO) does. Objects are ``key -> (bytes, last modified, SHA-256)``.
+    """
+
+    def __init__(self):
+        self.objects = {}
+
+    def put(self, key, data, checksum=True, last_modified=None):
+        """Store an object, as a PUT sending ``x-amz-checksum-sha256`` would."""
+        sha = base64.b64encode(hashlib.sha256(data).digest()).decode() if checksum else None
+        self.objects[key] = (data, last_modified or timezone.now(), sha)
+
+    def _get(self, key, operation):
+        if key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, operation)
+        return self.objects[key]
+
+    def head_object(self, Bucket, Key, ChecksumMode=None):
+        data, last_modified, sha = self._get(Key, "HeadObject")
+        head = {"ContentLength": len(data), "LastModified": last_modified}
+        if sha is not None and ChecksumMode == "ENABLED":
+            head["ChecksumSHA256"] = sha
+        return head
+
+    def get_object(self, Bucket, Key, Range=None):
+        data = self._get(Key, "GetObject")[0]
+        if Range is not None:
+            start, end = Range.removeprefix("bytes=").split("-")
+            data = data[int(start):int(end) + 1]
+        return {"Body": io.BytesIO(data)}
+
+    def copy_object(self, Bucket, Key, CopySource, ChecksumAlgorithm=None):
+        data = self._get(CopySource["Key"], "CopyObject")[0]
+        self.put(Key, data, checksum=ChecksumAlgorithm == "SHA256")
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None):
+        checksum = (ExtraArgs or {}).get("ChecksumAlgorithm") == "SHA256"
+        self.put(Key, Path(Filename).read_bytes(), checksum=checksum)
+
+    def download_file(self, Bucket, Key, Filename):
+        Path(Filename).write_bytes(self._get(Key, "GetObject")[0])
+
+    def get_paginator(self, operation):
+        client = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = sorted(key for key in client.objects if key.startswith(Prefix))
+                for start in range(0, len(keys), 2):  # Small pages, to cross them
+                    yield {
+                        "Contents": [
+                            {
+                                "Key": key,
+                                "LastModified": client.objects[key][1],
+                                "Size": len(client.objects[key][0]),
+                            }
+                            for key in keys[start:start + 2]
+                        ]
+                    }
+
+        return Paginator()
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://s3.test/{Params['Bucket']}/{Params['Key']}?operation={operation}"
+
+
+@unittest.skipUnless(boto3, "boto3 is not installed")
+class Object_Store_Tests(Tender_File_TestCase):
+    DATA = b"%PDF-1.7\n" + bytes(range(256)) * 8
+
+    def setUp(self):
+        super().setUp()
+        self.s3 = FakeS3Client()
+        self.store.remote = ObjectStore("bids", prefix="payloads/", client=self.s3)
+        self.company = User.objects.create_user("company", "company@example.com", "password")
+
+    def announce(self, data, user=None, file_name="proposal.pdf", upload=True):
+        """Create a direct upload as ``user`` and, unless ``upload`` is False, PUT it."""
+        client = APIClient()
+        client.force_authenticate(user or self.company)
+        response = client.post(
+            "/api/Storage/direct_upload/create/",
+            {
+                "file_name": file_name,
+                "file_type": "application/pdf",
+                "file_size": len(data),
+                "file_hash": sha256(data),
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.data["data"]["upload_id"]
+        if upload:
+            self.s3.put(f"payloads/uploads/{upload_id}", data)
+        return upload_id
+
+    def test_payloads_are_kept_uncompressed_under_their_digest(self):
+        digest = self.put(self.DATA, "application/pdf").digest
+        self.assertEqual(self.store.move_to_remote(digest), len(self.DATA))
+        self.assertIsNone(self.store.locate(digest))
+        self.assertEqual(
+            self.s3.objects[f"payloads/{digest[:2]}/{digest[2:4]}/{digest}"][0], self.DATA
+        )
+
+        stat = self.store.remote.stat(digest)
+        self.assertEqual((stat["size"], stat["sha256"]), (len(self.DATA), digest))
+        self.assertEqual(self.store.remote.open(digest, (9, 12)).read(), bytes(range(4)))
+        with self.store.open(digest) as payload:
+            self.assertEqual(payload.read(), self.DATA)
+        with self.store.local_path(digest) as path:
+            self.assertEqual(Path(path).read_bytes(), self.DATA)
+
+        self.assertIsNone(self.store.remote.stat("0" * 64))
+        with self.assertRaises(FileNotFoundError):
+            self.store.remote.open("0" * 64)
+
+    def test_listing_skips_direct_uploads(self):
+        digests = sorted(sha256(bytes([n])) for n in range(3))
+        for digest in digests:
+            self.s3.put(self.store.remote.key(digest), b"x")
+        self.s3.put("payloads/uploads/pending", b"x")
+        self.s3.put("elsewhere/file", b"x")
+        self.assertEqual([entry[0] for entry in self.store.remote.iter_payloads()], digests)
+        self.assertEqual([entry[0] for entry in self.store.remote.iter_uploads()], ["pending"])
+
+    def test_downloads_redirect_to_a_presigned_url(self):
+        tender_file = self.attach(self.DATA)
+        self.store.move_to_remote(tender_file.file_hash)
+        params = {"file_id": tender_file.file_id}
+
+        response = self.client.get("/api/Tender/getfiledata/", params)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            response["Location"],
+            f"https://s3.test/bids/{self.store.remote.key(tender_file.file_hash)}"
+            "?operation=get_object",
+        )
+        self.assertEqual(response["Cache-Control"], "private, no-store")
+
+        etag = f'"{tender_file.file_hash}"'
+        response = self.client.get("/api/Tender/getfiledata/", params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_direct_upload_url_is_signed_with_the_checksum(self):
+        upload_id = self.announce(self.DATA, upload=False)
+        upload = Direct_Upload.objects.get()
+        self.assertEqual(str(upload.upload_id), upload_id)
+        self.assertEqual((upload.created_by, upload.policy), (self.company, "bid_files"))
+        url, headers = self.store.remote.upload_url(
+            upload_id, upload.file_hash, upload.file_size, upload.file_type
+        )
+        self.assertIn(f"payloads/uploads/{upload_id}?operation=put_object", url)
+        self.assertEqual(
+            headers["x-amz-checksum-sha256"],
+            base64.b64encode(hashlib.sha256(self.DATA).digest()).decode(),
+        )
+        self.assertEqual(headers["Content-Length"], str(len(self.DATA)))
+
+    def test_direct_uploads_need_object_storage(self):
+        self.store.remote = None
+        client = APIClient()
+        client.force_authenticate(self.company)
+        response = client.post(
+            "/api/Storage/direct_upload/create/",
+            {"file_name": "a.pdf", "file_size": 1, "file_hash": sha256(b"a")},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_claimed_uploads_are_stored_under_their_digest(self):
+        upload_id = self.announce(self.DATA)
+        files, payloads, error = claim_direct_uploads(self.company, [upload_id], "bid_files")
+        self.assertIsNone(error)
+        self.assertEqual(files[0].detected_type, "application/pdf")
+        self.assertEqual(payloads[0].digest, sha256(self.DATA))
+        self.assertTrue(self.store.remote.exists(sha256(self.DATA)))
+        self.assertEqual(Blob.objects.get().tier, Blob.OBJECT)
+
+        # The upload's own object goes once the files are attached
+        with self.captureOnCommitCallbacks(execute=True):
+            consume_direct_uploads(files)
+        self.assertFalse(Direct_Upload.objects.exists())
+        self.assertNotIn(f"payloads/uploads/{upload_id}", self.s3.objects)
+        self.assertIn(self.store.remote.key(sha256(self.DATA)), self.s3.objects)
+
+    def test_content_stored_locally_stays_on_its_tier(self):
+        # Unreferenced, as a payload waiting for collect_blobs is
+        self.store.archive.save([self.DATA], "application/pdf")
+        path, codec = self.store.locate(sha256(self.DATA))
+        upload_id = self.announce(self.DATA)
+        payload = claim_direct_uploads(self.company, [upload_id], "bid_files")[1][0]
+        self.assertEqual((payload.codec, payload.stored_size), (codec, path.stat().st_size))
+        blob = Blob.objects.get()
+        self.assertEqual(
+            (blob.tier, blob.codec, blob.stored_size), (Blob.ARCHIVE, codec, path.stat().st_size)
+        )
+        self.assertFalse(self.store.remote.exists(sha256(self.DATA)))
+
+    def test_an_upload_is_attached_once(self):
+        upload_id = self.announce(self.DATA)
+        first = claim_direct_uploads(self.company, [upload_id], "bid_files")[0]
+        second = claim_direct_uploads(self.company, [upload_id], "bid_files")[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(consume_direct_uploads(first))
+        with transaction.atomic():
+            error = consume_direct_uploads(second)
+        self.assertEqual(error.status_code, 409)
+        self.assertEqual(error.data["data"], [upload_id])
+
+    def test_claim_rejects_uploads_that_do_not_match(self):
+        not_uploaded = self.announce(self.DATA, upload=False)
+        wrong_size = self.announce(self.DATA)
+        self.s3.put(f"payloads/uploads/{wrong_size}", self.DATA[:-1])
+        unchecked = self.announce(self.DATA)
+        self.s3.put(f"payloads/uploads/{unchecked}", self.DATA, checksum=False)
+        executable = b"MZ\x90\x00" + bytes(252)
+        disallowed = self.announce(executable, file_name="setup.pdf")
+
+        for upload_id, reason in [
+            (not_uploaded, "File was not uploaded."),
+            (wrong_size, "Uploaded file does not match."),
+            (unchecked, "Uploaded file does not match."),
+            (disallowed, None),
+        ]:
+            with self.subTest(reason=reason):
+                files, payloads, error = claim_direct_uploads(
+                    self.company, [upload_id], "bid_files"
+                )
+                self.assertEqual((files, payloads), ([], []))
+                self.assertEqual(error.status_code, 415)
+                if reason is not None:
+                    self.assertEqual(error.data["data"][0]["reason"], reason)
+        self.assertFalse(Blob.objects.exists())
+        self.assertEqual(list(self.store.remote.iter_payloads()), [])
+
+    def test_only_the_uploader_can_claim(self):
+        upload_id = self.announce(self.DATA)
+        error = claim_direct_uploads(self.admin, [upload_id], "bid_files")[2]
+        self.assertEqual(error.status_code, 404)
+        error = claim_direct_uploads(self.company, [upload_id], "tender_files")[2]
+        self.assertEqual(error.status_code, 404)
+        error = claim_direct_uploads(self.company, ["not-a-uuid"], "bid_files")[2]
+        self.assertEqual(error.status_code, 400)
+
+    def test_bid_created_from_direct_uploads(self):
+        upload_id = self.announce(self.DATA)
+        client = APIClient()
+        client.force_authenticate(self.company)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                "/api/Bit/create/",
+                {
+                    "tender_id": self.tender.tender_id,
+                    "title": "Bid",
+                    "description": "Description",
+                    "cost": "900.00",
+                    "date": "2025-02-01T00:00:00Z",
+                    "Technical_uploads": [upload_id],
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+        bit_file = Bit_Files.objects.get()
+        self.assertTrue(bit_file.file_name.startswith("proposal"))
+        self.assertEqual(bit_file.file_hash, sha256(self.DATA))
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+        self.assertEqual(list(self.store.remote.iter_uploads()), [])
+
+    def test_sweep_removes_abandoned_upload_objects(self):
+        pending = self.announce(self.DATA)
+        stale = timezone.now() - timedelta(days=2)
+        self.s3.put("payloads/uploads/abandoned", self.DATA, last_modified=stale)
+        self.s3.put("payloads/uploads/recent", self.DATA)
+        Direct_Upload.objects.update(Created_At=stale)
+        self.s3.put(f"payloads/uploads/{pending}", self.DATA, last_modified=stale)
+
+        report = sweep_upload_state(timedelta(days=1), timedelta(days=7))
+        self.assertEqual(report["direct_uploads_removed"], 0)
+        self.assertEqual(
+            sorted(entry[0] for entry in self.store.remote.iter_uploads()), [pending, "recent"]
+        )
+
+        # Expired uploads are forgotten with their objects
+        report = sweep_upload_state(timedelta(days=1), timedelta(days=1))
+        self.assertEqual(report["direct_uploads_removed"], 1)
+        self.assertEqual([entry[0] for entry in self.store.remote.iter_uploads()], ["recent"])
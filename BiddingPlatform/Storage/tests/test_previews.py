@@ -0,0 +1,259 @@
+import io
+import os
+import unittest
+from datetime import timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from Storage.imaging import Image
+from Storage.models import Image_Rendition, Pdf_Page, Preview, Preview_Image
+from Storage.pdf_pages import parse_page_ranges
+from Storage.pdf_render import pymupdf
+from Storage.previews import schedule_previews
+from Tender.models import Tender_Files
+
+from .base import Tender_File_TestCase, make_pdf, sha256
+
+
+@unittest.skipUnless(pymupdf, "PyMuPDF is not installed")
+@override_settings(PREVIEW_PAGES=2, PDF_LINEARIZE=False)
+class Preview_Tests(Tender_File_TestCase):
+    UPLOAD_URL = "/api/Tender/addfile/"
+    URL = "/api/Tender/getfilepreview/"
+
+    def upload(self, data, file_name="terms.pdf"):
+        """Upload a file and run the background work it queues."""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.UPLOAD_URL,
+                {
+                    "tender_id": self.tender.tender_id,
+                    "files": [SimpleUploadedFile(file_name, data, "application/pdf")],
+                },
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 201)
+        file_id = response.data["data"]["uploaded_files"][0]["file_id"]
+        return Tender_Files.objects.get(file_id=file_id)
+
+    def preview(self, tender_file, **params):
+        return self.client.get(self.URL, {"file_id": tender_file.file_id, **params})
+
+    def test_previews_are_rendered_once_per_payload(self):
+        pdf = make_pdf(3)
+        tender_file = self.upload(pdf)
+        self.upload(pdf, file_name="copy.pdf")
+
+        preview = Preview.objects.get()
+        self.assertEqual((preview.status, preview.page_count), (Preview.READY, 3))
+        self.assertEqual(
+            sorted(preview.images.values_list("kind", "page")),
+            [("page", 1), ("page", 2), ("thumbnail", 1)],
+        )
+        texts = Pdf_Page.objects.order_by("page").values_list("text", flat=True)
+        self.assertEqual([text.strip() for text in texts], ["Page 1", "Page 2", "Page 3"])
+
+        response = self.preview(tender_file)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        png = b"".join(response.streaming_content)
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        thumbnail = preview.images.get(kind=Preview_Image.THUMBNAIL)
+        self.assertEqual((thumbnail.width, len(png)), (200, thumbnail.size))
+
+        response = self.client.get(
+            self.URL, {"file_id": tender_file.file_id}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+        self.assertEqual(self.preview(tender_file, kind="page", page=2).status_code, 200)
+        response = self.preview(tender_file, kind="page", page=3)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data["data"]["page_count"], 3)
+
+    def test_broken_pdf(self):
+        tender_file = self.upload(b"%PDF-1.7 truncated")
+        response = self.preview(tender_file)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Preview.objects.get().status, Preview.FAILED)
+
+    def test_only_pdfs(self):
+        tender_file = self.attach(b"notes", file_name="notes.txt", file_type="text/plain")
+        self.assertEqual(self.preview(tender_file).status_code, 415)
+
+    def test_pending_previews_are_requeued(self):
+        tender_file = self.attach(make_pdf(1))
+        Preview.objects.create(source_hash=tender_file.file_hash)
+        response = self.preview(tender_file)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response["Retry-After"], "5")
+
+        # Pending for longer than PREVIEW_PENDING_TIMEOUT: the queued work was lost
+        Preview.objects.update(Updated_At=timezone.now() - timedelta(hours=1))
+        stdout = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("requeue_previews", stdout=stdout)
+        self.assertIn("previews_requeued: 1", stdout.getvalue())
+        self.assertEqual(Preview.objects.get().status, Preview.READY)
+        self.assertEqual(self.preview(tender_file).status_code, 200)
+
+
+@unittest.skipUnless(pymupdf, "PyMuPDF is not installed")
+@override_settings(PDF_LINEARIZE=False)
+class Page_Extract_Tests(Tender_File_TestCase):
+    URL = "/api/Tender/getfilepages/"
+
+    def setUp(self):
+        super().setUp()
+        self.file = self.attach(make_pdf(5), file_name="specs.pdf")
+
+    def extract(self, pages, output="pdf"):
+        return self.client.get(
+            self.URL, {"file_id": self.file.file_id, "pages": pages, "output": output}
+        )
+
+    def index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_previews([(self.file.file_hash, "application/pdf")])
+
+    def check_pdf(self, response, texts):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        with pymupdf.open(stream=response.content, filetype="pdf") as document:
+            self.assertEqual([page.get_text().strip() for page in document], texts)
+
+    def test_pages_as_pdf(self):
+        response = self.extract("4-5,2")
+        self.check_pdf(response, ["Page 4", "Page 5", "Page 2"])
+        self.assertIn('filename="specs_pages_4-5_2.pdf"', response["Content-Disposition"])
+
+        self.index()
+        self.check_pdf(self.extract("3"), ["Page 3"])
+
+    def test_pages_as_text(self):
+        expected = [{"page": 2, "text": "Page 2"}, {"page": 3, "text": "Page 3"}]
+        for indexed in (False, True):
+            if indexed:
+                self.index()
+            with self.subTest(indexed=indexed):
+                response = self.extract("2-3", output="text")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data["data"]["page_count"], 5)
+                pages = [
+                    {"page": page["page"], "text": page["text"].strip()}
+                    for page in response.data["data"]["pages"]
+                ]
+                self.assertEqual(pages, expected)
+
+    def test_pages_past_the_end(self):
+        for indexed in (False, True):
+            if indexed:
+                self.index()
+            with self.subTest(indexed=indexed):
+                response = self.extract("4-6")
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data["message"], "The document has only 5 page(s)")
+
+
+class Parse_Page_Ranges_Tests(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_page_ranges("3"), [(3, 3)])
+        self.assertEqual(parse_page_ranges(" 5 - 9 "), [(5, 9)])
+        self.assertEqual(parse_page_ranges("1,4-6,2", page_count=6), [(1, 1), (4, 6), (2, 2)])
+
+    def test_invalid(self):
+        for spec in ("", None, "0", "3-1", "a", "1-", "1,,2", "-2"):
+            with self.subTest(spec=spec):
+                with self.assertRaises(ValueError):
+                    parse_page_ranges(spec)
+
+    def test_past_the_last_page(self):
+        with self.assertRaisesMessage(ValueError, "The document has only 4 page(s)"):
+            parse_page_ranges("2-5", page_count=4)
+
+    @override_settings(PDF_EXTRACT_MAX_PAGES=10)
+    def test_too_many_pages(self):
+        self.assertEqual(parse_page_ranges("1-5,11-15"), [(1, 5), (11, 15)])
+        with self.assertRaises(ValueError):
+            parse_page_ranges("1-5,11-16")
+
+
+def make_image(size, image_format="PNG"):
+    """An image of random noise, which does not compress."""
+    buffer = io.BytesIO()
+    Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+@unittest.skipUnless(Image, "Pillow is not installed")
+@override_settings(IMAGE_RENDITION_MIN_SIZE=4096, IMAGE_RENDITION_MAX_DIMENSION=64)
+class Image_Rendition_Tests(Tender_File_TestCase):
+    def upload(self, data, file_name="vat.png", file_type="image/png"):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/User/add_user_file/",
+                {"files": [SimpleUploadedFile(file_name, data, file_type)]},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 201)
+        return response.data["data"]["uploaded_files"][0]["file_id"]
+
+    def review(self, file_id):
+        return self.client.get(
+            "/api/User/get_user_file_data/", {"file_id": file_id, "rendition": "review"}
+        )
+
+    def test_large_images_are_reviewed_downscaled(self):
+        original = make_image((320, 160))
+        file_id = self.upload(original)
+        rendition = Image_Rendition.objects.get(source_hash=sha256(original))
+        self.assertEqual(rendition.status, Image_Rendition.READY)
+        self.assertEqual((rendition.width, rendition.height), (64, 32))
+        self.assertEqual((rendition.original_width, rendition.original_height), (320, 160))
+        self.assertLess(rendition.size, len(original))
+
+        response = self.review(file_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertIn('filename="vat_', response["Content-Disposition"])
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (64, 32))
+
+        # The original is kept untouched for audit
+        response = self.client.get("/api/User/get_user_file_data/", {"file_id": file_id})
+        self.assertEqual(b"".join(response.streaming_content), original)
+
+    def test_small_images_are_reviewed_as_they_are(self):
+        original = make_image((16, 16))
+        file_id = self.upload(original)
+        rendition = Image_Rendition.objects.get(source_hash=sha256(original))
+        self.assertEqual(rendition.status, Image_Rendition.SKIPPED)
+        response = self.review(file_id)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(b"".join(response.streaming_content), original)
+
+    def test_undecodable_images_fail_and_serve_the_original(self):
+        original = b"\x89PNG\r\n\x1a\n" + os.urandom(8192)
+        file_id = self.upload(original)
+        rendition = Image_Rendition.objects.get(source_hash=sha256(original))
+        self.assertEqual(rendition.status, Image_Rendition.FAILED)
+        self.assertTrue(rendition.error)
+        self.assertEqual(b"".join(self.review(file_id).streaming_content), original)
+
+    def test_only_images(self):
+        self.upload(make_pdf(1), file_name="vat.pdf", file_type="application/pdf")
+        self.assertFalse(Image_Rendition.objects.exists())
+
+    def test_pending_renditions_are_requeued(self):
+        original = make_image((320, 160))
+        payload = self.put(original, "image/png")
+        Image_Rendition.objects.create(source_hash=payload.digest)
+        Image_Rendition.objects.update(Updated_At=timezone.now() - timedelta(hours=1))
+        stdout = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("requeue_previews", stdout=stdout)
+        self.assertIn("renditions_requeued: 1", stdout.getvalue())
+        self.assertEqual(Image_Rendition.objects.get().status, Image_Rendition.READY)
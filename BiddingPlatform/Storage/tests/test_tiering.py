@@ -0,0 +1,75 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from Bit.models import Bit
+from Storage import codecs
+from Storage.models import Blob
+from Storage.tiering import archive_closed_tender_files
+from Tender.models import Tender, Tender_Files
+
+from .base import Tender_File_TestCase
+
+
+class Archive_Tiering_Tests(Tender_File_TestCase):
+    URL = "/api/Tender/getfiledata/"
+
+    def setUp(self):
+        super().setUp()
+        Tender.objects.filter(pk=self.tender.pk).update(end_date="2020-01-01T00:00:00Z")
+        Bit.objects.create(
+            title="Winning bid",
+            description="Description",
+            date="2019-12-01T00:00:00Z",
+            cost=Decimal("900.00"),
+            created_by=self.admin,
+            tender=self.tender,
+            Is_Accepted=True,
+        )
+        self.closed_file = self.attach(b"Closed tender terms " * 100)
+        self.shared_file = self.attach(b"Standard conditions " * 100)
+
+        # The same conditions are attached to a tender still open
+        open_tender = Tender.objects.create(
+            title="Open tender",
+            description="Description",
+            start_date="2025-01-01T00:00:00Z",
+            budget=Decimal("1000.00"),
+            created_by=self.admin,
+        )
+        Tender_Files.objects.create(
+            tender=open_tender,
+            file_name="conditions.pdf",
+            file_type="application/pdf",
+            file_size=self.shared_file.file_size,
+            file_hash=self.shared_file.file_hash,
+        )
+
+    def test_dry_run(self):
+        report = archive_closed_tender_files(days=90, dry_run=True)
+        self.assertEqual(report["payloads_archived"], 1)
+        self.assertEqual(Blob.objects.get(digest=self.closed_file.file_hash).tier, Blob.HOT)
+
+    def test_closed_tender_files_are_archived(self):
+        report = archive_closed_tender_files(days=90)
+        self.assertEqual(report["payloads_archived"], 1)
+        self.assertEqual(report["hot_bytes_freed"], self.closed_file.file_size)
+
+        digest = self.closed_file.file_hash
+        blob = Blob.objects.get(digest=digest)
+        self.assertEqual((blob.tier, blob.codec), (Blob.ARCHIVE, codecs.GZIP))
+        path, codec = self.store.locate(digest)
+        self.assertTrue(self.store.is_archived(path))
+        self.assertEqual(blob.stored_size, path.stat().st_size)
+        self.assertFalse(self.store.path(digest).exists())
+        self.assertEqual(Blob.objects.get(digest=self.shared_file.file_hash).tier, Blob.HOT)
+
+        # Reads fall through to the archive
+        response = self.client.get(self.URL, {"file_id": self.closed_file.file_id})
+        self.assertEqual(b"".join(response.streaming_content), b"Closed tender terms " * 100)
+
+    def test_recently_closed_tenders_stay_hot(self):
+        end_date = timezone.now() - timedelta(days=10)
+        Tender.objects.filter(pk=self.tender.pk).update(end_date=end_date)
+        self.assertEqual(archive_closed_tender_files(days=90)["payloads_archived"], 0)
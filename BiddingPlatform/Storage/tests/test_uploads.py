@@ -0,0 +1,245 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+
+from Storage.mime import resolve_content_type, sniff_content_type
+from Storage.models import Blob, Upload_Session
+from Tender.models import Tender, Tender_Files
+from User.models import User
+
+from .base import Tender_File_TestCase, sha256
+
+OOXML_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+@override_settings(BLOB_UPLOAD_CHUNK_SIZE=1024)
+class Upload_Tests(Tender_File_TestCase):
+    URL = "/api/Tender/addfile/"
+
+    def upload(self, *files):
+        data = {"tender_id": self.tender.tender_id, "files": list(files)}
+        return self.client.post(self.URL, data, format="multipart")
+
+    def test_files_are_streamed_into_the_store(self):
+        data = b"line of the bill of quantities\n" * 500
+        response = self.upload(SimpleUploadedFile("boq.txt", data, "text/plain"))
+        self.assertEqual(response.status_code, 201)
+
+        file_id = response.data["data"]["uploaded_files"][0]["file_id"]
+        tender_file = Tender_Files.objects.get(file_id=file_id)
+        self.assertEqual((tender_file.file_hash, tender_file.file_size), (sha256(data), len(data)))
+        self.assertEqual(tender_file.detected_type, "text/plain")
+        self.assertEqual(Blob.objects.get(digest=sha256(data)).ref_count, 1)
+        with self.store.open(sha256(data)) as payload:
+            self.assertEqual(payload.read(), data)
+        # The spool file was moved into place, not copied
+        self.assertEqual(list((self.store.root / "tmp").iterdir()), [])
+
+    def test_generic_content_type_is_replaced_by_the_sniffed_one(self):
+        response = self.upload(
+            SimpleUploadedFile("terms.bin", b"%PDF-1.7 terms", "application/octet-stream")
+        )
+        self.assertEqual(response.status_code, 201)
+        uploaded = response.data["data"]["uploaded_files"][0]
+        self.assertEqual(uploaded["file_type"], "application/pdf")
+
+    def test_batch_is_attached_together(self):
+        response = self.upload(
+            SimpleUploadedFile("a.txt", b"same", "text/plain"),
+            SimpleUploadedFile("a.txt", b"same", "text/plain"),
+            SimpleUploadedFile("b.txt", b"other", "text/plain"),
+        )
+        self.assertEqual(response.status_code, 201)
+        names = [file["file_name"] for file in response.data["data"]["uploaded_files"]]
+        self.assertEqual(len(set(names)), 3)
+        self.assertEqual(
+            dict(Blob.objects.values_list("digest", "ref_count")),
+            {sha256(b"same"): 2, sha256(b"other"): 1},
+        )
+
+    def test_rows_get_primary_keys_without_bulk_returning(self):
+        features = type(connections["default"].features)
+        with mock.patch.object(features, "can_return_rows_from_bulk_insert", False):
+            response = self.upload(
+                SimpleUploadedFile("a.txt", b"one", "text/plain"),
+                SimpleUploadedFile("b.txt", b"two", "text/plain"),
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            sorted(file["file_id"] for file in response.data["data"]["uploaded_files"]),
+            sorted(Tender_Files.objects.values_list("file_id", flat=True)),
+        )
+
+    def test_failed_batch_records_nothing(self):
+        with mock.patch.object(Tender, "bump_version", side_effect=RuntimeError("boom")):
+            response = self.upload(
+                SimpleUploadedFile("a.txt", b"one", "text/plain"),
+                SimpleUploadedFile("b.txt", b"two", "text/plain"),
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Tender_Files.objects.exists())
+        self.assertFalse(Blob.objects.exists())
+
+
+@override_settings(UPLOAD_SESSION_MIN_CHUNK_SIZE=4)
+class Upload_Session_Tests(Tender_File_TestCase):
+    URL = "/api/Storage/upload_session/"
+    DATA = b"0123456789abcdefghij\n"
+
+    def create_session(self, file_hash=None):
+        response = self.client.post(
+            f"{self.URL}create/",
+            {
+                "target_type": "tender",
+                "target_id": self.tender.tender_id,
+                "file_name": "annex.txt",
+                "file_type": "text/plain",
+                "file_size": len(self.DATA),
+                "file_hash": file_hash or sha256(self.DATA),
+                "chunk_size": 8,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["data"]["total_chunks"], 3)
+        return response.data["data"]["session_id"]
+
+    def send_chunk(self, session_id, index, data, chunk_hash=None):
+        return self.client.put(
+            f"{self.URL}chunk/?session_id={session_id}&index={index}",
+            data,
+            content_type="application/octet-stream",
+            HTTP_X_CHUNK_SHA256=chunk_hash or sha256(data),
+        )
+
+    def send_all(self, session_id, order=(0, 1, 2)):
+        for index in order:
+            chunk = self.DATA[index * 8:(index + 1) * 8]
+            self.assertEqual(self.send_chunk(session_id, index, chunk).status_code, 200)
+
+    def finalize(self, session_id):
+        return self.client.post(f"{self.URL}finalize/", {"session_id": session_id}, format="json")
+
+    def test_chunks_in_any_order(self):
+        session_id = self.create_session()
+        self.send_all(session_id, order=(2, 0, 1))
+        response = self.finalize(session_id)
+        self.assertEqual(response.status_code, 201)
+
+        tender_file = Tender_Files.objects.get(file_id=response.data["data"]["file_id"])
+        self.assertEqual(tender_file.file_hash, sha256(self.DATA))
+        with self.store.open(tender_file.file_hash) as payload:
+            self.assertEqual(payload.read(), self.DATA)
+        self.assertFalse(Upload_Session.objects.exists())
+        self.assertFalse((self.store.root / "sessions" / session_id).exists())
+
+    def test_corrupt_chunk_is_refused(self):
+        session_id = self.create_session()
+        response = self.send_chunk(session_id, 0, self.DATA[:8], chunk_hash=sha256(b"other"))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.data["data"]["hash_matches"])
+        # Every chunk but the last must be exactly chunk_size bytes
+        response = self.send_chunk(session_id, 1, self.DATA[8:12])
+        self.assertEqual(response.status_code, 400)
+
+        progress = self.client.get(f"{self.URL}status/", {"session_id": session_id})
+        self.assertEqual(progress.data["data"]["missing_chunks"], [0, 1, 2])
+        self.assertEqual(self.finalize(session_id).status_code, 400)
+
+    def test_file_hash_mismatch(self):
+        session_id = self.create_session(file_hash=sha256(b"something else"))
+        self.send_all(session_id)
+        response = self.finalize(session_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["data"]["received_hash"], sha256(self.DATA))
+        self.assertFalse(Tender_Files.objects.exists())
+        # The chunks must be sent again; the unreferenced payload is left to collect_blobs
+        progress = self.client.get(f"{self.URL}status/", {"session_id": session_id})
+        self.assertEqual(progress.data["data"]["missing_chunks"], [0, 1, 2])
+        self.assertFalse((self.store.root / "sessions" / session_id).exists())
+        self.assertTrue(self.store.exists(sha256(self.DATA)))
+
+    def test_storage_errors_are_server_errors(self):
+        session_id = self.create_session()
+        with mock.patch(
+            "Storage.blob_store.BlobStore.save_chunk", side_effect=OSError("No space left")
+        ):
+            response = self.send_chunk(session_id, 0, self.DATA[:8])
+        self.assertEqual(response.status_code, 500)
+
+    def test_sessions_are_private(self):
+        session_id = self.create_session()
+        other = User.objects.create_user("company", "company@example.com")
+        self.client.force_authenticate(other)
+        response = self.send_chunk(session_id, 0, self.DATA[:8])
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(BLOB_UPLOAD_CHUNK_SIZE=1024)
+class Upload_Rejection_Tests(Tender_File_TestCase):
+    URL = "/api/Tender/addfile/"
+
+    def upload(self, *files):
+        data = {"tender_id": self.tender.tender_id, "files": list(files)}
+        return self.client.post(self.URL, data, format="multipart")
+
+    def assertNothingStored(self):
+        self.assertFalse(Tender_Files.objects.exists())
+        self.assertEqual([digest for digest, _ in self.store.iter_payloads()], [])
+        self.assertEqual(list((self.store.root / "tmp").iterdir()), [])
+
+    def test_type_is_sniffed_not_declared(self):
+        executable = b"MZ\x90\x00\x03\x00" + b"\x00" * 5000
+        response = self.upload(
+            SimpleUploadedFile("terms.pdf", executable, "application/pdf"),
+            SimpleUploadedFile("notes.txt", b"notes", "text/plain"),
+        )
+        self.assertEqual(response.status_code, 415)
+        [rejection] = response.data["data"]
+        self.assertEqual(rejection["file_name"], "terms.pdf")
+        self.assertNothingStored()
+
+    def test_oversized_files_are_dropped_while_streaming(self):
+        policies = {**settings.UPLOAD_POLICIES}
+        policies["tender_files"] = {**policies["tender_files"], "max_size": 4096}
+        with self.settings(UPLOAD_POLICIES=policies):
+            response = self.upload(SimpleUploadedFile("big.txt", b"x" * 10000, "text/plain"))
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.data["data"][0]["file_name"], "big.txt")
+        self.assertNothingStored()
+
+
+class Sniff_Content_Type_Tests(SimpleTestCase):
+    def test_signatures(self):
+        for head, expected in [
+            (b"%PDF-1.7\n", "application/pdf"),
+            (b"\x89PNG\r\n\x1a\n\x00", "image/png"),
+            (b"\xff\xd8\xff\xe0", "image/jpeg"),
+            (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "image/webp"),
+            (b"PK\x03\x04\x14\x00word/document.xml", OOXML_DOCX),
+            (b"PK\x03\x04\x14\x00data.csv", "application/zip"),
+            (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+            ("نص عربي".encode(), "text/plain"),
+            # A multi-byte character cut at the end of the sniffed window
+            ("نص".encode()[:-1], "text/plain"),
+            (b"MZ\x90\x00", None),
+            (b"\xff\xfe\xfd text", None),
+            (b"", None),
+        ]:
+            with self.subTest(head=head):
+                self.assertEqual(sniff_content_type(head), expected)
+
+    def test_declared_type_is_trusted_within_the_sniffed_family(self):
+        self.assertEqual(
+            resolve_content_type("application/x-ole-storage", "application/msword"),
+            "application/msword",
+        )
+        self.assertEqual(resolve_content_type("application/zip", OOXML_DOCX), OOXML_DOCX)
+        self.assertEqual(resolve_content_type("text/plain", "text/csv; charset=utf-8"), "text/csv")
+        self.assertEqual(resolve_content_type("application/pdf", "image/png"), "application/pdf")
+        self.assertEqual(resolve_content_type("text/plain", "application/pdf"), "text/plain")
+        self.assertEqual(resolve_content_type("text/plain", "text/html"), "text/plain")
+        self.assertIsNone(resolve_content_type(None, "application/pdf"))
@@ -0,0 +1,143 @@
+"""
+Moving payloads between storage tiers.
+
+Tenders with an accepted bid whose end date is old enough are rarely opened again, so
+their payloads (and those of their bids) are recompressed into the archive store. A
+payload stays hot while anything else still uses it: a file of an open tender or bid,
+or a VAT certificate.
+
+Tender files are downloaded by every bidder, so with object storage configured they
+are moved there and served through presigned URLs instead of the application servers.
+"""
+import logging
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from Bit.models import Bit_Files
+from Tender.models import Tender, Tender_Files
+from User.models import VAT_Certificate_Manager
+
+from . import codecs
+from .blob_store import get_blob_store
+from .models import Blob
+
+logger = logging.getLogger(__name__)
+
+
+def closed_tenders(days):
+    """Tenders awarded to a bid whose end date is more than ``days`` days ago."""
+    cutoff = timezone.now() - timedelta(days=days)
+    return Tender.objects.filter(bits__Is_Accepted=True, end_date__lt=cutoff).values(
+        "tender_id"
+    )
+
+
+def archivable_blobs(days):
+    """Hot blobs referenced only by files of tenders closed for ``days`` days."""
+    closed = closed_tenders(days)
+    return (
+        Blob.objects.filter(tier=Blob.HOT, ref_count__gt=0)
+        .filter(
+            Q(digest__in=Tender_Files.objects.filter(tender__in=closed).values("file_hash"))
+            | Q(digest__in=Bit_Files.objects.filter(bit__tender__in=closed).values("file_hash"))
+        )
+        .exclude(digest__in=Tender_Files.objects.exclude(tender__in=closed).values("file_hash"))
+        .exclude(digest__in=Bit_Files.objects.exclude(bit__tender__in=closed).values("file_hash"))
+        .exclude(digest__in=VAT_Certificate_Manager.objects.values("File_Hash"))
+    )
+
+
+def archive_closed_tender_files(days, limit=None, dry_run=False):
+    """
+    Move the payloads of tenders closed for ``days`` days into the archive store.
+
+    Args:
+        days (int): Minimum number of days since the tender's end date
+        limit (int, optional): Stop after this many payloads
+        dry_run (bool): Only report what would be moved
+
+    Returns:
+        dict: Number of payloads archived, hot bytes freed and archive bytes used
+    """
+    store = get_blob_store()
+    if store.archive is None:
+        raise RuntimeError("No archive store is configured (BLOB_ARCHIVE_ROOT)")
+
+    candidates = archivable_blobs(days).values_list("digest", "stored_size", "size")
+    if limit:
+        candidates = candidates[:limit]
+
+    archived = 0
+    hot_bytes = 0
+    archive_bytes = 0
+    for digest, stored_size, size in candidates.iterator():
+        hot_size = stored_size if stored_size is not None else size
+        if dry_run:
+            archived += 1
+            hot_bytes += hot_size
+            continue
+
+        stored = store.archive_payload(digest)
+        if stored is None:
+            logger.warning(f"Payload {digest} is not in the hot store; skipping")
+            continue
+        codec, archive_size = stored
+        Blob.objects.filter(digest=digest).update(
+            tier=Blob.ARCHIVE, codec=codec, stored_size=archive_size
+        )
+        archived += 1
+        hot_bytes += hot_size
+        archive_bytes += archive_size
+
+    return {
+        "payloads_archived": archived,
+        "hot_bytes_freed": hot_bytes,
+        "archive_bytes_used": archive_bytes,
+    }
+
+
+def move_tender_files_to_object_store(limit=None, dry_run=False):
+    """
+    Move the hot payloads of tender files to the object store.
+
+    Args:
+        limit (int, optional): Stop after this many payloads
+        dry_run (bool): Only report what would be moved
+
+    Returns:
+        dict: Number of payloads moved and local bytes freed
+    """
+    store = get_blob_store()
+    if store.remote is None:
+        raise RuntimeError("No object store is configured (BLOB_OBJECT_STORAGE)")
+
+    candidates = Blob.objects.filter(
+        tier=Blob.HOT,
+        ref_count__gt=0,
+        digest__in=Tender_Files.objects.values("file_hash"),
+    ).values_list("digest", "stored_size", "size")
+    if limit:
+        candidates = candidates[:limit]
+
+    moved = 0
+    local_bytes = 0
+    for digest, stored_size, size in candidates.iterator():
+        local_size = stored_size if stored_size is not None else size
+        if not dry_run:
+            content_type = (
+                Tender_Files.objects.filter(file_hash=digest)
+                .values_list("file_type", flat=True)
+                .first()
+            )
+            if store.move_to_remote(digest, content_type) is None:
+                logger.warning(f"Payload {digest} is not in the local store; skipping")
+                continue
+            Blob.objects.filter(digest=digest).update(
+                tier=Blob.OBJECT, codec=codecs.IDENTITY, stored_size=size
+            )
+        moved += 1
+        local_bytes += local_size
+
+    return {"payloads_moved": moved, "local_bytes_freed": local_bytes}
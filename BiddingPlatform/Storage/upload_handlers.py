@@ -0,0 +1,149 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+
+from .blob_store import get_blob_store
+from .mime import SNIFF_LENGTH, resolve_content_type, sniff_content_type
+from .validation import upload_policy_for
+
+GENERIC_CONTENT_TYPES = {"", "application/octet-stream"}
+
+
+class SpooledBlobUpload(UploadedFile):
+    """
+    An uploaded file that was written into the blob store's spool area while the
+    request body was parsed, with its SHA-256 digest, size and sniffed type known.
+
+    ``store_upload`` moves it into place with a rename. If the view never stores it,
+    the spool file is removed when the request closes its files.
+    """
+
+    def __init__(self, file, name, content_type, size, charset, content_type_extra,
+                 digest, detected_type, spool_path):
+        super().__init__(file, name, content_type, size, charset, content_type_extra)
+        self.digest = digest
+        self.detected_type = detected_type
+        self.spool_path = spool_path
+        self.committed = False
+        self.stored = None
+
+    def temporary_file_path(self):
+        return self.spool_path
+
+    def commit(self, store):
+        """
+        Move the spooled payload into the store under its digest.
+
+        Returns:
+            tuple[str, int]: The codec the payload is stored with and its size on disk
+        """
+        if not self.committed:
+            self.stored = store.commit(
+                self.spool_path, self.digest, self.detected_type or self.content_type
+            )
+            self.committed = True
+        return self.stored
+
+    def close(self):
+        try:
+            return self.file.close()
+        finally:
+            if not self.committed and os.path.exists(self.spool_path):
+                os.unlink(self.spool_path)
+
+
+class BlobStoreUploadHandler(FileUploadHandler):
+    """
+    Upload handler that streams each file part straight into the blob store.
+
+    Every chunk is hashed and written as it arrives, so memory per upload is bounded by
+    ``settings.BLOB_UPLOAD_CHUNK_SIZE`` and the payload is never re-read to store it.
+    The real type is sniffed from the first bytes and used when the client sends none.
+
+    If the view declares an upload policy (see Storage.validation), a file is dropped
+    as soon as it exceeds the size limit or its sniffed type is not allowed, and the
+    rejection is recorded in ``request.upload_rejections``.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.chunk_size = settings.BLOB_UPLOAD_CHUNK_SIZE
+        self.policy = upload_policy_for(request) if request is not None else None
+        if request is not None:
+            request.upload_rejections = []
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        fd, self.spool_path = get_blob_store().spool()
+        self.file = os.fdopen(fd, "w+b")
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+        self.detected_type = None
+        self.type_checked = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if len(self.head) < SNIFF_LENGTH:
+            self.head += raw_data[:SNIFF_LENGTH - len(self.head)]
+        self.size += len(raw_data)
+        if self.policy is not None:
+            rejection = self.policy.check_size(self.file_name, self.size)
+            if rejection is None and len(self.head) >= SNIFF_LENGTH:
+                rejection = self._check_type()
+            if rejection is not None:
+                self._reject(rejection)
+                raise SkipFile()
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+        # Consume the chunk; no other handler needs it
+
+    def _check_type(self):
+        if self.type_checked:
+            return None
+        self.type_checked = True
+        self.detected_type = resolve_content_type(
+            sniff_content_type(self.head), self.content_type
+        )
+        if self.policy is None:
+            return None
+        return self.policy.check_type(self.file_name, self.detected_type)
+
+    def _reject(self, rejection):
+        self.request.upload_rejections.append(rejection)
+        self.file.close()
+        if os.path.exists(self.spool_path):
+            os.unlink(self.spool_path)
+
+    def file_complete(self, file_size):
+        rejection = self._check_type()
+        if rejection is not None:
+            self._reject(rejection)
+            return None
+
+        self.file.flush()
+        self.file.seek(0)
+
+        content_type = self.content_type
+        if (content_type or "") in GENERIC_CONTENT_TYPES and self.detected_type:
+            content_type = self.detected_type
+
+        return SpooledBlobUpload(
+            file=self.file,
+            name=self.file_name,
+            content_type=content_type,
+            size=self.size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+            digest=self.sha256.hexdigest(),
+            detected_type=self.detected_type,
+            spool_path=self.spool_path,
+        )
+
+    def upload_interrupted(self):
+        if hasattr(self, "file"):
+            self.file.close()
+            if os.path.exists(self.spool_path):
+                os.unlink(self.spool_path)
@@ -0,0 +1,19 @@
+from django.urls import path
+
+from Storage.views import (
+    Create_UploadSessionView,
+    Upload_ChunkView,
+    Get_UploadSession_StatusView,
+    Finalize_UploadSessionView,
+    Delete_UploadSessionView,
+    Create_DirectUploadView,
+)
+
+urlpatterns = [
+    path("upload_session/create/", Create_UploadSessionView.as_view(), name="create_upload_session"),
+    path("upload_session/chunk/", Upload_ChunkView.as_view(), name="upload_chunk"),
+    path("upload_session/status/", Get_UploadSession_StatusView.as_view(), name="upload_session_status"),
+    path("upload_session/finalize/", Finalize_UploadSessionView.as_view(), name="finalize_upload_session"),
+    path("upload_session/delete/", Delete_UploadSessionView.as_view(), name="delete_upload_session"),
+    path("direct_upload/create/", Create_DirectUploadView.as_view(), name="create_direct_upload"),
+]
@@ -0,0 +1,118 @@
+"""
+Upload policies: which file types and sizes an endpoint accepts.
+
+The types are sniffed from each payload's first bytes, never taken from the client's
+Content-Type, and checked by ``BlobStoreUploadHandler`` while the request body is still
+streaming: an oversized file is dropped as soon as it crosses the limit and a file of
+the wrong type after its first chunk, without being stored. Views declare the policy
+they upload under with an ``upload_policy`` attribute (a key of
+``settings.UPLOAD_POLICIES``) and call ``rejected_uploads_response`` before storing
+anything.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+from .mime import SNIFF_LENGTH, resolve_content_type, sniff_content_type
+
+UploadRejection = namedtuple("UploadRejection", ["file_name", "status", "reason"])
+
+
+class UploadPolicy:
+    """The file types and the largest file size one kind of upload accepts."""
+
+    def __init__(self, name, allowed_types, max_size):
+        self.name = name
+        self.allowed_types = frozenset(allowed_types)
+        self.max_size = max_size
+
+    def check_size(self, file_name, size):
+        if self.max_size is not None and size > self.max_size:
+            return UploadRejection(
+                file_name,
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                f"File is larger than {self.max_size // (1024 * 1024)} MB.",
+            )
+        return None
+
+    def check_type(self, file_name, detected_type):
+        if detected_type is None:
+            return UploadRejection(
+                file_name,
+                status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                "File type could not be recognised from its content.",
+            )
+        if detected_type not in self.allowed_types:
+            return UploadRejection(
+                file_name,
+                status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                f"File type {detected_type} is not allowed.",
+            )
+        return None
+
+
+def get_upload_policy(name):
+    """Look up a policy from ``settings.UPLOAD_POLICIES``; None disables the checks."""
+    if not name:
+        return None
+    config = settings.UPLOAD_POLICIES[name]
+    return UploadPolicy(name, config["allowed_types"], config.get("max_size"))
+
+
+def upload_policy_for(request):
+    """Return the policy of the view a request was routed to, if it declares one."""
+    match = getattr(request, "resolver_match", None)
+    view_class = getattr(match.func, "view_class", None) if match else None
+    return get_upload_policy(getattr(view_class, "upload_policy", None))
+
+
+def _sniff_file(uploaded_file):
+    """Detect the type of a file that was not received through the blob store handler."""
+    uploaded_file.seek(0)
+    head = uploaded_file.read(SNIFF_LENGTH)
+    uploaded_file.seek(0)
+    return resolve_content_type(sniff_content_type(head), uploaded_file.content_type)
+
+
+def rejected_uploads_response(request, files, policy_name):
+    """
+    Check uploaded files against a policy.
+
+    Files the upload handler already dropped are reported from
+    ``request.upload_rejections``; files it did not see are sniffed here. Every
+    accepted file gets a ``detected_type`` attribute.
+
+    Args:
+        request: The DRF request
+        files (list[UploadedFile]): The uploaded files the view is about to store
+        policy_name (str): Key of ``settings.UPLOAD_POLICIES``
+
+    Returns:
+        Response | None: A 413/415 response listing the rejected files, or None if every
+        file is acceptable
+    """
+    policy = get_upload_policy(policy_name)
+    rejections = list(getattr(request, "upload_rejections", []))
+    for uploaded_file in files:
+        if not hasattr(uploaded_file, "detected_type"):
+            uploaded_file.detected_type = _sniff_file(uploaded_file)
+        rejection = policy.check_size(uploaded_file.name, uploaded_file.size) or (
+            policy.check_type(uploaded_file.name, uploaded_file.detected_type)
+        )
+        if rejection is not None:
+            rejections.append(rejection)
+
+    if not rejections:
+        return None
+    return Response(
+        {
+            "message": "Some files were rejected.",
+            "data": [
+                {"file_name": rejection.file_name, "reason": rejection.reason}
+                for rejection in rejections
+            ],
+        },
+        status=rejections[0].status,
+    )
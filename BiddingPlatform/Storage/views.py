@@ -0,0 +1,550 @@
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+from django.conf import settings
+from django.db import transaction
+import datetime
+import os
+import re
+from User.models import AdminType
+from Tender.models import Tender, Tender_Files
+from Bit.models import Bit, Bit_Files
+
+from .blob_store import get_blob_store
+from .mime import SNIFF_LENGTH, resolve_content_type, sniff_content_type
+from .models import Blob, Direct_Upload, Upload_Chunk, Upload_Session
+from .previews import schedule_previews
+from .validation import get_upload_policy
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# The upload policy (see Storage.validation) sessions of each target type are held to
+UPLOAD_SESSION_POLICIES = {"tender": "tender_files", "bit": "bid_files"}
+
+
+# Create your views here.
+
+def _resolve_upload_target(user, target_type, target_id):
+    """
+    Load the tender or bit a session uploads into and check the user may attach to it.
+
+    Returns:
+        tuple[object | None, Response | None]: The target, or an error response
+    """
+    if target_type == "tender":
+        if not user.is_superuser:
+            return None, Response(
+                {"message": "Only superusers can upload tender files.", "data": []},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        try:
+            return Tender.objects.get(tender_id=target_id), None
+        except Tender.DoesNotExist:
+            return None, Response(
+                {"message": "Tender not found.", "data": []},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+    if target_type == "bit":
+        try:
+            bit = Bit.objects.get(bit_id=target_id)
+        except Bit.DoesNotExist:
+            return None, Response(
+                {"message": "Bit not found.", "data": []},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        if bit.created_by_id != user.User_Id and not user.is_superuser:
+            return None, Response(
+                {"message": "You can only upload files to your own bits.", "data": []},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        return bit, None
+
+    return None, Response(
+        {"message": "target_type must be 'tender' or 'bit'", "data": []},
+        status=status.HTTP_400_BAD_REQUEST,
+    )
+
+
+def _get_session(request, session_id):
+    """Load one of the requesting user's open upload sessions."""
+    if not session_id:
+        return None, Response(
+            {"message": "session_id is required", "data": []},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        return Upload_Session.objects.get(session_id=session_id, created_by=request.user), None
+    except (Upload_Session.DoesNotExist, ValueError):
+        return None, Response(
+            {"message": "Upload session not found.", "data": []},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+
+def _session_status(session):
+    received = sorted(session.chunks.values_list("index", flat=True))
+    received_set = set(received)
+    return {
+        "session_id": str(session.session_id),
+        "file_name": session.file_name,
+        "file_size": session.file_size,
+        "chunk_size": session.chunk_size,
+        "total_chunks": session.total_chunks,
+        "received_chunks": received,
+        "missing_chunks": [
+            index for index in range(session.total_chunks) if index not in received_set
+        ],
+    }
+
+
+class Create_UploadSessionView(APIView):
+    """View to start a resumable, chunked upload of a tender or bit file.
+
+    Example request:
+    POST /api/Storage/upload_session/create/
+    {
+        "target_type": "bit",                (Required: "bit" or "tender")
+        "target_id": 123,                    (Required: bit_id or tender_id)
+        "admin_type": "technical",           (Bit files only: "technical" or "commercial")
+        "file_name": "proposal.pdf",
+        "file_type": "application/pdf",
+        "file_size": 524288000,
+        "file_hash": "<SHA-256 hex of the whole file>",
+        "chunk_size": 8388608                (Optional)
+    }
+
+    The response lists the chunk count; each chunk is then sent with
+    PUT /api/Storage/upload_session/chunk/?session_id=...&index=N
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        data = request.data
+        try:
+            target_type = data.get("target_type")
+            target_id = data.get("target_id")
+            file_name = data.get("file_name")
+            file_hash = (data.get("file_hash") or "").lower()
+            if not target_id or not file_name or data.get("file_size") in (None, ""):
+                return Response(
+                    {"message": "target_id, file_name and file_size are required", "data": []},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if not SHA256_RE.match(file_hash):
+                return Response(
+                    {"message": "file_hash must be the SHA-256 hex digest of the file", "data": []},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            file_size = int(data.get("file_size"))
+            chunk_size = int(data.get("chunk_size") or settings.UPLOAD_SESSION_CHUNK_SIZE)
+            if file_size <= 0:
+                return Response(
+                    {"message": "file_size must be positive", "data": []},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if not (
+                settings.UPLOAD_SESSION_MIN_CHUNK_SIZE
+                <= chunk_size
+                <= settings.UPLOAD_SESSION_MAX_CHUNK_SIZE
+            ):
+                return Response(
+                    {
+                        "message": (
+                            f"chunk_size must be between {settings.UPLOAD_SESSION_MIN_CHUNK_SIZE} "
+                            f"and {settings.UPLOAD_SESSION_MAX_CHUNK_SIZE} bytes"
+                        ),
+                        "data": [],
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            admin_type = ""
+            if target_type == "bit":
+                try:
+                    admin_type = AdminType(
+                        data.get("admin_type", AdminType.TECHNICAL.value)
+                    ).value
+                except ValueError:
+                    return Response(
+                        {"message": "admin_type must be 'technical' or 'commercial'", "data": []},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+
+            target, error = _resolve_upload_target(request.user, target_type, target_id)
+            if error is not None:
+                return error
+
+            # Refuse oversized files before any chunk is sent; the type is checked on
+            # the assembled payload
+            policy = get_upload_policy(UPLOAD_SESSION_POLICIES[target_type])
+            rejection = policy.check_size(file_name, file_size)
+            if rejection is not None:
+                return Response(
+                    {"message": rejection.reason, "data": []}, status=rejection.status
+                )
+
+            session = Upload_Session.objects.create(
+                created_by=request.user,
+                target_type=target_type,
+                target_id=target.pk,
+                admin_type=admin_type,
+                file_name=file_name,
+                file_type=data.get("file_type") or "application/octet-stream",
+                file_size=file_size,
+                file_hash=file_hash,
+                chunk_size=chunk_size,
+            )
+
+            return Response(
+                {"message": "Upload session created.", "data": _session_status(session)},
+                status=status.HTTP_201_CREATED,
+            )
+        except (TypeError, ValueError):
+            return Response(
+                {"message": "file_size and chunk_size must be integers", "data": []},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Exception as e:
+            return Response(
+                {"message": str(e), "data": []},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class Upload_ChunkView(APIView):
+    """View to receive one chunk of an upload session.
+
+    Example request:
+    PUT /api/Storage/upload_session/chunk/?session_id=<uuid>&index=0
+    Content-Type: application/octet-stream
+    X-Chunk-SHA256: <SHA-256 hex of this chunk>
+
+    <raw chunk bytes>
+
+    Chunks can be sent in any order, in parallel, and re-sent if a previous attempt
+    failed. Every chunk except the last must be exactly chunk_size bytes.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request):
+        try:
+            session, error = _get_session(request, request.query_params.get("session_id"))
+            if error is not None:
+                return error
+
+            try:
+                index = int(request.query_params.get("index", ""))
+            except ValueError:
+                index = -1
+            if not 0 <= index < session.total_chunks:
+                return Response(
+                    {"message": f"index must be between 0 and {session.total_chunks - 1}", "data": []},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            chunk_hash = request.headers.get("X-Chunk-SHA256", "").lower()
+            if not SHA256_RE.match(chunk_hash):
+                return Response(
+                    {"message": "X-Chunk-SHA256 header with the chunk's SHA-256 is required", "data": []},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            expected_size = session.expected_chunk_size(index)
+            stream = request.stream
+            block_size = settings.BLOB_UPLOAD_CHUNK_SIZE
+
+            def body():
+                # Read at most one byte more than expected so oversized chunks are caught
+                remaining = expected_size + 1
+                while stream is not None and remaining > 0:
+                    block = stream.read(min(block_size, remaining))
+                    if not block:
+                        break
+                    remaining -= len(block)
+                    yield block
+
+            store = get_blob_store()
+            received_hash, received_size = store.save_chunk(session.session_id, index, body())
+
+            if received_size != expected_size or received_hash != chunk_hash:
+                os.unlink(store.chunk_path(session.session_id, index))
+                Upload_Chunk.objects.filter(session=session, index=index).delete()
+                return Response(
+                    {
+                        "message": "Chunk verification failed; please resend it.",
+                        "data": {
+                            "index": index,
+                            "expected_size": expected_size,
+                            "received_size": received_size,
+                            "hash_matches": received_hash == chunk_hash,
+                        },
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            Upload_Chunk.objects.update_or_create(
+                session=session,
+                index=index,
+                defaults={"size": received_size, "chunk_hash": received_hash},
+            )
+
+            return Response(
+                {
+                    "message": "Chunk received.",
+                    "data": {"index": index, "size": received_size, "chunk_hash": received_hash},
+                },
+                status=status.HTTP_200_OK,
+            )
+        except Exception as e:
+            return Response(
+                {"message": str(e), "data": []},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class Get_UploadSession_StatusView(APIView):
+    """View to list which chunks of an upload session were received and which are missing."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        session, error = _get_session(request, request.query_params.get("session_id"))
+        if error is not None:
+            return error
+        return Response(
+            {"message": "Upload session status retrieved successfully", "data": _session_status(session)},
+            status=status.HTTP_200_OK,
+        )
+
+
+class Finalize_UploadSessionView(APIView):
+    """View to assemble a complete upload session into a tender or bit file.
+
+    The chunks are concatenated into the blob store while the whole-file SHA-256 is
+    computed; the file row is only created if it matches the hash declared when the
+    session was created.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            session, error = _get_session(request, request.data.get("session_id"))
+            if error is not None:
+                return error
+
+            status_data = _session_status(session)
+            if status_data["missing_chunks"]:
+                return Response(
+                    {"message": "Upload session is missing chunks.", "data": status_data},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            target, error = _resolve_upload_target(
+                request.user, session.target_type, session.target_id
+            )
+            if error is not None:
+                return error
+
+            store = get_blob_store()
+            block_size = settings.FILE_DOWNLOAD_CHUNK_SIZE
+
+            with open(store.chunk_path(session.session_id, 0), "rb") as first_chunk:
+                head = first_chunk.read(SNIFF_LENGTH)
+            detected_type = resolve_content_type(sniff_content_type(head), session.file_type)
+            policy = get_upload_policy(UPLOAD_SESSION_POLICIES[session.target_type])
+            rejection = policy.check_type(session.file_name, detected_type)
+            if rejection is not None:
+                return Response(
+                    {"message": rejection.reason, "data": []}, status=rejection.status
+                )
+
+            def payload():
+                for index in range(session.total_chunks):
+                    with open(store.chunk_path(session.session_id, index), "rb") as chunk_file:
+                        yield from iter(lambda: chunk_file.read(block_size), b"")
+
+            digest, size, codec, stored_size = store.save(payload(), session.file_type)
+            if digest != session.file_hash or size != session.file_size:
+                # Only the session's chunks go; the payload may be shared with a concurrent
+                # upload and is left to collect_blobs if nothing comes to reference it
+                Upload_Chunk.objects.filter(session=session).delete()
+                store.discard_session(session.session_id)
+                return Response(
+                    {
+                        "message": "Assembled file does not match file_hash; chunks must be re-sent.",
+                        "data": {"expected_hash": session.file_hash, "received_hash": digest},
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            # Split the filename into name and extension and add a timestamp for uniqueness
+            file_name, file_extension = os.path.splitext(session.file_name)
+            timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
+            unique_filename = f"{file_name}_{timestamp}{file_extension}"
+
+            with transaction.atomic():
+                Blob.acquire(digest, size, codec, stored_size)
+                schedule_previews([(digest, detected_type)])
+                if session.target_type == "tender":
+                    file_row = Tender_Files.objects.create(
+                        tender=target,
+                        file_name=unique_filename,
+                        file_type=session.file_type,
+                        detected_type=detected_type,
+                        file_size=size,
+                        file_hash=digest,
+                    )
+                else:
+                    file_row = Bit_Files.objects.create(
+                        bit=target,
+                        file_name=unique_filename,
+                        file_type=session.file_type,
+                        detected_type=detected_type,
+                        file_size=size,
+                        file_hash=digest,
+                        admin_type=session.admin_type,
+                    )
+                session.delete()
+
+            store.discard_session(status_data["session_id"])
+
+            return Response(
+                {
+                    "message": "File uploaded successfully.",
+                    "data": {
+                        "file_id": file_row.file_id,
+                        "file_name": unique_filename,
+                        "original_filename": session.file_name,
+                        "file_type": session.file_type,
+                        "file_size": size,
+                        "target_type": session.target_type,
+                        "target_id": session.target_id,
+                    },
+                },
+                status=status.HTTP_201_CREATED,
+            )
+        except Exception as e:
+            return Response(
+                {"message": str(e), "data": []},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class Delete_UploadSessionView(APIView):
+    """View to abandon an upload session and discard its chunks."""
+
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request):
+        session, error = _get_session(request, request.query_params.get("session_id"))
+        if error is not None:
+            return error
+        session_id = str(session.session_id)
+        session.delete()
+        get_blob_store().discard_session(session_id)
+        return Response(
+            {"message": "Upload session deleted.", "data": {"session_id": session_id}},
+            status=status.HTTP_200_OK,
+        )
+
+
+class Create_DirectUploadView(APIView):
+    """View to get a presigned URL for uploading a bid file straight to object storage.
+
+    Example request:
+    POST /api/Storage/direct_upload/create/
+    {
+        "file_name": "proposal.pdf",
+        "file_type": "application/pdf",
+        "file_size": 524288000,
+        "file_hash": "<SHA-256 hex of the whole file>"
+    }
+
+    The client PUTs the file to ``upload_url`` with the returned ``headers`` (the
+    storage service rejects a body whose SHA-256 differs), then passes ``upload_id`` in
+    ``Technical_uploads`` / ``Commercial_uploads`` when creating the bit or adding files
+    to it. The file must be sent even when the same content is already stored.
+    """
+
+    permission_classes = [IsAuthenticated]
+    upload_policy = "bid_files"
+
+    def post(self, request):
+        data = request.data
+        try:
+            store = get_blob_store()
+            if store.remote is None:
+                return Response(
+                    {"message": "Direct uploads are not enabled.", "data": []},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            file_name = data.get("file_name")
+            file_type = data.get("file_type") or "application/octet-stream"
+            file_hash = (data.get("file_hash") or "").lower()
+            if not file_name or data.get("file_size") in (None, ""):
+                return Response(
+                    {"message": "file_name and file_size are required", "data": []},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if not SHA256_RE.match(file_hash):
+                return Response(
+                    {"message": "file_hash must be the SHA-256 hex digest of the file", "data": []},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            file_size = int(data.get("file_size"))
+            if file_size < 0:
+                return Response(
+                    {"message": "file_size must not be negative", "data": []},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            rejection = get_upload_policy(self.upload_policy).check_size(file_name, file_size)
+            if rejection is not None:
+                return Response(
+                    {"message": rejection.reason, "data": []}, status=rejection.status
+                )
+
+            upload = Direct_Upload.objects.create(
+                created_by=request.user,
+                policy=self.upload_policy,
+                file_name=file_name,
+                file_type=file_type,
+                file_size=file_size,
+                file_hash=file_hash,
+            )
+
+            # Always sent, even for content already stored (see Storage.direct_uploads)
+            upload_url, headers = store.remote.upload_url(
+                upload.upload_id, file_hash, file_size, file_type
+            )
+
+            return Response(
+                {
+                    "message": "Direct upload created.",
+                    "data": {
+                        "upload_id": str(upload.upload_id),
+                        "upload_url": upload_url,
+                        "method": "PUT",
+                        "headers": headers,
+                        "expires_in": settings.OBJECT_STORAGE_URL_TTL,
+                    },
+                },
+                status=status.HTTP_201_CREATED,
+            )
+        except (TypeError, ValueError):
+            return Response(
+                {"message": "file_size must be an integer", "data": []},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Exception as e:
+            return Response(
+                {"message": str(e), "data": []},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
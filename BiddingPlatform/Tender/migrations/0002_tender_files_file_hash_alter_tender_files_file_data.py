@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tender', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tender_files',
+            name='file_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='tender_files',
+            name='file_data',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tender', '0002_tender_files_file_hash_alter_tender_files_file_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tender',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tender', '0006_tender_files_detected_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tender',
+            index=models.Index(fields=['-start_date', '-tender_id'], name='tender_start_date_idx'),
+        ),
+    ]
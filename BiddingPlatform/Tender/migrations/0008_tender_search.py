@@ -0,0 +1,144 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:19
+
+import BiddingPlatform.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+from BiddingPlatform.search import vendor_sql_operation
+
+TENDER_CREATOR = (
+    "COALESCE((SELECT username FROM xx_user WHERE \"User_Id\" = new.created_by_id), '')"
+)
+
+SQLITE = [
+    "CREATE VIRTUAL TABLE tender_search USING fts5("
+    "title, description, creator, tokenize = 'unicode61 remove_diacritics 2')",
+    """
+    INSERT INTO tender_search (rowid, title, description, creator)
+    SELECT t.tender_id, t.title, t.description, COALESCE(u.username, '')
+    FROM "Tender_tender" t LEFT JOIN xx_user u ON u."User_Id" = t.created_by_id
+    """,
+    f"""
+    CREATE TRIGGER tender_search_insert AFTER INSERT ON "Tender_tender" BEGIN
+        INSERT INTO tender_search (rowid, title, description, creator)
+        VALUES (new.tender_id, new.title, new.description, {TENDER_CREATOR});
+    END
+    """,
+    f"""
+    CREATE TRIGGER tender_search_update AFTER UPDATE OF title, description, created_by_id
+    ON "Tender_tender"
+    WHEN old.title IS NOT new.title OR old.description IS NOT new.description
+        OR old.created_by_id IS NOT new.created_by_id
+    BEGIN
+        UPDATE tender_search
+        SET title = new.title, description = new.description, creator = {TENDER_CREATOR}
+        WHERE rowid = new.tender_id;
+    END
+    """,
+    """
+    CREATE TRIGGER tender_search_delete AFTER DELETE ON "Tender_tender" BEGIN
+        DELETE FROM tender_search WHERE rowid = old.tender_id;
+    END
+    """,
+    """
+    CREATE TRIGGER tender_search_creator AFTER UPDATE OF username ON xx_user
+    WHEN old.username IS NOT new.username
+    BEGIN
+        UPDATE tender_search SET creator = new.username
+        WHERE rowid IN (SELECT tender_id FROM "Tender_tender" WHERE created_by_id = new."User_Id");
+    END
+    """,
+]
+
+REVERSE_SQLITE = [
+    "DROP TRIGGER tender_search_creator",
+    "DROP TRIGGER tender_search_delete",
+    "DROP TRIGGER tender_search_update",
+    "DROP TRIGGER tender_search_insert",
+    "DROP TABLE tender_search",
+]
+
+POSTGRESQL = [
+    "CREATE TABLE tender_search (rowid integer PRIMARY KEY, tender_search tsvector NOT NULL)",
+    "CREATE INDEX tender_search_document_idx ON tender_search USING GIN (tender_search)",
+    """
+    CREATE FUNCTION tender_search_document(tender_pk integer) RETURNS tsvector
+    LANGUAGE sql STABLE AS $$
+        SELECT setweight(to_tsvector('simple', coalesce(t.title, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(t.description, '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(u.username, '')), 'C')
+        FROM "Tender_tender" t LEFT JOIN xx_user u ON u."User_Id" = t.created_by_id
+        WHERE t.tender_id = tender_pk
+    $$
+    """,
+    """
+    INSERT INTO tender_search (rowid, tender_search)
+    SELECT tender_id, tender_search_document(tender_id) FROM "Tender_tender"
+    """,
+    """
+    CREATE FUNCTION tender_search_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM tender_search WHERE rowid = OLD.tender_id;
+            RETURN OLD;
+        END IF;
+        INSERT INTO tender_search (rowid, tender_search)
+        VALUES (NEW.tender_id, tender_search_document(NEW.tender_id))
+        ON CONFLICT (rowid) DO UPDATE SET tender_search = EXCLUDED.tender_search;
+        RETURN NEW;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER tender_search_sync
+    AFTER INSERT OR DELETE OR UPDATE OF title, description, created_by_id ON "Tender_tender"
+    FOR EACH ROW EXECUTE FUNCTION tender_search_sync()
+    """,
+    """
+    CREATE FUNCTION tender_search_creator_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE tender_search SET tender_search = tender_search_document(rowid)
+        WHERE rowid IN (SELECT tender_id FROM "Tender_tender" WHERE created_by_id = NEW."User_Id");
+        RETURN NEW;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER tender_search_creator_sync AFTER UPDATE OF username ON xx_user
+    FOR EACH ROW WHEN (OLD.username IS DISTINCT FROM NEW.username)
+    EXECUTE FUNCTION tender_search_creator_sync()
+    """,
+]
+
+REVERSE_POSTGRESQL = [
+    "DROP TRIGGER tender_search_creator_sync ON xx_user",
+    "DROP FUNCTION tender_search_creator_sync()",
+    "DROP TRIGGER tender_search_sync ON \"Tender_tender\"",
+    "DROP FUNCTION tender_search_sync()",
+    "DROP TABLE tender_search",
+    "DROP FUNCTION tender_search_document(integer)",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tender', '0007_tender_start_date_idx'),
+        ('User', '0005_vat_certificate_manager_detected_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tender_Search',
+            fields=[
+                ('tender', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='Tender.tender')),
+                ('document', BiddingPlatform.search.SearchDocumentField(db_column='tender_search')),
+            ],
+            options={
+                'db_table': 'tender_search',
+                'managed': False,
+            },
+        ),
+        # The index table and the triggers that keep it in sync
+        vendor_sql_operation(SQLITE, POSTGRESQL, REVERSE_SQLITE, REVERSE_POSTGRESQL),
+    ]
@@ -0,0 +1,102 @@
+from django.db import migrations
+
+from BiddingPlatform.search import vendor_sql_operation
+from User.migrations._search_folding import fold_select, fold_sql
+
+
+def unfolded(sql):
+    return sql
+
+
+def unfolded_select(columns, source="", keep=()):
+    selected = ", ".join(f"{expression} AS {alias}" for alias, expression in columns.items())
+    return f"SELECT {selected} {source}".rstrip()
+
+
+def sqlite_statements(select):
+    """Recreate the tender_search triggers, filling the index through ``select``."""
+    row = select({
+        "rowid": "new.tender_id",
+        "title": "new.title",
+        "description": "new.description",
+        "creator": (
+            "COALESCE((SELECT username FROM xx_user WHERE \"User_Id\" = new.created_by_id), '')"
+        ),
+    }, keep=("rowid",))
+    backfill = select({
+        "rowid": "t.tender_id",
+        "title": "t.title",
+        "description": "t.description",
+        "creator": "COALESCE(u.username, '')",
+    }, 'FROM "Tender_tender" t LEFT JOIN xx_user u ON u."User_Id" = t.created_by_id',
+        keep=("rowid",))
+    return [
+        "DROP TRIGGER tender_search_creator",
+        "DROP TRIGGER tender_search_update",
+        "DROP TRIGGER tender_search_insert",
+        "DELETE FROM tender_search",
+        f"""
+        INSERT INTO tender_search (rowid, title, description, creator)
+        {backfill}
+        """,
+        f"""
+        CREATE TRIGGER tender_search_insert AFTER INSERT ON "Tender_tender" BEGIN
+            INSERT INTO tender_search (rowid, title, description, creator) {row};
+        END
+        """,
+        # FTS5 rewrites a row on update anyway, so it is simply replaced
+        f"""
+        CREATE TRIGGER tender_search_update AFTER UPDATE OF title, description, created_by_id
+        ON "Tender_tender"
+        WHEN old.title IS NOT new.title OR old.description IS NOT new.description
+            OR old.created_by_id IS NOT new.created_by_id
+        BEGIN
+            DELETE FROM tender_search WHERE rowid = new.tender_id;
+            INSERT INTO tender_search (rowid, title, description, creator) {row};
+        END
+        """,
+        f"""
+        CREATE TRIGGER tender_search_creator AFTER UPDATE OF username ON xx_user
+        WHEN old.username IS NOT new.username
+        BEGIN
+            UPDATE tender_search SET creator = ({select({"creator": "new.username"})})
+            WHERE rowid IN (
+                SELECT tender_id FROM "Tender_tender" WHERE created_by_id = new."User_Id"
+            );
+        END
+        """,
+    ]
+
+
+def postgresql_statements(fold):
+    """Redefine the tender_search documents through ``fold`` and rebuild them."""
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION tender_search_document(tender_pk integer) RETURNS tsvector
+        LANGUAGE sql STABLE AS $$
+            SELECT setweight(to_tsvector('simple', {fold("coalesce(t.title, '')")}), 'A')
+                || setweight(to_tsvector('simple', {fold("coalesce(t.description, '')")}), 'B')
+                || setweight(to_tsvector('simple', {fold("coalesce(u.username, '')")}), 'C')
+            FROM "Tender_tender" t LEFT JOIN xx_user u ON u."User_Id" = t.created_by_id
+            WHERE t.tender_id = tender_pk
+        $$
+        """,
+        "UPDATE tender_search SET tender_search = tender_search_document(rowid)",
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tender', '0008_tender_search'),
+    ]
+
+    operations = [
+        # Index Arabic text folded, as searches are (BiddingPlatform.search.fold_text)
+        vendor_sql_operation(
+            sqlite_statements(fold_select),
+            postgresql_statements(fold_sql),
+            sqlite_statements(unfolded_select),
+            postgresql_statements(unfolded),
+        ),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import F
+
+from BiddingPlatform.search import SearchDocumentField
 
 
 class Tender_Files(models.Model):
@@ -8,13 +11,23 @@ class Tender_Files(models.Model):
     )
     file_name = models.CharField(max_length=100)
     file_type = models.CharField(max_length=255)
+    detected_type = models.CharField(
+        max_length=255, blank=True, default=""
+    )  # Type sniffed from the payload's first bytes; empty for files stored before sniffing
     file_size = models.PositiveIntegerField()
-    file_data = models.BinaryField()
+    file_hash = models.CharField(
+        max_length=64, db_index=True
+    )  # SHA-256 digest of the payload in the blob store
     Uploaded_At = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.file_name
 
+    @property
+    def content_type(self):
+        """The type sniffed from the payload when known, else the one the client sent."""
+        return self.detected_type or self.file_type
+
 
 # Create your models here.
 class Tender(models.Model):
@@ -32,6 +45,55 @@ class Tender(models.Model):
         db_column="created_by_id",
     )
     budget = models.DecimalField(max_digits=15, decimal_places=2)
+    version = models.PositiveIntegerField(default=1)  # Bumped on every change, used for ETags
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of tender lists (newest first)
+            models.Index(fields=["-start_date", "-tender_id"], name="tender_start_date_idx"),
+        ]
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if not self._state.adding and (update_fields is None or update_fields):
+            self.version += 1
+            if update_fields is not None:
+                # Partial saves must write the new version too
+                kwargs["update_fields"] = {*update_fields, "version"}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def bump_version(cls, tender_id):
+        """Mark a tender as changed without loading it (e.g. when its files change)."""
+        cls.objects.filter(tender_id=tender_id).update(version=F("version") + 1)
+
+
+class Tender_Search(models.Model):
+    """
+    Full-text index of tenders, kept in sync by database triggers (see migration
+    0008_tender_search); only read through BiddingPlatform.search.full_text_search.
+    """
+
+    tender = models.OneToOneField(
+        Tender,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        related_name="search_entry",
+        db_column="rowid",
+        db_constraint=False,
+    )
+    document = SearchDocumentField(db_column="tender_search")
+
+    # Index columns, most relevant first, and the fields they are filled from
+    SEARCH_COLUMNS = {
+        "title": "title",
+        "description": "description",
+        "creator": "created_by__username",
+    }
+
+    class Meta:
+        managed = False
+        db_table = "tender_search"
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Tender, Tender_Files
+
+
+@receiver(post_save, sender=Tender_Files)
+@receiver(post_delete, sender=Tender_Files)
+def bump_tender_version_on_file_change(sender, instance, **kwargs):
+    """Invalidate cached tender details when a file is added or removed."""
+    Tender.bump_version(instance.tender_id)
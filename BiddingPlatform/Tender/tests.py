@@ -1,3 +1,191 @@
+from decimal import Decimal
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from Bit.models import Bit, Bit_Files
+from Tender.models import Tender, Tender_Files
+from User.models import User
+
+
+class Tender_and_Bids_files_By_Tender_Id_Tests(TestCase):
+    URL = "/api/Tender/Tender_and_Bids_files_By_Tender_Id/"
+
+    # tender + creator, tender files, bids + creators, bid files, summary aggregate
+    EXPECTED_QUERIES = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+        cls.tender = Tender.objects.create(
+            title="Tender",
+            description="Description",
+            start_date="2025-01-01T00:00:00Z",
+            budget=Decimal("1000.00"),
+            created_by=cls.admin,
+        )
+        Tender_Files.objects.create(
+            tender=cls.tender,
+            file_name="terms.pdf",
+            file_type="application/pdf",
+            file_size=10,
+            file_hash="0" * 64,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def add_bids(self, costs, accepted=None):
+        for cost in costs:
+            company = User.objects.create_user(
+                f"company{cost}", f"company{cost}@example.com"
+            )
+            bid = Bit.objects.create(
+                title=f"Bid {cost}",
+                description="Description",
+                date="2025-01-02T00:00:00Z",
+                cost=Decimal(cost),
+                created_by=company,
+                tender=self.tender,
+                Is_Accepted=accepted,
+            )
+            for admin_type in ("technical", "commercial"):
+                Bit_Files.objects.create(
+                    bit=bid,
+                    admin_type=admin_type,
+                    file_name=f"{admin_type}.pdf",
+                    file_type="application/pdf",
+                    file_size=10,
+                    file_hash="1" * 64,
+                )
+
+    def get(self):
+        return self.client.get(self.URL, {"tender_id": self.tender.tender_id})
+
+    def test_query_count_does_not_grow_with_bids(self):
+        self.add_bids([100])
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            self.assertEqual(self.get().status_code, 200)
+
+        self.add_bids(range(200, 230))
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.get()
+        self.assertEqual(len(response.data["data"]["bids"]), 31)
+
+    def test_summary(self):
+        self.add_bids([100, 300])
+        self.add_bids([200], accepted=True)
+        self.add_bids([400], accepted=False)
+
+        data = self.get().data["data"]
+        summary = data["summary"]
+        self.assertEqual(summary["total_bids"], 4)
+        self.assertEqual(summary["accepted_bids"], 1)
+        self.assertEqual(summary["pending_bids"], 2)
+        self.assertEqual(summary["rejected_bids"], 1)
+        self.assertEqual(summary["lowest_bid"], Decimal("100"))
+        self.assertEqual(summary["highest_bid"], Decimal("400"))
+        self.assertEqual(summary["average_bid"], 250.0)
+        self.assertIs(type(summary["average_bid"]), float)
+        self.assertEqual(summary["tender_files_count"], 1)
+        self.assertEqual(summary["total_bid_files"], 8)
+        self.assertEqual(data["tender"]["created_by"], "admin")
+        self.assertEqual(len(data["bids"][0]["files"]), 2)
+
+    def test_tender_without_bids(self):
+        summary = self.get().data["data"]["summary"]
+        self.assertEqual(summary["total_bids"], 0)
+        self.assertIsNone(summary["lowest_bid"])
+        self.assertIsNone(summary["average_bid"])
+        self.assertEqual(summary["total_bid_files"], 0)
+
+
+class Tender_Search_Tests(TestCase):
+    URL = "/api/Tender/getall/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+        cls.tenders = {}
+        for title, description in [
+            ("Road maintenance", "Resurfacing of the northern highway"),
+            ("Office supplies", "Paper and toner for the road department"),
+            ("Bridge inspection", "Structural survey"),
+            ("مُنَاقَصَة إنشاء مدرسة", "توريد أثاث لمستشفى الجامعة ٢٠٢٥"),
+        ]:
+            cls.tenders[title] = Tender.objects.create(
+                title=title,
+                description=description,
+                start_date="2025-01-01T00:00:00Z",
+                budget=Decimal("1000.00"),
+                created_by=cls.admin,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def search(self, text, **params):
+        response = self.client.get(self.URL, {"search": text, **params})
+        self.assertEqual(response.status_code, 200)
+        return [tender["title"] for tender in response.data["results"]["data"]]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search("road"), ["Road maintenance", "Office supplies"])
+
+    def test_every_word_must_match_as_a_prefix(self):
+        self.assertEqual(self.search("north resurf"), ["Road maintenance"])
+        self.assertEqual(self.search("road bridge"), [])
+
+    def test_creator(self):
+        self.assertEqual(len(self.search("admin")), 4)
+
+    def test_arabic_spelling_variants(self):
+        expected = ["مُنَاقَصَة إنشاء مدرسة"]
+        # Diacritics, hamza on alef, taa marbuta, alef maqsura, tatweel and digits
+        self.assertEqual(self.search("مناقصه انشاء"), expected)
+        self.assertEqual(self.search("مـدرسة"), expected)
+        self.assertEqual(self.search("اثاث لمستشفي"), expected)
+        self.assertEqual(self.search("2025"), expected)
+
+    def test_index_follows_updates_and_deletes(self):
+        Tender.objects.filter(pk=self.tenders["Bridge inspection"].pk).update(
+            title="Tunnel inspection"
+        )
+        self.assertEqual(self.search("bridge"), [])
+        self.assertEqual(self.search("tunnel"), ["Tunnel inspection"])
+
+        self.tenders["Office supplies"].delete()
+        self.assertEqual(self.search("road"), ["Road maintenance"])
+
+    def test_cursor_pagination(self):
+        first = self.client.get(self.URL, {"search": "road", "cursor": "", "page_size": 1})
+        self.assertEqual(first.data["results"]["data"][0]["title"], "Road maintenance")
+        second = self.client.get(first.data["next"])
+        self.assertEqual(second.data["results"]["data"][0]["title"], "Office supplies")
+        self.assertIsNone(second.data["next"])
+
+    def test_cursor_pages_count_only_on_request(self):
+        response = self.client.get(self.URL, {"cursor": "", "page_size": 1})
+        self.assertIsNone(response.data["results"]["total_count"])
+        response = self.client.get(self.URL, {"cursor": "", "page_size": 1, "count": "exact"})
+        self.assertEqual(response.data["results"]["total_count"], 4)
+
 
-# Create your tests here.
+class Tender_Version_Tests(TestCase):
+    def test_every_save_bumps_the_version(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+        tender = Tender.objects.create(
+            title="Tender",
+            description="Description",
+            start_date="2025-01-01T00:00:00Z",
+            budget=Decimal("1000.00"),
+            created_by=admin,
+        )
+        tender.title = "Renamed"
+        tender.save()
+        tender.budget = Decimal("2000.00")
+        tender.save(update_fields=["budget"])
+        tender.refresh_from_db()
+        self.assertEqual((tender.version, tender.budget), (3, Decimal("2000.00")))
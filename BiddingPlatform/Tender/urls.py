@@ -5,12 +5,15 @@ from Tender.views import (
     TenderHistoryView,
     Create_TenderView,
     Get_TenderFile_Data,
+    Get_TenderFile_Preview,
+    Get_TenderFile_Pages,
     Tender_DetailView,
     Update_TenderView,
     Delete_TenderFileView,
     Add_TenderFileView,
     Delete_TenderView,
-    Tender_and_Bids_files_By_Tender_Id
+    Tender_and_Bids_files_By_Tender_Id,
+    Download_Tender_BundleView,
 )
 
 urlpatterns = [
@@ -18,11 +21,14 @@ urlpatterns = [
     path("history/", TenderHistoryView.as_view(), name="tender_history"),
     path("create/", Create_TenderView.as_view(), name="create_tender"),
     path("getfiledata/", Get_TenderFile_Data.as_view(), name="get_tender_file_data"),
+    path("getfilepreview/", Get_TenderFile_Preview.as_view(), name="get_tender_file_preview"),
+    path("getfilepages/", Get_TenderFile_Pages.as_view(), name="get_tender_file_pages"),
     path("details/", Tender_DetailView.as_view(), name="tender_detail"),
     path("update/", Update_TenderView.as_view(), name="update_tender"),
     path("addfile/", Add_TenderFileView.as_view(), name="add_tender_file"),
     path("deletefile/", Delete_TenderFileView.as_view(), name="delete_tender_file"),
     path("delete/", Delete_TenderView.as_view(), name="delete_tender"),
     path("Tender_and_Bids_files_By_Tender_Id/", Tender_and_Bids_files_By_Tender_Id.as_view(), name="evaluate_tender_by_id"),
+    path("download_bundle/", Download_Tender_BundleView.as_view(), name="download_tender_bundle"),
     
 ]
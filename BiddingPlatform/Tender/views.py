@@ -3,13 +3,28 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q
+from BiddingPlatform.pagination import StandardPagination
+from BiddingPlatform.search import full_text_search
+from django.db.models import Avg, Count, FloatField, Max, Min, Prefetch, Q
+from django.db.models.functions import Cast
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from User.models import Notification
 from Tender.models import Tender, Tender_Files
 from Bit.models import Bit, Bit_Files
 from .permissions import IsSuperUser
+from Storage.attachments import attach_uploads, unique_file_names
+from Storage.blob_store import stage_upload
+from Storage.downloads import file_download_response, zip_stream_response
+from Storage.linearize import linearized_payload
+from Storage.pdf_pages import page_extract_response
+from Storage.previews import preview_response
+from Storage.validation import rejected_uploads_response
+from BiddingPlatform.conditional import (
+    conditional_response,
+    make_etag,
+    set_validators,
+)
 from django.http import FileResponse
 from asgiref.sync import sync_to_async
 import io
@@ -45,14 +60,24 @@ class Tender_and_Bids_files_By_Tender_Id(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
             
-            # Get the tender
-            tender = Tender.objects.get(tender_id=tender_id)
-            
-            # Get all tender files
-            tender_files = tender.files.all().order_by("-Uploaded_At")
+            # Get the tender with its creator and files
+            tender = (
+                Tender.objects.select_related("created_by")
+                .prefetch_related(
+                    Prefetch("files", queryset=Tender_Files.objects.order_by("-Uploaded_At"))
+                )
+                .get(tender_id=tender_id)
+            )
+            tender_files = tender.files.all()
             
-            # Get all bids for this tender
-            bids = tender.bits.all().order_by("-date")
+            # Get all bids for this tender, with their creators and files in two queries
+            bids = (
+                tender.bits.select_related("created_by")
+                .prefetch_related(
+                    Prefetch("files", queryset=Bit_Files.objects.order_by("-Uploaded_At"))
+                )
+                .order_by("-date")
+            )
             
             # Prepare tender data
             tender_data = {
@@ -78,8 +103,8 @@ class Tender_and_Bids_files_By_Tender_Id(APIView):
             # Prepare bids data
             bids_data = []
             for bid in bids:
-                # Get files for each bid
-                bid_files = bid.files.all().order_by("-Uploaded_At")
+                # Files were prefetched, ordered newest first
+                bid_files = bid.files.all()
                 
                 bid_data = {
                     "bit_id": bid.bit_id,
@@ -102,18 +127,19 @@ class Tender_and_Bids_files_By_Tender_Id(APIView):
                 }
                 bids_data.append(bid_data)
             
-            # Prepare summary statistics
-            summary = {
-                "total_bids": len(bids_data),
-                "accepted_bids": len([bid for bid in bids_data if bid["is_accepted"] is True]),
-                "pending_bids": len([bid for bid in bids_data if bid["is_accepted"] is None]),
-                "rejected_bids": len([bid for bid in bids_data if bid["is_accepted"] is False]),
-                "lowest_bid": min([bid["cost"] for bid in bids_data]) if bids_data else None,
-                "highest_bid": max([bid["cost"] for bid in bids_data]) if bids_data else None,
-                "average_bid": sum([bid["cost"] for bid in bids_data]) / len(bids_data) if bids_data else None,
-                "tender_files_count": len(tender_files),
-                "total_bid_files": sum([len(bid["files"]) for bid in bids_data])
-            }
+            # Prepare summary statistics in a single aggregate query
+            summary = tender.bits.aggregate(
+                total_bids=Count("pk"),
+                accepted_bids=Count("pk", filter=Q(Is_Accepted=True)),
+                pending_bids=Count("pk", filter=Q(Is_Accepted__isnull=True)),
+                rejected_bids=Count("pk", filter=Q(Is_Accepted=False)),
+                lowest_bid=Min("cost"),
+                highest_bid=Max("cost"),
+                # Avg() of the DecimalField would be a Decimal; the summary reports a float
+                average_bid=Cast(Avg("cost"), FloatField()),
+            )
+            summary["tender_files_count"] = len(tender_files)
+            summary["total_bid_files"] = sum(len(bid["files"]) for bid in bids_data)
             
             response_data = {
                 "tender": tender_data,
@@ -146,10 +172,75 @@ class Tender_and_Bids_files_By_Tender_Id(APIView):
 
 
 
-class StandardPagination(PageNumberPagination):
-    page_size = 5
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+def _archive_name(part):
+    """Make a user-supplied name safe to use as one path segment inside a ZIP."""
+    return re.sub(r"[\\/]+", "_", str(part)).strip(". ") or "_"
+
+
+class Download_Tender_BundleView(APIView):
+    """View to download every tender file and bid file of a tender as one ZIP.
+
+    The archive is built on the fly while it is sent:
+        tender/<file name>
+        bids/<bidder username>/<technical|commercial>/<file name>
+
+    Bid files follow the same admin-type visibility rules as Get_Bit_DetailView.
+    """
+
+    permission_classes = [IsAuthenticated, IsSuperUser]
+
+    def get(self, request):
+        try:
+            tender_id = request.query_params.get("tender_id")
+            if not tender_id:
+                return Response(
+                    {"message": "tender_id is required", "data": []},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            tender = Tender.objects.get(tender_id=tender_id)
+
+            entries = []
+            used_names = set()
+
+            def add_entry(folder, file):
+                name = f"{folder}/{_archive_name(file.file_name)}"
+                stem, extension = os.path.splitext(name)
+                counter = 1
+                while name in used_names:
+                    counter += 1
+                    name = f"{stem} ({counter}){extension}"
+                used_names.add(name)
+                entries.append((name, file.file_hash, file.file_size, file.Uploaded_At))
+
+            for file in tender.files.order_by("file_id"):
+                add_entry("tender", file)
+
+            bid_files = (
+                Bit_Files.visible_to(request.user)
+                .filter(bit__tender=tender)
+                .select_related("bit__created_by")
+                .order_by("bit_id", "admin_type", "file_id")
+            )
+            for file in bid_files:
+                bidder = file.bit.created_by.username if file.bit.created_by else f"bit_{file.bit_id}"
+                add_entry(f"bids/{_archive_name(bidder)}/{file.admin_type}", file)
+
+            return zip_stream_response(
+                entries, f"tender_{tender.tender_id}_documents.zip"
+            )
+
+        except Tender.DoesNotExist:
+            return Response(
+                {"message": "Tender not found.", "data": []},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception as e:
+            return Response(
+                {"message": str(e), "data": []},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
 
 class List_All_TendersView(APIView):
     """View to list all tenders with search and pagination."""
@@ -164,15 +255,15 @@ class List_All_TendersView(APIView):
         tenders = Tender.objects.exclude(bits__Is_Accepted=True)
         
         # Apply search filter if search query is provided
+        ordering = ['-start_date']
         if search_query:
-            tenders = tenders.filter(
-                Q(title__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(created_by__username__icontains=search_query)
+            tenders = full_text_search(
+                tenders, search_query, ["title", "description", "creator"]
             )
+            ordering.insert(0, '-search_rank')
         
-        # Order by creation date (newest first)
-        tenders = tenders.order_by('-start_date')
+        # Best matches first when searching, then by creation date (newest first)
+        tenders = tenders.order_by(*ordering)
         
         # Apply pagination
         paginator = StandardPagination()
@@ -194,7 +285,7 @@ class List_All_TendersView(APIView):
         return paginator.get_paginated_response({
             "message": "Tenders retrieved successfully",
             "search_query": search_query,
-            "total_count": tenders.count(),
+            "total_count": paginator.get_total_count(tenders),
             "data": tender_data
         })
 
@@ -212,15 +303,15 @@ class TenderHistoryView(APIView):
         tenders = Tender.objects.filter(bits__Is_Accepted=True).distinct()
         
         # Apply search filter if search query is provided
+        ordering = ['-start_date']
         if search_query:
-            tenders = tenders.filter(
-                Q(title__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(created_by__username__icontains=search_query)
+            tenders = full_text_search(
+                tenders, search_query, ["title", "description", "creator"]
             )
+            ordering.insert(0, '-search_rank')
         
-        # Order by creation date (newest first)
-        tenders = tenders.order_by('-start_date')
+        # Best matches first when searching, then by creation date (newest first)
+        tenders = tenders.order_by(*ordering)
         
         # Apply pagination
         paginator = StandardPagination()
@@ -242,7 +333,7 @@ class TenderHistoryView(APIView):
         return paginator.get_paginated_response({
             "message": "Tender history retrieved successfully",
             "search_query": search_query,
-            "total_count": tenders.count(),
+            "total_count": paginator.get_total_count(tenders),
             "data": tender_data
         })
 
@@ -261,7 +352,19 @@ class Tender_DetailView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
                 
-            tender = Tender.objects.get(tender_id=tender_id)
+            tender = Tender.objects.select_related("created_by").get(tender_id=tender_id)
+
+            # The version changes whenever the tender or its files change
+            etag = make_etag(
+                "tender",
+                tender.tender_id,
+                tender.version,
+                tender.created_by.username if tender.created_by else None,
+            )
+            not_modified = conditional_response(request, etag)
+            if not_modified is not None:
+                return not_modified
+
             TenderFiles = tender.files.all().order_by("-Uploaded_At")
             
             tender_data = {
@@ -286,10 +389,11 @@ class Tender_DetailView(APIView):
                     else []
                 ),
             }
-            return Response(
+            response = Response(
                 {"message": "Tender details retrieved successfully", "data": tender_data},
                 status=status.HTTP_200_OK
             )
+            return set_validators(response, etag, vary_on_auth=True)
         except Tender.DoesNotExist:
             return Response(
                 {"message": "Tender not found.", "data": []},
@@ -324,6 +428,7 @@ class Get_TenderFile_Data(APIView):
                     "file_name": tender_file.file_name,
                     "file_type": tender_file.file_type,
                     "file_size": tender_file.file_size,
+                    "sha256": tender_file.file_hash,
                     "uploaded_at": tender_file.Uploaded_At
                 }
                 return Response(
@@ -331,15 +436,22 @@ class Get_TenderFile_Data(APIView):
                     status=status.HTTP_200_OK
                 )
             else:
-                # For actual file download, create a file-like object and return it
-                file_stream = io.BytesIO(tender_file.file_data)
-                response = FileResponse(
-                    file_stream, 
+                digest, size = tender_file.file_hash, tender_file.file_size
+                # ?linearized=true serves the linearized copy of a PDF when there is one,
+                # so viewers can show page 1 early
+                if request.query_params.get("linearized") == "true":
+                    digest, size = linearized_payload(digest, size, tender_file.content_type)
+
+                # For actual file download, stream the payload (or the requested byte ranges),
+                # answering conditional requests before touching it
+                return file_download_response(
+                    request,
+                    digest,
+                    size=size,
                     content_type=tender_file.file_type,
-                    as_attachment=True,
-                    filename=tender_file.file_name
+                    filename=tender_file.file_name,
+                    last_modified=tender_file.Uploaded_At,
                 )
-                return response
                 
         except Tender_Files.DoesNotExist:
             return Response(
@@ -352,47 +464,118 @@ class Get_TenderFile_Data(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class Get_TenderFile_Preview(APIView):
+    """
+    View to retrieve a rendered preview of a tender PDF file without downloading it.
+
+    Query parameters: file_id (required), kind ("thumbnail" or "page"), page (1-based).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            file_id = request.query_params.get("file_id")
+            if not file_id:
+                return Response(
+                    {"message": "file_id is required", "data": []},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            tender_file = Tender_Files.objects.get(file_id=file_id)
+            return preview_response(request, tender_file.file_hash, tender_file.content_type)
+
+        except Tender_Files.DoesNotExist:
+            return Response(
+                {"message": "File not found.", "data": []},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception as e:
+            return Response(
+                {"message": str(e), "data": []},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class Get_TenderFile_Pages(APIView):
+    """
+    View to extract some pages of a tender PDF file, as a new PDF or as text.
+
+    Query parameters: file_id (required), pages (required, e.g. "3", "5-9" or "1,4-6"),
+    output ("pdf" or "text").
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            file_id = request.query_params.get("file_id")
+            if not file_id:
+                return Response(
+                    {"message": "file_id is required", "data": []},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            tender_file = Tender_Files.objects.get(file_id=file_id)
+            return page_extract_response(
+                request, tender_file.file_hash, tender_file.content_type, tender_file.file_name
+            )
+
+        except Tender_Files.DoesNotExist:
+            return Response(
+                {"message": "File not found.", "data": []},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception as e:
+            return Response(
+                {"message": str(e), "data": []},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
 class Create_TenderView(APIView):
     """View to create a new tender. Only superusers can create tenders."""
 
     permission_classes = [IsAuthenticated, IsSuperUser]
+    upload_policy = "tender_files"
 
     def post(self, request):
         data = request.data
         try:
-            tender = Tender.objects.create(
-                title=data.get("title"),
-                description=data.get("description"),
-                start_date=data.get("start_date"),
-                end_date=data.get("end_date"),
-                budget=data.get("budget"),
-                created_by=request.user, 
-            )
-
-            # Handle file uploads
+            # Write the payloads to the blob store first, then record the tender and
+            # all of its attachments in one transaction
             vat_files = request.FILES.getlist("files")
-            uploaded_files = []
-
-            if vat_files:
-                for file in vat_files:
-                    # Read the file data
-                    file_data = file.read()
-
-                    # Create the attachment record
-                    tender_file = Tender_Files.objects.create(
-                        tender=tender,
-                        file_name=file.name,
-                        file_type=file.content_type,
-                        file_size=file.size,
-                        file_data=file_data,
-                    )
-
-                    uploaded_files.append({
-                        "file_id": tender_file.file_id,
-                        "file_name": file.name,
-                        "file_type": file.content_type,
-                        "file_size": file.size
-                    })
+            rejected = rejected_uploads_response(request, vat_files, self.upload_policy)
+            if rejected is not None:
+                return rejected
+            payloads = [stage_upload(file) for file in vat_files]
+
+            with transaction.atomic():
+                tender = Tender.objects.create(
+                    title=data.get("title"),
+                    description=data.get("description"),
+                    start_date=data.get("start_date"),
+                    end_date=data.get("end_date"),
+                    budget=data.get("budget"),
+                    created_by=request.user, 
+                )
+                tender_files = attach_uploads(
+                    Tender_Files,
+                    vat_files,
+                    payloads,
+                    [file.name for file in vat_files],
+                    tender=tender,
+                )
+
+            uploaded_files = [
+                {
+                    "file_id": tender_file.file_id,
+                    "file_name": file.name,
+                    "file_type": file.content_type,
+                    "file_size": file.size
+                }
+                for file, tender_file in zip(vat_files, tender_files)
+            ]
 
             tender_data = {
                 "tender_id": tender.tender_id,
@@ -501,6 +684,7 @@ class Add_TenderFileView(APIView):
     """View to add multiple files to an existing tender."""
 
     permission_classes = [IsAuthenticated, IsSuperUser]
+    upload_policy = "tender_files"
 
     def post(self, request):
         data = request.data
@@ -516,45 +700,35 @@ class Add_TenderFileView(APIView):
 
             # Handle multiple file uploads
             files = request.FILES.getlist("files")
+            rejected = rejected_uploads_response(request, files, self.upload_policy)
+            if rejected is not None:
+                return rejected
             if not files:
                 return Response(
                     {"message": "At least one file is required", "data": []},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            
-            uploaded_files = []
-            
-            for file in files:
-                # Read the file data as BLOB
-                file_data = file.read()
-                
-                # Create unique filenames with timestamp if needed
-                import datetime
-                import os
-                
-                # Split the filename into name and extension
-                file_name, file_extension = os.path.splitext(file.name)
-                
-                # Add current timestamp to ensure uniqueness
-                timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-                unique_filename = f"{file_name}_{timestamp}{file_extension}"
 
-                # Create the attachment record with BLOB data
-                tender_file = Tender_Files.objects.create(
-                    tender=tender,
-                    file_name=unique_filename,
-                    file_type=file.content_type,
-                    file_size=file.size,
-                    file_data=file_data,
+            # Write the payloads first, then record every attachment in one transaction
+            payloads = [stage_upload(file) for file in files]
+            file_names = unique_file_names([file.name for file in files])
+
+            with transaction.atomic():
+                tender_files = attach_uploads(
+                    Tender_Files, files, payloads, file_names, tender=tender
                 )
-                
-                uploaded_files.append({
+                Tender.bump_version(tender.tender_id)
+
+            uploaded_files = [
+                {
                     "file_id": tender_file.file_id,
-                    "file_name": unique_filename,
+                    "file_name": tender_file.file_name,
                     "original_filename": file.name,
                     "file_type": file.content_type,
                     "file_size": file.size
-                })
+                }
+                for file, tender_file in zip(files, tender_files)
+            ]
 
             return Response(
                 {
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('User', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vat_certificate_manager',
+            name='File_Hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='vat_certificate_manager',
+            name='File_Data',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:40
+
+from django.db import migrations
+
+from Storage.migrations import _payload_backfill
+
+
+def move_file_data_to_blob_store(apps, schema_editor):
+    _payload_backfill.move_file_data_to_blob_store(
+        apps,
+        schema_editor,
+        "User",
+        "VAT_Certificate_Manager",
+        data_field="File_Data",
+        hash_field="File_Hash",
+    )
+
+
+class Migration(migrations.Migration):
+
+    # Each batch commits on its own so the table is not locked for the whole backfill
+    atomic = False
+
+    dependencies = [
+        ('Storage', '0001_initial'),
+        ('User', '0002_vat_certificate_manager_file_hash_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_file_data_to_blob_store, migrations.RunPython.noop),
+    ]
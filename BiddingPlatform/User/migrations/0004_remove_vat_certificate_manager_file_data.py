@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-16 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('User', '0003_move_file_data_to_blob_store'),
+    ]
+
+    # Only the model state changes in this release: servers still running the previous
+    # release keep reading File_Data until they are replaced. The next release drops the
+    # column and makes File_Hash NOT NULL in the database.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='vat_certificate_manager',
+                    name='File_Data',
+                ),
+                migrations.AlterField(
+                    model_name='vat_certificate_manager',
+                    name='File_Hash',
+                    field=models.CharField(db_index=True, max_length=64),
+                ),
+            ],
+        ),
+    ]
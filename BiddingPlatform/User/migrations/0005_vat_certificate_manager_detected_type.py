@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-16 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('User', '0004_remove_vat_certificate_manager_file_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vat_certificate_manager',
+            name='Detected_Type',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:40
+
+import BiddingPlatform.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+from BiddingPlatform.search import vendor_sql_operation
+from User.migrations._search_folding import fold_select, fold_sql
+
+
+USER_COLUMNS = {"rowid": '"User_Id"', "name": "name", "username": "username", "email": "email"}
+NEW_ROW = fold_select(
+    {alias: f"new.{column}" for alias, column in USER_COLUMNS.items()}, keep=("rowid", "email")
+)
+
+SQLITE = [
+    "CREATE VIRTUAL TABLE user_search USING fts5("
+    "name, username, email, tokenize = 'unicode61 remove_diacritics 2')",
+    f"""
+    INSERT INTO user_search (rowid, name, username, email)
+    {fold_select(USER_COLUMNS, "FROM xx_user", keep=("rowid", "email"))}
+    """,
+    f"""
+    CREATE TRIGGER user_search_insert AFTER INSERT ON xx_user BEGIN
+        INSERT INTO user_search (rowid, name, username, email) {NEW_ROW};
+    END
+    """,
+    # FTS5 rewrites a row on update anyway, so it is simply replaced
+    f"""
+    CREATE TRIGGER user_search_update AFTER UPDATE OF name, username, email ON xx_user
+    WHEN old.name IS NOT new.name OR old.username IS NOT new.username
+        OR old.email IS NOT new.email
+    BEGIN
+        DELETE FROM user_search WHERE rowid = new."User_Id";
+        INSERT INTO user_search (rowid, name, username, email) {NEW_ROW};
+    END
+    """,
+    """
+    CREATE TRIGGER user_search_delete AFTER DELETE ON xx_user BEGIN
+        DELETE FROM user_search WHERE rowid = old."User_Id";
+    END
+    """,
+]
+
+REVERSE_SQLITE = [
+    "DROP TRIGGER user_search_delete",
+    "DROP TRIGGER user_search_update",
+    "DROP TRIGGER user_search_insert",
+    "DROP TABLE user_search",
+]
+
+POSTGRESQL = [
+    "CREATE TABLE user_search (rowid integer PRIMARY KEY, user_search tsvector NOT NULL)",
+    "CREATE INDEX user_search_document_idx ON user_search USING GIN (user_search)",
+    f"""
+    CREATE FUNCTION user_search_document(name text, username text, email text)
+    RETURNS tsvector LANGUAGE sql IMMUTABLE AS $$
+        SELECT setweight(to_tsvector('simple', {fold_sql("coalesce(name, '')")}), 'A')
+            || setweight(to_tsvector('simple', {fold_sql("coalesce(username, '')")}), 'B')
+            || setweight(to_tsvector('simple', coalesce(email, '')), 'C')
+    $$
+    """,
+    """
+    INSERT INTO user_search (rowid, user_search)
+    SELECT "User_Id", user_search_document(name, username, email) FROM xx_user
+    """,
+    """
+    CREATE FUNCTION user_search_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM user_search WHERE rowid = OLD."User_Id";
+            RETURN OLD;
+        END IF;
+        INSERT INTO user_search (rowid, user_search)
+        VALUES (NEW."User_Id", user_search_document(NEW.name, NEW.username, NEW.email))
+        ON CONFLICT (rowid) DO UPDATE SET user_search = EXCLUDED.user_search;
+        RETURN NEW;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER user_search_sync
+    AFTER INSERT OR DELETE OR UPDATE OF name, username, email ON xx_user
+    FOR EACH ROW EXECUTE FUNCTION user_search_sync()
+    """,
+]
+
+REVERSE_POSTGRESQL = [
+    "DROP TRIGGER user_search_sync ON xx_user",
+    "DROP FUNCTION user_search_sync()",
+    "DROP TABLE user_search",
+    "DROP FUNCTION user_search_document(text, text, text)",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('User', '0005_vat_certificate_manager_detected_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='User_Search',
+            fields=[
+                ('user', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='User.user')),
+                ('document', BiddingPlatform.search.SearchDocumentField(db_column='user_search')),
+            ],
+            options={
+                'db_table': 'user_search',
+                'managed': False,
+            },
+        ),
+        # The index table and the triggers that keep it in sync
+        vendor_sql_operation(SQLITE, POSTGRESQL, REVERSE_SQLITE, REVERSE_POSTGRESQL),
+    ]
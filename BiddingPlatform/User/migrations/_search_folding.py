@@ -0,0 +1,74 @@
+"""
+The Arabic folding of the search index triggers, frozen as BiddingPlatform.search did it
+when the triggers were created, so replaying their migrations always builds the same
+index. Do not edit it: when ``BiddingPlatform.search`` folds differently, freeze the new
+tables in a module of their own and add migrations recreating the triggers and rebuilding
+the indexes with them.
+"""
+
+# Arabic spellings readers treat as the same word, and what they are folded to: hamza on
+# or under alef, madda and wasla become bare alef; hamza on waw becomes waw; hamza on
+# yaa, alef maqsura and Farsi yeh become yaa; keheh becomes kaf; taa marbuta becomes
+# haa; Arabic-Indic and Eastern Arabic-Indic digits become ASCII digits.
+FOLD_FROM = (
+    "\u0623\u0625\u0622\u0671"
+    "\u0624"
+    "\u0626\u0649\u06cc"
+    "\u06a9"
+    "\u0629"
+    "\u0660\u0661\u0662\u0663\u0664\u0665\u0666\u0667\u0668\u0669"
+    "\u06f0\u06f1\u06f2\u06f3\u06f4\u06f5\u06f6\u06f7\u06f8\u06f9"
+)
+FOLD_TO = (
+    "\u0627\u0627\u0627\u0627"
+    "\u0648"
+    "\u064a\u064a\u064a"
+    "\u0643"
+    "\u0647"
+    "0123456789"
+    "0123456789"
+)
+# Dropped altogether: the harakat (tanween, fatha, damma, kasra, shadda, sukun),
+# combining madda and hamza, dagger alef and tatweel
+FOLD_DROP = (
+    "\u064b\u064c\u064d\u064e\u064f\u0650\u0651\u0652"
+    "\u0653\u0654\u0655\u0670\u0640"
+)
+FOLD_PAIRS = list(zip(FOLD_FROM, FOLD_TO)) + [(char, "") for char in FOLD_DROP]
+# replace() calls SQLite nests per pass of fold_select; one chain of all the pairs
+# overflows its parser
+SQLITE_FOLD_PASS = 22
+
+
+def fold_sql(sql):
+    """PostgreSQL expression folding ``sql``."""
+    return f"translate({sql}, '{FOLD_FROM}{FOLD_DROP}', '{FOLD_TO}')"
+
+
+def fold_select(columns, source="", keep=()):
+    """
+    SQLite ``SELECT`` of ``columns`` (alias to SQL expression) folded through plain
+    ``replace()`` calls, for the index triggers and backfills.
+
+    The calls are split over nested subqueries of ``SQLITE_FOLD_PASS`` pairs each.
+
+    Args:
+        columns (dict[str, str]): The selected expressions, in order, by alias
+        source (str): The ``FROM`` clause (and joins) of the expressions, if any
+        keep (tuple[str]): Aliases of the columns to select as they are
+    """
+    passes = [
+        FOLD_PAIRS[start:start + SQLITE_FOLD_PASS]
+        for start in range(0, len(FOLD_PAIRS), SQLITE_FOLD_PASS)
+    ]
+    select = None
+    for pairs in passes:
+        selected = []
+        for alias, expression in columns.items():
+            sql = alias if select else expression
+            if alias not in keep:
+                for source_char, target in pairs:
+                    sql = f"replace({sql}, '{source_char}', '{target}')"
+            selected.append(f"{sql} AS {alias}")
+        select = f"SELECT {', '.join(selected)} " + (f"FROM ({select})" if select else source)
+    return select.rstrip()
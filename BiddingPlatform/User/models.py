@@ -6,6 +6,8 @@ from django.contrib.auth.models import (
     BaseUserManager,
 )
 
+from BiddingPlatform.search import SearchDocumentField
+
 
 class VAT_Certificate_Manager(models.Model):
     Id = models.AutoField(primary_key=True)
@@ -17,8 +19,13 @@ class VAT_Certificate_Manager(models.Model):
     )
     File_Name = models.CharField(max_length=100)
     File_Type = models.CharField(max_length=255)
+    Detected_Type = models.CharField(
+        max_length=255, blank=True, default=""
+    )  # Type sniffed from the payload's first bytes; empty for files stored before sniffing
     File_Size = models.PositiveIntegerField()
-    File_Data = models.BinaryField()
+    File_Hash = models.CharField(
+        max_length=64, db_index=True
+    )  # SHA-256 digest of the payload in the blob store
     Uploaded_At = models.DateTimeField(auto_now_add=True)
 
 
@@ -116,6 +123,34 @@ class User(AbstractBaseUser, PermissionsMixin):
             raise ValueError("admin_type must be an AdminType enum or None")
 
 
+class User_Search(models.Model):
+    """
+    Full-text index of companies and admins, kept in sync by database triggers (see
+    migration 0006_user_search); only read through BiddingPlatform.search.full_text_search.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        related_name="search_entry",
+        db_column="rowid",
+        db_constraint=False,
+    )
+    document = SearchDocumentField(db_column="user_search")
+
+    # Index columns, most relevant first, and the fields they are filled from
+    SEARCH_COLUMNS = {
+        "name": "name",
+        "username": "username",
+        "email": "email",
+    }
+
+    class Meta:
+        managed = False
+        db_table = "user_search"
+
+
 class NotificationReadStatus(models.Model):
     """
     Tracks the read status of notifications for each user.
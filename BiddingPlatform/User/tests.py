@@ -1,3 +1,43 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from BiddingPlatform import search
+from User.migrations import _search_folding
+from User.models import User
+
+
+class List_UserView_Search_Tests(TestCase):
+    URL = "/api/User/getall/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+        User.objects.create_user("builders", "info@builders.example", name="شركة الإعمار")
+        User.objects.create_user("supplies", "sales@supplies.example", name="Gulf Supplies")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def search(self, text):
+        response = self.client.get(self.URL, {"search": text})
+        self.assertEqual(response.status_code, 200)
+        return [user["username"] for user in response.data["results"]["data"]]
+
+    def test_company_name_spelling_variants(self):
+        self.assertEqual(self.search("شركه الاعمار"), ["builders"])
+
+    def test_username_and_email(self):
+        self.assertEqual(self.search("suppl"), ["supplies"])
+        self.assertEqual(self.search("sales"), ["supplies"])
+
+    def test_index_follows_renames(self):
+        User.objects.filter(username="supplies").update(name="مؤسسة الخليج")
+        self.assertEqual(self.search("gulf"), [])
+        self.assertEqual(self.search("موسسه"), ["supplies"])
+
+
+class Search_Folding_Tests(SimpleTestCase):
+    def test_index_triggers_fold_like_searches(self):
+        # A change to the fold needs migrations rebuilding the indexes with a new copy
+        self.assertEqual(_search_folding.FOLD_PAIRS, search.FOLD_PAIRS)
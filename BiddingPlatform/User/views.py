@@ -10,17 +10,15 @@ from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import authenticate
 import io
 from django.db.models import Q
-from rest_framework.pagination import PageNumberPagination
+from Storage.blob_store import store_upload
+from Storage.downloads import file_download_response
+from Storage.renditions import review_payload, schedule_renditions
+from Storage.validation import rejected_uploads_response
+from BiddingPlatform.pagination import StandardPagination
+from BiddingPlatform.search import full_text_search
 
 # Create your views here.
 
-# Define a standard pagination class
-class StandardPagination(PageNumberPagination):
-    page_size = 5
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-
 class LoginView(APIView):
     """View for user login.
     Handles user authentication and returns a JWT token.
@@ -83,11 +81,9 @@ class List_UserView(APIView):
         # Apply search filter if provided
         users = User.objects.filter(is_superuser=False)
         if search_query:
-            users = users.filter(
-                Q(username__icontains=search_query) | 
-                Q(name__icontains=search_query) | 
-                Q(email__icontains=search_query)
-            )
+            users = full_text_search(
+                users, search_query, ["name", "username", "email"]
+            ).order_by('-search_rank')
             
         # Apply pagination
         paginator = StandardPagination()
@@ -127,11 +123,9 @@ class ListSuperUsersView(APIView):
         # Apply search filter if provided
         superusers = User.objects.filter(is_superuser=True)
         if search_query:
-            superusers = superusers.filter(
-                Q(username__icontains=search_query) | 
-                Q(name__icontains=search_query) | 
-                Q(email__icontains=search_query)
-            )
+            superusers = full_text_search(
+                superusers, search_query, ["name", "username", "email"]
+            ).order_by('-search_rank')
             
         # Apply pagination
         paginator = StandardPagination()
@@ -222,6 +216,8 @@ class User_RegesterView(APIView):
     Handles User creation and VAT certificate file uploads.
     """
 
+    upload_policy = "vat_certificates"
+
     def post(self, request):
         """
         This endpoint accepts two formats:
@@ -296,6 +292,12 @@ class User_RegesterView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
+            # Check the VAT files' real types and sizes before creating the user
+            vat_files = request.FILES.getlist("vat_files") or request.FILES.getlist("files")
+            rejected = rejected_uploads_response(request, vat_files, self.upload_policy)
+            if rejected is not None:
+                return rejected
+
             # Create the user with create_user to properly hash the password
             user = User.objects.create_user(
                 username=company_data.get("username"),
@@ -312,54 +314,24 @@ class User_RegesterView(APIView):
             user.Is_Accepted = None  # Default to not accepted
             user.save()
 
-            # Handle file uploads as BLOB data - try both vat_files and files
-            vat_files = request.FILES.getlist("vat_files") or request.FILES.getlist("files")
             uploaded_files = []
 
             if vat_files:
                 for file in vat_files:
                     try:
-                        # Validate file size (e.g., max 10MB)
-                        max_file_size = 10 * 1024 * 1024  # 10MB
-                        if file.size > max_file_size:
-                            return Response(
-                                {
-                                    "error": f"File {file.name} is too large. Maximum size is 10MB."
-                                },
-                                status=status.HTTP_400_BAD_REQUEST,
-                            )
-
-                        # Validate file type (optional - add allowed types)
-                        allowed_types = [
-                            "application/pdf",
-                            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                            "application/vnd.ms-excel",
-                            "image/jpeg",
-                            "image/png",
-                            "image/jpg",
-                        ]
-                        if file.content_type not in allowed_types:
-                            return Response(
-                                {
-                                    "error": f"File type {file.content_type} is not allowed."
-                                },
-                                status=status.HTTP_400_BAD_REQUEST,
-                            )
-
-                        # Read the file data as BLOB
-                        file_data = file.read()
-
-                        # Reset file pointer in case it's needed later
-                        file.seek(0)
-
-                        # Create the VAT certificate record with BLOB data
+                        # Store the payload in the blob store
+                        blob = store_upload(file)
+
+                        # Create the VAT certificate record pointing at the stored blob
                         vat_cert = VAT_Certificate_Manager.objects.create(
                             User=user,
                             File_Name=file.name,
                             File_Type=file.content_type,
+                            Detected_Type=file.detected_type or "",
                             File_Size=file.size,
-                            File_Data=file_data,  # Store as BLOB
+                            File_Hash=blob.digest,
                         )
+                        schedule_renditions([(blob.digest, file.detected_type)])
 
                         uploaded_files.append(
                             {
@@ -547,11 +519,9 @@ class Get_All_Pending_Users(APIView):
             # Apply search filter if provided
             pending_users = User.objects.filter(Is_Accepted=None)
             if search_query:
-                pending_users = pending_users.filter(
-                    Q(username__icontains=search_query) | 
-                    Q(name__icontains=search_query) | 
-                    Q(email__icontains=search_query)
-                )
+                pending_users = full_text_search(
+                    pending_users, search_query, ["name", "username", "email"]
+                ).order_by('-search_rank')
                 
             # Apply pagination
             paginator = StandardPagination()
@@ -576,7 +546,11 @@ class Get_All_Pending_Users(APIView):
 
 
 class Get_UserFile_Data(APIView):
-    """View to retrieve file data for a specific VAT certificate by ID."""
+    """View to retrieve file data for a specific VAT certificate by ID.
+
+    Query parameters: file_id (required), metadata_only ("true"), rendition ("review"
+    for the downscaled copy of an image certificate; the original otherwise).
+    """
 
     permission_classes = [IsAuthenticated]  # Ensure the user is authenticated
 
@@ -600,6 +574,7 @@ class Get_UserFile_Data(APIView):
                     "file_name": vat_certificate.File_Name,
                     "file_type": vat_certificate.File_Type,
                     "file_size": vat_certificate.File_Size,
+                    "sha256": vat_certificate.File_Hash,
                     "uploaded_at": vat_certificate.Uploaded_At,
                 }
                 return Response(
@@ -610,15 +585,24 @@ class Get_UserFile_Data(APIView):
                     status=status.HTTP_200_OK,
                 )
             else:
-                # For actual file download, create a file-like object and return it
-                file_stream = io.BytesIO(vat_certificate.File_Data)
-                response = FileResponse(
-                    file_stream,
-                    content_type=vat_certificate.File_Type,
-                    as_attachment=True,
-                    filename=vat_certificate.File_Name,
+                digest, size = vat_certificate.File_Hash, vat_certificate.File_Size
+                content_type, file_name = vat_certificate.File_Type, vat_certificate.File_Name
+                # ?rendition=review serves the downscaled copy of an image when there is one
+                if request.query_params.get("rendition") == "review":
+                    digest, size, content_type, file_name = review_payload(
+                        digest, size, content_type, file_name
+                    )
+
+                # For actual file download, stream the payload (or the requested byte ranges),
+                # answering conditional requests before touching it
+                return file_download_response(
+                    request,
+                    digest,
+                    size=size,
+                    content_type=content_type,
+                    filename=file_name,
+                    last_modified=vat_certificate.Uploaded_At,
                 )
-                return response
 
         except VAT_Certificate_Manager.DoesNotExist:
             return Response(
@@ -646,11 +630,15 @@ class Add_UserFileView(APIView):
     """
 
     permission_classes = [IsAuthenticated]  # Ensure the user is authenticated
+    upload_policy = "vat_certificates"
 
     def post(self, request):
         try:
             user = request.user  # Get the authenticated user
             files = request.FILES.getlist("files")
+            rejected = rejected_uploads_response(request, files, self.upload_policy)
+            if rejected is not None:
+                return rejected
             if not files:
                 return Response(
                     {"message": "At least one file is required.", "data": []},
@@ -662,6 +650,9 @@ class Add_UserFileView(APIView):
             import os
 
             for file in files:
+                # Store the payload in the blob store
+                blob = store_upload(file)
+
                 # Split the filename into name and extension
                 file_name, file_extension = os.path.splitext(file.name)
 
@@ -674,9 +665,11 @@ class Add_UserFileView(APIView):
                     User=user,
                     File_Name=unique_filename,  # Use the unique filename
                     File_Type=file.content_type,
+                    Detected_Type=file.detected_type or "",
                     File_Size=file.size,
-                    File_Data=file.read(),
+                    File_Hash=blob.digest,
                 )
+                schedule_renditions([(blob.digest, file.detected_type)])
 
                 uploaded_files.append(
                     {